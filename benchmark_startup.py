@@ -0,0 +1,63 @@
+"""Measure how quickly a fresh WorkBench process becomes ready to serve.
+
+Each run starts a new interpreter that imports workbench, serves GET / and a small CSV
+upload through the Flask test client, and reports the time for each step, the peak RSS,
+and which heavy modules ended up imported. Usage:
+
+    python benchmark_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import io, json, resource, sys, time
+started = time.perf_counter()
+import workbench
+imported = time.perf_counter()
+client = workbench.app.test_client()
+client.get('/')
+first_request = time.perf_counter()
+client.post('/', data={'action': 'edit_local', 'upload_file': (io.BytesIO(b'a,b\n1,2\n'), 'bench.csv')},
+            content_type='multipart/form-data')
+first_csv = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (first_request - imported) * 1000,
+    'first_csv_ms': (first_csv - first_request) * 1000,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': [name for name in ('pandas', 'numpy', 'requests', 'boto3', 'webbrowser') if name in sys.modules],
+}))
+"""
+
+
+def run_probe(data_dir):
+    env = dict(os.environ, WORKBENCH_DATA_DIR=data_dir)
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True
+    )
+    # The app logs with print(); the measurements are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes to measure (default: 5)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        results = [run_probe(data_dir) for _ in range(args.runs)]
+
+    for key in ('import_ms', 'first_request_ms', 'first_csv_ms', 'max_rss_mb'):
+        values = [result[key] for result in results]
+        print(f"{key:18} median {statistics.median(values):8.1f}   min {min(values):8.1f}   max {max(values):8.1f}")
+    print(f"{'heavy modules':18} {', '.join(results[-1]['heavy_modules']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""gunicorn settings for WorkBench: gunicorn --config gunicorn.conf.py workbench:app
+
+The app is imported once in the master (preload_app), so the compiled templates and the
+modules imported in when_ready are shared copy-on-write by every forked worker. Per-process
+state (HTTP session, S3 client, job queue threads) is created lazily and checks the pid,
+so nothing has to be reset after the fork.
+"""
+import os
+
+# sync is unsuitable for WorkBench: each worker then serves one request at a time, so a single
+# open /stream_output event stream (up to WORKBENCH_CODE_RUN_STREAM_SECONDS) blocks it
+WORKER_CLASS = os.environ.get('WORKBENCH_WORKER_CLASS', 'gthread')
+
+if WORKER_CLASS == 'gevent':
+    # Patch before workbench is preloaded so its locks, sockets and subprocesses cooperate
+    try:
+        from gevent import monkey
+    except ImportError:
+        raise RuntimeError("WORKBENCH_WORKER_CLASS=gevent needs gevent: pip install -r requirements-gevent.txt")
+    monkey.patch_all()
+
+
+def available_cpus():
+    """CPUs this process may run on (respects affinity masks, e.g. in containers)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '9000')}"
+preload_app = True
+
+# Each worker keeps its own CSV cache (WORKBENCH_CSV_CACHE_MAX_BYTES), so memory grows with
+# the worker count; requests are I/O bound and handled by threads, hence the cap
+workers = int(os.environ.get('WEB_CONCURRENCY', min(available_cpus() + 1, 8)))
+worker_class = WORKER_CLASS
+threads = int(os.environ.get('WORKBENCH_THREADS', 8))  # gthread only
+worker_connections = int(os.environ.get('WORKBENCH_WORKER_CONNECTIONS', 100))  # gevent only
+
+# Recycle workers so memory freed by evicted CSVs goes back to the OS; the jitter keeps
+# workers from restarting at the same time. A worker with jobs still queued or running
+# waits until they are done (see pre_request). 0 disables recycling.
+max_requests = int(os.environ.get('WORKBENCH_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('WORKBENCH_WORKER_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WORKBENCH_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+
+
+def when_ready(server):
+    """Import the lazily loaded libraries in the master so workers share them"""
+    if not server.cfg.preload_app:
+        return
+    for name in ('numpy', 'requests', 'boto3'):
+        try:
+            __import__(name)
+        except ImportError:
+            server.log.warning("%s is not installed; features that need it are unavailable", name)
+
+
+def pre_request(worker, req):
+    """Hold off max_requests recycling while this worker still has jobs queued or running"""
+    if worker.nr + 1 < worker.max_requests:
+        return
+    import workbench
+    active = workbench.CODE_RUNS.active()
+    if active:
+        # Checked again on the next request; the worker restarts once its jobs are done
+        worker.max_requests = worker.nr + 2
+        worker.log.debug("Restart deferred: %d jobs still queued or running", active)
+
+
+def worker_exit(server, worker):
+    """Let running jobs finish within the graceful timeout, then stop the rest"""
+    import workbench
+    cancelled = workbench.CODE_RUNS.shutdown(max(0, min(server.cfg.graceful_timeout, server.cfg.timeout) - 5))
+    if cancelled:
+        server.log.warning("Worker %s exiting: cancelled %d unfinished jobs", worker.pid, cancelled)
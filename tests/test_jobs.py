@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault('WORKBENCH_DATA_DIR', tempfile.mkdtemp(prefix='workbench_test_'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workbench  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return workbench.app.test_client()
+
+
+@pytest.mark.parametrize('route', ['/jobs', '/run_code'])
+@pytest.mark.parametrize('timeout', ['nan', 'inf', '-inf', 'abc', '0', '-5'])
+def test_invalid_timeout_is_rejected(client, route, timeout):
+    response = client.post(route, data={'command': 'echo hi', 'timeout': timeout})
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False, 'error': 'timeout must be a positive number of seconds'}
+
+
+def test_timeout_is_capped(client):
+    response = client.post('/jobs', data={'command': 'echo hi', 'timeout': '1e9'})
+    assert response.status_code == 200
+    run = workbench.CODE_RUNS.get(response.get_json()['job_id'])
+    assert run.join(10)
+    assert run.info()['timeout'] == workbench.CODE_RUN_MAX_TIMEOUT_SECONDS
@@ -1,22 +1,67 @@
 # pylint: skip-file
 # flake8: noqa
+import bisect
+import codecs
 import csv
+import fnmatch
 import gzip
 import hashlib
+import importlib
 import io
+import itertools
 import json
 import logging
+import math
+import mmap
 import os
+import queue
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
 import tempfile
+import threading
+import time
 import uuid
-import webbrowser
 import zipfile
+import zlib
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urlparse
-import requests
 
-from flask import Flask, request, render_template_string, redirect, url_for, flash, session, send_file, jsonify
-import pandas as pd
+from flask import Flask, Response, request, redirect, url_for, flash, session, jsonify, abort, stream_with_context
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported when one of its attributes is first used"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# Slow to import and only needed once a dataset or raw file is stored, so loaded on first use.
+# requests and boto3 are imported in get_http_session / get_s3_client for the same reason.
+np = LazyModule('numpy')
+
+try:
+    import zstandard  # Optional: enables zstd compressed downloads
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl  # Cross-process locking of raw edit journals (not available on Windows)
+except ImportError:
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.CRITICAL)
@@ -25,9 +70,75 @@ app = Flask(__name__)
 app.secret_key = 'workbench_public_key'
 
 # CSV Edit tracking cache (same as workbench.py)
-CSV_DATA_CACHE = {}  # Stores full DataFrame for each file
 CSV_EDITS_CACHE = {}  # Stores edits by page and cell
 
+# CSV data cache limits (per worker process)
+CSV_CACHE_MAX_BYTES = int(os.environ.get('WORKBENCH_CSV_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+CSV_CACHE_TTL_SECONDS = int(os.environ.get('WORKBENCH_CSV_CACHE_TTL', 3600))  # Idle time before eviction
+
+# Shared on-disk dataset store (visible to every gunicorn worker on the host)
+DATASET_DIR = os.environ.get('WORKBENCH_DATA_DIR', os.path.join(tempfile.gettempdir(), 'workbench_data'))
+DATASET_TTL_SECONDS = int(os.environ.get('WORKBENCH_DATA_TTL', 24 * 3600))  # Unused datasets are deleted after this
+
+# Streaming CSV ingest settings
+CSV_CHUNK_BYTES = 1024 * 1024  # Read size for the upload/URL stream
+CSV_SNIFF_BYTES = 64 * 1024  # Sample used for encoding and delimiter detection
+CSV_CANDIDATE_DELIMITERS = ',;\t|'
+CSV_FIELD_SIZE_LIMIT = 64 * 1024 * 1024  # Allow large quoted fields (default is 128 KB)
+CSV_INDEX_THRESHOLD_BYTES = int(os.environ.get('WORKBENCH_CSV_INDEX_THRESHOLD', 256 * 1024 * 1024))  # Larger files are indexed, not loaded
+CSV_INDEX_STRIDE = 1000  # Record the byte offset of every Nth row
+CSV_DOWNLOAD_CHUNK_BYTES = 256 * 1024  # Streamed download responses are flushed in chunks of about this size
+
+# Outbound HTTP (URL download/view): one pooled, retrying session per worker process
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('WORKBENCH_HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('WORKBENCH_HTTP_READ_TIMEOUT', 60))  # Max wait between bytes, not for the whole body
+HTTP_RETRIES = int(os.environ.get('WORKBENCH_HTTP_RETRIES', 3))
+HTTP_POOL_SIZE = int(os.environ.get('WORKBENCH_HTTP_POOL_SIZE', 10))  # Keep-alive connections per host
+HTTP_POOL_HOSTS = 20  # Hosts whose connection pools are kept
+
+# S3 editing: objects are streamed with ranged GETs through one pooled client per worker
+S3_ENDPOINT_URL = os.environ.get('WORKBENCH_S3_ENDPOINT_URL') or None  # e.g. a MinIO server
+S3_RANGE_BYTES = int(os.environ.get('WORKBENCH_S3_RANGE_BYTES', 8 * 1024 * 1024))  # Bytes per ranged GET
+S3_PREVIEW_BYTES = int(os.environ.get('WORKBENCH_S3_PREVIEW_BYTES', 1024 * 1024))  # CSV head shown while the rest loads
+S3_PART_BYTES = max(int(os.environ.get('WORKBENCH_S3_PART_BYTES', 8 * 1024 * 1024)), 5 * 1024 * 1024)  # S3 minimum is 5 MB
+S3_UPLOAD_THREADS = int(os.environ.get('WORKBENCH_S3_UPLOAD_THREADS', 4))  # Parts uploaded concurrently per save
+S3_MAX_PARTS = 10000
+S3_FETCH_THREADS = int(os.environ.get('WORKBENCH_S3_FETCH_THREADS', 8))  # Shards fetched concurrently when opening a prefix
+S3_MAX_SHARDS = 10000  # Objects one prefix or glob may open as a single table
+S3_LOAD_HEARTBEAT_SECONDS = 10  # Background loads refresh their preview's loader_heartbeat this often
+S3_LOAD_STALE_SECONDS = 6 * S3_LOAD_HEARTBEAT_SECONDS  # A load silent this long died with its worker
+
+# Raw editor: bodies above this size stay on disk and are fetched by the editor in chunks
+RAW_INLINE_MAX_BYTES = int(os.environ.get('WORKBENCH_RAW_INLINE_MAX_BYTES', 1024 * 1024))
+RAW_CHUNK_BYTES = 1024 * 1024  # Max text returned by one /raw-chunk response
+RAW_LINE_STRIDE = 1000  # Record the byte offset of every Nth line of a raw file
+RAW_WINDOW_LINES = 2000  # Lines per /raw-chunk page
+RAW_MAX_WINDOW_LINES = 5 * RAW_WINDOW_LINES  # Lines the editor keeps loaded at once
+RAW_DOCUMENT_CACHE_SIZE = int(os.environ.get('WORKBENCH_RAW_DOCUMENT_CACHE', 64))  # Patched raw files kept per worker
+
+# Code runs (/run_code, /jobs): queued background subprocesses whose output is read into per-job ring buffers
+CODE_RUN_MAX_CONCURRENT = int(os.environ.get('WORKBENCH_CODE_RUN_MAX_CONCURRENT', 4))  # Job queue threads per worker
+CODE_RUN_MAX_QUEUED = int(os.environ.get('WORKBENCH_CODE_RUN_MAX_QUEUED', 100))  # Jobs allowed to wait for a thread
+CODE_RUN_TIMEOUT_SECONDS = float(os.environ.get('WORKBENCH_CODE_RUN_TIMEOUT', 600))  # Default per-job timeout
+CODE_RUN_MAX_TIMEOUT_SECONDS = float(os.environ.get('WORKBENCH_CODE_RUN_MAX_TIMEOUT', 3600))  # Longest timeout a job may ask for
+CODE_RUN_BUFFER_BYTES = int(os.environ.get('WORKBENCH_CODE_RUN_BUFFER_BYTES', 1024 * 1024))  # Output kept per run
+CODE_RUN_READ_BYTES = 64 * 1024  # Max bytes taken from a pipe per read
+CODE_RUN_SESSION_TTL = 600  # Finished runs stay readable this long
+CODE_RUN_HEARTBEAT_SECONDS = 15  # Comment line sent on idle event streams so dropped clients are noticed
+CODE_RUN_STREAM_SECONDS = int(os.environ.get('WORKBENCH_CODE_RUN_STREAM_SECONDS', 60))  # Event stream length before the client reconnects
+EXECUTE_COMMAND_TIMEOUT_SECONDS = 30  # /execute_command kills the command after this long
+EXECUTE_COMMAND_QUEUE_SECONDS = 30  # ...and gives up if it waited this long for a free job thread
+CODE_RUN_INTERPRETERS = {
+    '.py': [sys.executable, '-u'],
+    '.sh': ['bash'],
+    '.bash': ['bash'],
+    '.js': ['node'],
+    '.rb': ['ruby'],
+    '.pl': ['perl'],
+    '.php': ['php'],
+    '.r': ['Rscript'],
+}
+
 
 def sanitize_download_filename(name: str, default_ext: str = '') -> str:
     """Sanitize filename for downloads: strip any local labels/prefixes and directories."""
@@ -60,6 +171,2311 @@ def sanitize_download_filename(name: str, default_ext: str = '') -> str:
     return name
 
 
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+_s3_client = None
+_s3_client_pid = None
+_s3_client_lock = threading.Lock()
+
+
+def get_http_session():
+    """Shared requests.Session for this worker, with keep-alive pooling and retry/backoff.
+
+    Rebuilt after fork so gunicorn workers never share sockets with the master.
+    """
+    global _http_session, _http_session_pid
+    if _http_session is not None and _http_session_pid == os.getpid():
+        return _http_session
+    with _http_session_lock:
+        if _http_session is None or _http_session_pid != os.getpid():
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            # pool_block caps concurrent connections per host instead of opening throwaway extras
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_HOSTS,
+                pool_maxsize=HTTP_POOL_SIZE,
+                max_retries=retry,
+                pool_block=True
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = 'workbench'
+            _http_session = session
+            _http_session_pid = os.getpid()
+    return _http_session
+
+
+def http_get(url, **kwargs):
+    """Streaming GET through the pooled session with connect/read timeouts.
+
+    Use as a context manager (or close it) so the connection goes back to the pool.
+    """
+    kwargs.setdefault('timeout', (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    kwargs.setdefault('stream', True)
+    return get_http_session().get(url, **kwargs)
+
+
+def get_s3_client():
+    """Shared boto3 S3 client for this worker (thread-safe, pooled connections, standard retries).
+
+    Rebuilt after fork like get_http_session. Credentials and region come from the usual
+    AWS environment/config; WORKBENCH_S3_ENDPOINT_URL points it at an S3-compatible server.
+    """
+    global _s3_client, _s3_client_pid
+    if _s3_client is not None and _s3_client_pid == os.getpid():
+        return _s3_client
+    with _s3_client_lock:
+        if _s3_client is None or _s3_client_pid != os.getpid():
+            try:
+                import boto3  # Optional: S3 paths in the editor
+                from botocore.config import Config as BotoConfig
+            except ImportError:
+                raise ValueError("S3 paths require the boto3 package (pip install boto3)")
+            config = BotoConfig(
+                connect_timeout=HTTP_CONNECT_TIMEOUT,
+                read_timeout=HTTP_READ_TIMEOUT,
+                retries={'max_attempts': HTTP_RETRIES + 1, 'mode': 'standard'},
+                max_pool_connections=HTTP_POOL_SIZE,
+                # Custom endpoints (MinIO, moto) generally only support path-style URLs
+                s3={'addressing_style': 'path'} if S3_ENDPOINT_URL else None
+            )
+            _s3_client = boto3.session.Session().client('s3', endpoint_url=S3_ENDPOINT_URL, config=config)
+            _s3_client_pid = os.getpid()
+    return _s3_client
+
+
+def parse_s3_path(s3_path):
+    """'s3://bucket/some/key.csv' -> ('bucket', 'some/key.csv')"""
+    parsed = urlparse(s3_path.strip())
+    if parsed.scheme != 's3' or not parsed.netloc or not parsed.path.lstrip('/'):
+        raise ValueError(f"Invalid S3 path: {s3_path} (expected s3://bucket/key)")
+    return parsed.netloc, parsed.path.lstrip('/')
+
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable, read-only file object over an S3 object, fetched with ranged GETs.
+
+    Sequential reads stream one GET of up to S3_RANGE_BYTES at a time, so a dropped
+    connection is resumed from the current offset instead of restarting the object, and
+    seeks (zip central directories) only fetch what is read. Every GET is pinned to the
+    ETag seen when opening, so an object overwritten mid-read fails instead of mixing versions.
+    """
+
+    def __init__(self, bucket, key, size=None, etag=None, range_bytes=S3_RANGE_BYTES, client=None):
+        self.bucket = bucket
+        self.key = key
+        self.client = client or get_s3_client()
+        if size is None:
+            head = self.client.head_object(Bucket=bucket, Key=key)
+            size, etag = head['ContentLength'], head.get('ETag')
+        self.size = size
+        self.etag = etag
+        self.range_bytes = range_bytes
+        self.position = 0
+        self._body = None
+        self._body_end = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        if offset != self.position:
+            self._close_body()
+            self.position = offset
+        return self.position
+
+    def _open_range(self):
+        end = min(self.position + self.range_bytes, self.size)
+        kwargs = {'IfMatch': self.etag} if self.etag else {}
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={self.position}-{end - 1}", **kwargs)
+        self._body = response['Body']
+        self._body_end = end
+
+    def _close_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+    def readinto(self, buffer):
+        if self.position >= self.size or not len(buffer):
+            return 0
+        for attempt in range(HTTP_RETRIES + 1):
+            if self._body is None or self.position >= self._body_end:
+                self._close_body()
+                self._open_range()
+            try:
+                data = self._body.read(min(len(buffer), self._body_end - self.position))
+            except Exception as e:
+                # Connection dropped mid-range: resume from the current offset
+                print(f"DEBUG: S3 read of s3://{self.bucket}/{self.key} failed at {self.position}: {e}")
+                self._close_body()
+                if attempt == HTTP_RETRIES:
+                    raise
+                continue
+            if not data:
+                self._close_body()
+                if attempt == HTTP_RETRIES:
+                    raise OSError(f"S3 object s3://{self.bucket}/{self.key} ended early at byte {self.position}")
+                continue
+            buffer[:len(data)] = data
+            self.position += len(data)
+            return len(data)
+
+    def close(self):
+        self._close_body()
+        super().close()
+
+
+@app.template_global()
+def is_s3_prefix(s3_path):
+    """True for S3 paths naming several objects: a prefix ending in '/' or a glob such as part-*.csv.gz"""
+    s3_path = (s3_path or '').strip()
+    return s3_path.startswith('s3://') and (s3_path.endswith('/') or any(c in s3_path for c in '*?['))
+
+
+def list_s3_shards(s3_path):
+    """(bucket, [(key, size, etag)]) for the objects under an S3 prefix or matching a glob, in key order.
+
+    A plain prefix lists the CSV objects below it (recursively); a glob is matched against
+    whole keys with fnmatch, so '*' also crosses '/'.
+    """
+    # Not urlparse: '?' is a glob character here, not a query string
+    bucket, _, pattern = s3_path.strip()[len('s3://'):].partition('/')
+    if not bucket:
+        raise ValueError(f"Invalid S3 path: {s3_path} (expected s3://bucket/prefix/)")
+    glob_at = min((pattern.find(c) for c in '*?[' if c in pattern), default=-1)
+    prefix = pattern if glob_at < 0 else pattern[:glob_at]
+
+    shards = []
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if key.endswith('/') or not obj['Size']:
+                continue
+            if glob_at >= 0 and not fnmatch.fnmatchcase(key, pattern):
+                continue
+            if glob_at < 0 and not is_csv_filename(key):
+                continue
+            shards.append((key, obj['Size'], obj['ETag']))
+            if len(shards) > S3_MAX_SHARDS:
+                raise ValueError(f"{s3_path} matches more than {S3_MAX_SHARDS} objects")
+    # ListObjectsV2 already returns keys in UTF-8 binary order
+    return bucket, shards
+
+
+def open_s3_object(s3_path, **kwargs):
+    """Buffered S3RangeReader for an s3:// path (kwargs go to S3RangeReader); returns (stream, reader)"""
+    bucket, key = parse_s3_path(s3_path)
+    reader = S3RangeReader(bucket, key, **kwargs)
+    return io.BufferedReader(reader, buffer_size=CSV_CHUNK_BYTES), reader
+
+
+def upload_s3_stream(s3_path, chunks, content_type='application/octet-stream'):
+    """Write an iterable of byte chunks to S3 and return the number of bytes uploaded.
+
+    Chunks are cut into S3_PART_BYTES parts that S3_UPLOAD_THREADS threads upload
+    concurrently as a multipart upload. A part is only cut from the buffer once a thread
+    is free for it, so at most S3_UPLOAD_THREADS parts plus the buffer (one part and a
+    chunk) are in memory however large the file is.
+    Bodies smaller than one part go up as a single PUT. A failed upload is aborted, so
+    no partial object (or orphaned parts) is left behind.
+    """
+    bucket, key = parse_s3_path(s3_path)
+    client = get_s3_client()
+    chunks = iter(chunks)
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= S3_PART_BYTES:
+            break
+    else:
+        client.put_object(Bucket=bucket, Key=key, Body=bytes(buffer), ContentType=content_type)
+        return len(buffer)
+
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+    slots = threading.BoundedSemaphore(S3_UPLOAD_THREADS)
+    errors = []
+    futures = []
+    total = 0
+
+    def upload_part(number, body):
+        try:
+            response = client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+            return {'PartNumber': number, 'ETag': response['ETag']}
+        except Exception as e:
+            errors.append(e)
+            raise
+        finally:
+            slots.release()
+
+    executor = ThreadPoolExecutor(max_workers=S3_UPLOAD_THREADS, thread_name_prefix='s3-upload')
+    try:
+        def submit(size):
+            if len(futures) >= S3_MAX_PARTS:
+                raise ValueError(f"File too large for {S3_MAX_PARTS} parts of {S3_PART_BYTES} bytes "
+                                 "(raise WORKBENCH_S3_PART_BYTES)")
+            slots.acquire()
+            if errors:
+                slots.release()
+                raise errors[0]
+            body = bytes(buffer[:size])
+            del buffer[:size]
+            futures.append(executor.submit(upload_part, len(futures) + 1, body))
+            return size
+
+        while True:
+            while len(buffer) >= S3_PART_BYTES:
+                total += submit(S3_PART_BYTES)
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            buffer += chunk
+        if buffer:
+            total += submit(len(buffer))
+        parts = [future.result() for future in futures]
+        client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+    except BaseException:
+        # Let in-flight parts finish first; S3 can keep parts uploaded after the abort
+        executor.shutdown(wait=True, cancel_futures=True)
+        try:
+            client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception as e:
+            print(f"DEBUG: Could not abort multipart upload to {s3_path}: {e}")
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    print(f"DEBUG: Uploaded {total} bytes to {s3_path} in {len(futures)} parts")
+    return total
+
+
+class CsvColumn:
+    """One CSV column stored as a single UTF-8 blob plus an offsets array."""
+
+    __slots__ = ('offsets', 'blob')
+
+    def __init__(self, offsets=None, blob=None):
+        # offsets[i]..offsets[i + 1] delimits the bytes of row i inside blob
+        self.offsets = offsets if offsets is not None else array('I', [0])
+        self.blob = blob if blob is not None else bytearray()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+
+    def append(self, value):
+        self.blob += value.encode('utf-8')
+        end = len(self.blob)
+        # Switch to 64-bit offsets once a column grows past 4 GB
+        if end > 0xFFFFFFFF and self.offsets.typecode == 'I':
+            self.offsets = array('Q', self.offsets)
+        self.offsets.append(end)
+
+    def nbytes(self):
+        # getsizeof reports the allocated buffers, including over-allocation
+        return sys.getsizeof(self.blob) + sys.getsizeof(self.offsets)
+
+
+class CsvTable:
+    """Columnar table backing CSV_DATA_CACHE entries.
+
+    Holds the header once and one CsvColumn per field instead of a dict per row.
+    Indexing and slicing return row dicts so templates can keep using row.get(col).
+    """
+
+    def __init__(self, columns, column_stores=None):
+        self.columns = list(columns)
+        self.column_stores = column_stores if column_stores is not None else [CsvColumn() for _ in self.columns]
+        self._num_rows = len(self.column_stores[0]) if self.column_stores else 0
+
+    def __len__(self):
+        return self._num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return [self.row_dict(i) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('CSV row index out of range')
+        return self.row_dict(index)
+
+    def append_row(self, values):
+        """Append one parsed row, padding or truncating it to the header width"""
+        num_values = len(values)
+        for col_idx, store in enumerate(self.column_stores):
+            store.append(values[col_idx] if col_idx < num_values else '')
+        self._num_rows += 1
+
+    def cell(self, row_idx, col_idx):
+        return self.column_stores[col_idx][row_idx]
+
+    def row_values(self, row_idx):
+        return [store[row_idx] for store in self.column_stores]
+
+    def row_dict(self, row_idx):
+        return dict(zip(self.columns, self.row_values(row_idx)))
+
+    def iter_rows(self, start=0, stop=None):
+        """Yield rows as lists of values without materializing the table"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for row_idx in range(start, stop):
+            yield self.row_values(row_idx)
+
+    def nbytes(self):
+        return sum(store.nbytes() for store in self.column_stores)
+
+
+def csv_entry_nbytes(entry):
+    """Approximate memory held by a CSV_DATA_CACHE entry"""
+    data = entry.get('data')
+    data_bytes = data.nbytes() if hasattr(data, 'nbytes') else sys.getsizeof(data)
+    return data_bytes + sys.getsizeof(entry)
+
+
+class CsvDataCache:
+    """Memory-bounded cache of parsed CSV datasets with LRU and idle-TTL eviction.
+
+    Behaves like the dict it replaces (get, [], in, keys) and keeps hit/miss/eviction
+    counters. Recently evicted keys are remembered so callers can ask for a reload.
+    on_evict, if set, is called with each evicted cache_key (cache lock held).
+    """
+
+    def __init__(self, max_bytes, ttl_seconds, evicted_history=1024):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = None
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # cache_key -> [entry, nbytes, last_access], least recent first
+        self._evicted = OrderedDict()  # cache_key -> eviction time
+        self._evicted_history = evicted_history
+        self._lock = threading.RLock()
+
+    def __setitem__(self, cache_key, entry):
+        nbytes = csv_entry_nbytes(entry)
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = [entry, nbytes, time.monotonic()]
+            self.total_bytes += nbytes
+            self._evicted.pop(cache_key, None)
+            self._evict_expired()
+            self._evict_over_budget(keep=cache_key)
+
+    def __getitem__(self, cache_key):
+        entry = self.get(cache_key)
+        if entry is None:
+            raise KeyError(cache_key)
+        return entry
+
+    def __contains__(self, cache_key):
+        with self._lock:
+            self._evict_expired()
+            return cache_key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, cache_key, default=None):
+        with self._lock:
+            self._evict_expired()
+            item = self._entries.get(cache_key)
+            if item is None:
+                self.misses += 1
+                return default
+            item[2] = time.monotonic()
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return item[0]
+
+    def pop(self, cache_key, default=None):
+        with self._lock:
+            if cache_key not in self._entries:
+                return default
+            return self._remove(cache_key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def was_evicted(self, cache_key):
+        """True if cache_key was dropped to stay within the memory budget or TTL"""
+        with self._lock:
+            return cache_key in self._evicted
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _remove(self, cache_key):
+        entry, nbytes, _ = self._entries.pop(cache_key)
+        self.total_bytes -= nbytes
+        return entry
+
+    def _evict(self, cache_key):
+        self._remove(cache_key)
+        self.evictions += 1
+        self._evicted[cache_key] = time.time()
+        while len(self._evicted) > self._evicted_history:
+            self._evicted.popitem(last=False)
+        if self.on_evict is not None:
+            self.on_evict(cache_key)
+        print(f"DEBUG: Evicted CSV cache entry {cache_key} ({self.total_bytes} bytes still cached)")
+
+    def _evict_expired(self):
+        # Entries are kept in access order, so expired ones are always at the front
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._entries:
+            cache_key, item = next(iter(self._entries.items()))
+            if item[2] > deadline:
+                break
+            self._evict(cache_key)
+
+    def _evict_over_budget(self, keep=None):
+        # Never evict the entry that was just stored, even if it alone exceeds the budget
+        for cache_key in list(self._entries.keys()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if cache_key != keep:
+                self._evict(cache_key)
+
+
+CSV_DATA_CACHE = CsvDataCache(CSV_CACHE_MAX_BYTES, CSV_CACHE_TTL_SECONDS)  # Parsed CsvTable per cache_key
+
+
+class DatasetStore:
+    """Persists parsed CSV tables to disk so any worker can memory-map them.
+
+    Layout per cache_key directory:
+      meta.json    - cache entry fields (columns, filename, delimiter, ...)
+      offsets.npy  - (num_columns, num_rows + 1) array of absolute offsets into cells.bin
+      cells.bin    - UTF-8 cell bytes, column after column
+    Indexed datasets (IndexedCsvFile) instead keep the raw source.csv plus rows.npy,
+    the byte offset of every stride-th row. Sharded datasets (ShardedCsvTable) only hold
+    meta.json, listing the datasets of their shards.
+    Loaded tables share the OS page cache between workers instead of each holding a copy.
+    A dataset still loading in the background is served from <cache_key>.preview meanwhile.
+    """
+
+    CACHE_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+    SOURCE_FILE = 'source.csv'
+    URL_CACHE_DIR = 'url_cache'  # Reserved for UrlCache, never a dataset
+    JOBS_DIR = 'jobs'  # Reserved for the CodeRunManager spools
+    PREVIEW_SUFFIX = '.preview'
+
+    def __init__(self, root, ttl_seconds, purge_interval=600):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._meta_lock = threading.Lock()  # Loader threads and their heartbeats update the same meta
+
+    def path(self, cache_key):
+        if (not cache_key or not self.CACHE_KEY_PATTERN.match(cache_key) or cache_key.startswith('.')
+                or cache_key in (self.URL_CACHE_DIR, self.JOBS_DIR)):
+            raise ValueError(f"Invalid cache key: {cache_key!r}")
+        return os.path.join(self.root, cache_key)
+
+    def exists(self, cache_key):
+        try:
+            return os.path.isfile(os.path.join(self.path(cache_key), 'meta.json'))
+        except ValueError:
+            return False
+
+    def staging_dir(self, cache_key):
+        """Private directory a dataset is assembled in before save() publishes it"""
+        self.path(cache_key)
+        tmp_dir = os.path.join(self.root, f".tmp-{cache_key}-{os.getpid()}")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return tmp_dir
+
+    @classmethod
+    def preview_key(cls, cache_key):
+        return f"{cache_key}{cls.PREVIEW_SUFFIX}"
+
+    def save(self, cache_key, entry, journal_source=None):
+        """Write entry['data'] (a CsvTable, staged IndexedCsvFile or ShardedCsvTable of saved shards) to disk atomically.
+
+        journal_source is an edit journal to hard-link into the new dataset, so edits made
+        on its preview (and any still being appended to it) carry over.
+        """
+        table = entry['data']
+        target = self.path(cache_key)
+        tmp_dir = self.staging_dir(cache_key)
+        meta = {k: v for k, v in entry.items() if k != 'data'}
+        meta['num_rows'] = len(table)
+        try:
+            if isinstance(table, IndexedCsvFile):
+                np.save(os.path.join(tmp_dir, 'rows.npy'), np.frombuffer(table.row_offsets, dtype=np.uint64))
+                meta.update(kind='indexed', stride=table.stride, encoding=table.encoding, detected_delimiter=table.delimiter)
+            elif isinstance(table, ShardedCsvTable):
+                meta.update(kind='sharded', shards=table.shard_keys)
+            else:
+                self._save_columns(tmp_dir, table)
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            if journal_source is not None:
+                os.link(journal_source, os.path.join(tmp_dir, CsvEditJournal.FILE_NAME))
+            os.replace(tmp_dir, target)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.purge_expired()
+
+    def update_meta(self, cache_key, **fields):
+        """Atomically merge fields into a saved dataset's meta.json"""
+        path = os.path.join(self.path(cache_key), 'meta.json')
+        with self._meta_lock:
+            with open(path) as f:
+                meta = json.load(f)
+            meta.update(fields)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, path)
+
+    def _save_columns(self, tmp_dir, table):
+        total_bytes = sum(len(store.blob) for store in table.column_stores)
+        dtype = np.uint64 if total_bytes > 0xFFFFFFFF else np.uint32
+        offsets = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'offsets.npy'), mode='w+', dtype=dtype,
+            shape=(len(table.column_stores), len(table) + 1)
+        )
+        base = 0
+        with open(os.path.join(tmp_dir, 'cells.bin'), 'wb') as cells:
+            for col_idx, store in enumerate(table.column_stores):
+                column_offsets = np.frombuffer(store.offsets, dtype=f"u{store.offsets.itemsize}")
+                offsets[col_idx] = column_offsets.astype(dtype) + dtype(base)
+                cells.write(store.blob)
+                base += len(store.blob)
+        offsets.flush()
+        del offsets
+
+    def load(self, cache_key):
+        """Return a cache entry whose table is memory-mapped from disk, or None"""
+        if not self.exists(cache_key):
+            return None
+        target = self.path(cache_key)
+        try:
+            with open(os.path.join(target, 'meta.json')) as f:
+                meta = json.load(f)
+            if meta.get('kind') == 'indexed':
+                return self._load_indexed(cache_key, meta)
+            if meta.get('kind') == 'sharded':
+                return self._load_sharded(cache_key, meta)
+            offsets = np.load(os.path.join(target, 'offsets.npy'), mmap_mode='r')
+            cells_path = os.path.join(target, 'cells.bin')
+            if os.path.getsize(cells_path):
+                with open(cells_path, 'rb') as f:
+                    cells = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                cells = b''
+            # Keep actively used datasets from being purged
+            os.utime(target)
+        except (OSError, ValueError) as e:
+            print(f"DEBUG: Could not load dataset {cache_key}: {e}")
+            return None
+
+        column_stores = [CsvColumn(offsets[col_idx], cells) for col_idx in range(offsets.shape[0])]
+        entry = {k: v for k, v in meta.items() if k != 'num_rows'}
+        entry['data'] = CsvTable(meta['columns'], column_stores)
+        return entry
+
+    def _load_indexed(self, cache_key, meta):
+        target = self.path(cache_key)
+        row_offsets = np.load(os.path.join(target, 'rows.npy'), mmap_mode='r') if meta['num_rows'] else array('Q')
+        os.utime(target)
+        entry = {k: v for k, v in meta.items() if k not in ('num_rows', 'kind', 'stride')}
+        entry['data'] = IndexedCsvFile(
+            os.path.join(target, self.SOURCE_FILE), meta['columns'], row_offsets, meta['num_rows'],
+            meta['encoding'], meta['detected_delimiter'], meta['stride']
+        )
+        return entry
+
+    def _load_sharded(self, cache_key, meta):
+        shards = [self.load(shard_key) for shard_key in meta['shards']]
+        if any(shard is None for shard in shards):
+            print(f"DEBUG: Dataset {cache_key} is missing some of its shards")
+            return None
+        os.utime(self.path(cache_key))
+        entry = {k: v for k, v in meta.items() if k not in ('num_rows', 'kind', 'shards')}
+        entry['data'] = ShardedCsvTable(meta['columns'], meta['shards'], [shard['data'] for shard in shards])
+        return entry
+
+    def clone(self, source_key, cache_key):
+        """Publish an existing dataset under a new cache_key by hard-linking its files.
+
+        The clone starts without the source's edit journal, so it opens as a pristine copy.
+        """
+        source = self.path(source_key)
+        tmp_dir = self.staging_dir(cache_key)
+        try:
+            for name in os.listdir(source):
+                if name == CsvEditJournal.FILE_NAME:
+                    continue
+                try:
+                    os.link(os.path.join(source, name), os.path.join(tmp_dir, name))
+                except OSError:
+                    # Filesystem without hard links
+                    shutil.copy2(os.path.join(source, name), os.path.join(tmp_dir, name))
+            os.replace(tmp_dir, self.path(cache_key))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        os.utime(source)
+
+    def purge_expired(self):
+        """Delete datasets that have not been used for ttl_seconds"""
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            if name in (self.URL_CACHE_DIR, self.JOBS_DIR):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+
+DATASET_STORE = DatasetStore(DATASET_DIR, DATASET_TTL_SECONDS)
+
+
+def publish_csv_entry(cache_key, entry, journal_source=None):
+    """Persist a freshly parsed entry to the shared store and cache the memory-mapped copy"""
+    try:
+        DATASET_STORE.save(cache_key, entry, journal_source)
+        mapped_entry = DATASET_STORE.load(cache_key)
+        if mapped_entry is not None:
+            entry = mapped_entry
+    except Exception as e:
+        # Fall back to serving from this worker's memory only
+        print(f"DEBUG: Could not persist dataset {cache_key}: {e}")
+    CSV_DATA_CACHE[cache_key] = entry
+    return entry
+
+
+def get_csv_entry(cache_key):
+    """Look up a CSV entry in this worker's cache, falling back to the shared dataset store"""
+    if not cache_key:
+        return None
+    entry = CSV_DATA_CACHE.get(cache_key)
+    if entry is None:
+        entry = DATASET_STORE.load(cache_key)
+        if entry is not None:
+            CSV_DATA_CACHE[cache_key] = entry
+        elif DATASET_STORE.exists(DATASET_STORE.preview_key(cache_key)):
+            # Still loading in the background; not cached, so the full table is picked up once published
+            entry = DATASET_STORE.load(DATASET_STORE.preview_key(cache_key))
+            if entry is not None:
+                check_background_load(entry)
+    return entry
+
+
+def start_load_heartbeat(preview_key):
+    """Refresh a preview's loader_heartbeat until the returned event is set"""
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(S3_LOAD_HEARTBEAT_SECONDS):
+            try:
+                DATASET_STORE.update_meta(preview_key, loader_heartbeat=time.time())
+            except (OSError, ValueError):
+                return  # Preview already purged
+
+    threading.Thread(target=beat, daemon=True).start()
+    return stopped
+
+
+def check_background_load(entry):
+    """Report a preview whose loader stopped sending heartbeats (its worker died) as a failed load"""
+    heartbeat = entry.get('loader_heartbeat')
+    if (entry.get('loading') and not entry.get('load_error') and heartbeat is not None
+            and time.time() - heartbeat > S3_LOAD_STALE_SECONDS):
+        entry['load_error'] = "the worker loading it stopped"
+    return entry
+
+
+class CsvEditJournal:
+    """Append-only log of cell edits per dataset, shared by all workers.
+
+    Each line of <dataset>/edits.jsonl is one batch of deltas {"row,col": value};
+    a null value reverts the cell to its original. Every worker keeps the replayed
+    edits plus the byte offset it has read up to, so an update only costs the delta.
+    """
+
+    FILE_NAME = 'edits.jsonl'
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._states = {}  # cache_key -> [bytes_read, edits]
+
+    def _path(self, cache_key):
+        path = self.store.path(cache_key)
+        if not os.path.isdir(path):
+            # Still loading: edits go to the preview's journal, which the full dataset links to
+            preview = self.store.path(self.store.preview_key(cache_key))
+            if os.path.isdir(preview):
+                path = preview
+        return os.path.join(path, self.FILE_NAME)
+
+    def _catch_up(self, cache_key):
+        """Replay lines appended since this worker last read the journal (lock held)"""
+        path = self._path(cache_key)
+        state = self._states.get(cache_key)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if state is None or size < state[0]:
+            # First read, or the journal was purged and started over
+            state = self._states[cache_key] = [0, {}]
+        if size == state[0]:
+            return state[1]
+
+        with open(path, 'rb') as f:
+            f.seek(state[0])
+            chunk = f.read(size - state[0])
+        # Leave a partially written last line for the next read
+        complete = chunk[:chunk.rfind(b'\n') + 1]
+        for line in complete.splitlines():
+            try:
+                delta = json.loads(line)
+            except ValueError:
+                continue
+            apply_edit_delta(state[1], delta)
+        state[0] += len(complete)
+        return state[1]
+
+    def append(self, cache_key, delta):
+        """Record a batch of cell deltas and return the number of edited cells"""
+        path = self._path(cache_key)
+        line = (json.dumps(delta, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # O_APPEND keeps concurrent single-line writes from different workers intact
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            return len(self._catch_up(cache_key))
+
+    def edits(self, cache_key):
+        """Current {"row,col": value} map for a dataset"""
+        if not cache_key:
+            return {}
+        with self._lock:
+            try:
+                return dict(self._catch_up(cache_key))
+            except (OSError, ValueError) as e:
+                print(f"DEBUG: Could not read edit journal for {cache_key}: {e}")
+                return {}
+
+    def forget(self, cache_key):
+        """Drop this worker's replayed copy (the journal file stays on disk)"""
+        with self._lock:
+            self._states.pop(cache_key, None)
+
+
+def apply_edit_delta(edits, delta):
+    """Apply {"row,col": value|None} deltas to an edits map in place"""
+    for key, value in delta.items():
+        if value is None:
+            edits.pop(key, None)
+        else:
+            edits[key] = value
+
+
+def parse_edit_delta(changes):
+    """Validate client-sent cell deltas, returning a clean {"row,col": str|None} dict"""
+    if not isinstance(changes, dict):
+        raise ValueError("changes must be an object")
+    delta = {}
+    for key, value in changes.items():
+        try:
+            row_idx, col_idx = (int(part) for part in str(key).split(','))
+        except ValueError:
+            raise ValueError(f"Invalid cell key: {key!r}")
+        if row_idx < 0 or col_idx < 0:
+            raise ValueError(f"Invalid cell key: {key!r}")
+        delta[f"{row_idx},{col_idx}"] = None if value is None else str(value)
+    return delta
+
+
+CSV_EDIT_JOURNAL = CsvEditJournal(DATASET_STORE)
+CSV_DATA_CACHE.on_evict = CSV_EDIT_JOURNAL.forget  # Replayed edits are dropped with the table
+
+
+class UrlCache:
+    """Remembers viewed URLs with their ETag/Last-Modified so re-opens can revalidate.
+
+    <root>/<sha256(url)>.json holds the validators plus the cache_key of the parsed dataset
+    (CSV), the RawFileStore handle of a large raw body, or for small raw views the decoded
+    text in <sha256(url)>.txt. When the origin answers
+    a conditional GET with 304 the stored result is reused instead of downloading again.
+    """
+
+    def __init__(self, root, store, ttl_seconds, purge_interval=600):
+        self.root = root
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    def _path(self, url, ext):
+        return os.path.join(self.root, hashlib.sha256(url.encode('utf-8')).hexdigest() + ext)
+
+    @staticmethod
+    def validators(response):
+        """ETag/Last-Modified of a response, or None if it cannot be revalidated or must not be stored"""
+        if 'no-store' in response.headers.get('cache-control', '').lower():
+            return None
+        validators = {
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+        }
+        return validators if any(validators.values()) else None
+
+    def lookup(self, url):
+        """Stored entry for url if what it points to still exists, else None"""
+        try:
+            with open(self._path(url, '.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url:
+            return None
+        if meta.get('kind') == 'csv' and not self.store.exists(meta.get('cache_key')):
+            return None
+        if meta.get('kind') == 'raw' and not os.path.isfile(self._path(url, '.txt')):
+            return None
+        if meta.get('kind') == 'raw_handle' and not self.store.exists(meta.get('handle')):
+            return None
+        return meta
+
+    @staticmethod
+    def conditional_headers(meta):
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def touch(self, url):
+        for ext in ('.json', '.txt'):
+            try:
+                os.utime(self._path(url, ext))
+            except OSError:
+                pass
+
+    def _write_meta(self, url, meta):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(url, '.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+        self.purge_expired()
+
+    def put_dataset(self, url, validators, cache_key, filename):
+        self._write_meta(url, dict(validators, url=url, kind='csv', cache_key=cache_key, filename=filename))
+
+    def put_text(self, url, validators, filename, text):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(url, '.txt')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self._write_meta(url, dict(validators, url=url, kind='raw', filename=filename))
+
+    def put_handle(self, url, validators, handle, filename):
+        """Large raw bodies are remembered by their RawFileStore handle instead of a text copy"""
+        self._write_meta(url, dict(validators, url=url, kind='raw_handle', handle=handle, filename=filename))
+
+    def read_text(self, url):
+        with open(self._path(url, '.txt'), encoding='utf-8') as f:
+            return f.read()
+
+    def purge_expired(self):
+        """Delete entries that have not been revalidated for ttl_seconds"""
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+class RawFileStore:
+    """Raw (non-CSV) bodies kept on disk so the editor can page through them by line.
+
+    Each handle is a DatasetStore directory (so the dataset TTL purge applies) holding:
+      content      - the body, transcoded to UTF-8
+      lines.npy    - byte offset of every RAW_LINE_STRIDE-th line
+      meta.json    - filename, size, num_lines, ...
+      edits.jsonl  - append-only journal of line-range patches made in the editor
+    Every worker replays the journal into a RawDocument (piece table) on demand and keeps
+    the max_documents most recently used ones for up to ttl_seconds; an evicted document
+    is simply replayed again.
+    """
+
+    CONTENT_FILE = 'content'
+
+    def __init__(self, store, max_documents, ttl_seconds):
+        self.store = store
+        self.max_documents = max_documents
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._documents = OrderedDict()  # handle -> [bytes_read, RawDocument, last_access], least recent first
+
+    def content_path(self, handle):
+        return os.path.join(self.store.path(handle), self.CONTENT_FILE)
+
+    def save(self, stream, filename, actual_file_path):
+        """Copy a binary stream to a new handle; returns (handle, meta)"""
+        handle = f"raw_{uuid.uuid4().hex}"
+        tmp_dir = self.store.staging_dir(handle)
+        content_path = os.path.join(tmp_dir, self.CONTENT_FILE)
+        try:
+            sample = stream.read(CSV_SNIFF_BYTES) or b''
+            encoding = detect_encoding(sample)
+            with open(content_path, 'wb') as f:
+                if encoding == 'utf-8':
+                    f.write(sample)
+                    shutil.copyfileobj(stream, f, CSV_CHUNK_BYTES)
+                else:
+                    # Store plain UTF-8 (no BOM) so lines can always be cut at b'\n'
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                    f.write(decoder.decode(sample).encode('utf-8'))
+                    for chunk in iter(lambda: stream.read(CSV_CHUNK_BYTES), b''):
+                        f.write(decoder.decode(chunk).encode('utf-8'))
+                    f.write(decoder.decode(b'', final=True).encode('utf-8'))
+                size = f.tell()
+            checkpoints, num_lines = build_line_index(content_path)
+            np.save(os.path.join(tmp_dir, 'lines.npy'), np.frombuffer(checkpoints, dtype=np.uint64))
+            meta = {
+                'kind': 'raw',
+                'filename': filename,
+                'actual_file_path': actual_file_path,
+                'encoding': encoding,
+                'size': size,
+                'num_lines': num_lines,
+                'stride': RAW_LINE_STRIDE,
+            }
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_dir, self.store.path(handle))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.store.purge_expired()
+        return handle, meta
+
+    def save_text(self, text, filename, actual_file_path):
+        """Store text the editor already holds in full, with '\n' line endings as the editor sees it"""
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return self.save(io.BytesIO(text.encode('utf-8')), filename, actual_file_path)
+
+    def meta(self, handle):
+        """meta.json of a raw handle, or None if it does not exist (or is not a raw body)"""
+        try:
+            with open(os.path.join(self.store.path(handle), 'meta.json')) as f:
+                meta = json.load(f)
+            # Keep files that are being viewed from being purged
+            os.utime(self.store.path(handle))
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('kind') == 'raw' else None
+
+    def read_text(self, handle):
+        with open(self.content_path(handle), 'rb') as f:
+            return f.read().decode('utf-8', errors='replace')
+
+    def _journal_path(self, handle):
+        return os.path.join(self.store.path(handle), CsvEditJournal.FILE_NAME)
+
+    def _catch_up(self, handle):
+        """This worker's RawDocument for handle with all journaled patches applied (lock held)"""
+        path = self._journal_path(handle)
+        state = self._documents.get(handle)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if state is None or size < state[0]:
+            meta = self.meta(handle)
+            if meta is None:
+                raise KeyError(handle)
+            checkpoints = np.load(os.path.join(self.store.path(handle), 'lines.npy'), mmap_mode='r')
+            document = RawDocument(self.content_path(handle), checkpoints, meta['num_lines'], meta['stride'])
+            state = self._documents[handle] = [0, document, 0]
+        state[2] = time.monotonic()
+        self._documents.move_to_end(handle)
+        self._evict_documents()
+        if size > state[0]:
+            with open(path, 'rb') as f:
+                f.seek(state[0])
+                chunk = f.read(size - state[0])
+            complete = chunk[:chunk.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                patch = json.loads(line)
+                state[1].replace(patch['start'], patch['end'], patch['text'])
+            state[0] += len(complete)
+        return state[1]
+
+    def _evict_documents(self):
+        # Least recently used first; the document just used is last and always kept
+        deadline = time.monotonic() - self.ttl_seconds
+        while len(self._documents) > 1:
+            handle, state = next(iter(self._documents.items()))
+            if len(self._documents) <= self.max_documents and state[2] > deadline:
+                break
+            del self._documents[handle]
+
+    def document(self, handle):
+        """Snapshot of a handle's working copy (base file plus patches); KeyError if it is gone.
+
+        Later patches do not change the snapshot, so it can be read without the lock.
+        """
+        with self._lock:
+            return self._catch_up(handle).snapshot()
+
+    def apply_patch(self, handle, start, end, text, version):
+        """Replace lines [start, end) with text if the client saw the latest version.
+
+        Returns the new (version, num_lines); raises RawVersionConflict if another edit
+        got in first. The journal is locked across workers while the patch is appended.
+        """
+        path = self._journal_path(handle)
+        with self._lock:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                document = self._catch_up(handle)
+                if version != document.version:
+                    raise RawVersionConflict(f"File changed on the server (version {document.version}, edit was based on {version})")
+                if not 0 <= start <= end <= document.num_lines:
+                    raise ValueError(f"Invalid line range [{start}, {end}) for {document.num_lines} lines")
+                os.write(fd, (json.dumps({'start': start, 'end': end, 'text': text}) + '\n').encode('utf-8'))
+            finally:
+                os.close(fd)  # also releases the flock
+            document = self._catch_up(handle)
+            return document.version, document.num_lines
+
+
+class RawVersionConflict(ValueError):
+    """A raw-editor patch was based on an outdated version of the file"""
+
+
+def split_raw_lines(text):
+    """Lines of text keeping their '\n'; only '\n' ends a line, as in the editor and the line index"""
+    lines = text.split('\n')
+    last = lines.pop()
+    return [line + '\n' for line in lines] + ([last] if last else [])
+
+
+def build_line_index(path, stride=RAW_LINE_STRIDE):
+    """One pass over a file: byte offset of every stride-th line start, plus the line count"""
+    checkpoints = array('Q', [0])
+    newlines = 0
+    position = 0
+    last_byte = b'\n'
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CSV_CHUNK_BYTES), b''):
+            positions = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+            # Line k*stride starts right after newline number k*stride (1-based)
+            first = (stride - (newlines + 1) % stride) % stride
+            checkpoints.extend(int(p) + position + 1 for p in positions[first::stride])
+            newlines += len(positions)
+            position += len(chunk)
+            last_byte = chunk[-1:]
+    num_lines = newlines + (0 if last_byte == b'\n' else 1)
+    # A file ending in '\n' has no line starting at EOF
+    while len(checkpoints) > 1 and (len(checkpoints) - 1) * stride >= num_lines:
+        checkpoints.pop()
+    return checkpoints, num_lines
+
+
+class RawDocument:
+    """Working copy of a raw file as a piece table over its lines.
+
+    Pieces are ('base', a, b) for lines [a, b) of the untouched file, or ('text', lines)
+    for replacement text; lines keep their '\n'. Only the last line of the document may
+    lack one, so line numbers stay exact and unedited ranges stream straight from disk.
+    """
+
+    def __init__(self, path, checkpoints, base_lines, stride=RAW_LINE_STRIDE):
+        self.path = path
+        self.checkpoints = checkpoints
+        self.stride = stride
+        self.base_lines = base_lines
+        self.pieces = [('base', 0, base_lines)] if base_lines else []
+        self.num_lines = base_lines
+        self.version = 0
+
+    @staticmethod
+    def _piece_len(piece):
+        return piece[2] - piece[1] if piece[0] == 'base' else len(piece[1])
+
+    def _seek_line(self, f, line):
+        """Position f at the start of base line `line` (EOF when line == base_lines)"""
+        if line >= self.base_lines:
+            f.seek(0, os.SEEK_END)
+            return
+        f.seek(int(self.checkpoints[line // self.stride]))
+        for _ in range(line % self.stride):
+            f.readline()
+
+    def _base_lines(self, start, end):
+        with open(self.path, 'rb') as f:
+            self._seek_line(f, start)
+            return [f.readline().decode('utf-8', errors='replace') for _ in range(end - start)]
+
+    def _first_line(self, piece):
+        return self._base_lines(piece[1], piece[1] + 1)[0] if piece[0] == 'base' else piece[1][0]
+
+    def _last_line(self, piece):
+        return self._base_lines(piece[2] - 1, piece[2])[0] if piece[0] == 'base' else piece[1][-1]
+
+    def _split(self, line):
+        """Index of the piece starting at document line `line`, splitting a piece if needed"""
+        position = 0
+        for i, piece in enumerate(self.pieces):
+            length = self._piece_len(piece)
+            if line == position:
+                return i
+            if line < position + length:
+                k = line - position
+                if piece[0] == 'base':
+                    parts = [('base', piece[1], piece[1] + k), ('base', piece[1] + k, piece[2])]
+                else:
+                    parts = [('text', piece[1][:k]), ('text', piece[1][k:])]
+                self.pieces[i:i + 1] = parts
+                return i + 1
+            position += length
+        return len(self.pieces)
+
+    def _normalize(self):
+        """Join any unterminated last line of a piece with the first line of the next piece"""
+        pieces = [piece for piece in self.pieces if self._piece_len(piece)]
+        i = 0
+        while i < len(pieces) - 1:
+            piece, following = pieces[i], pieces[i + 1]
+            last = self._last_line(piece)
+            if last.endswith('\n'):
+                i += 1
+                continue
+            joined = last + self._first_line(following)
+            if following[0] == 'base':
+                pieces[i + 1] = ('base', following[1] + 1, following[2])
+            else:
+                pieces[i + 1] = ('text', following[1][1:])
+            if not self._piece_len(pieces[i + 1]):
+                del pieces[i + 1]
+            if piece[0] == 'base':
+                pieces[i:i + 1] = [('base', piece[1], piece[2] - 1), ('text', [joined])]
+                i += 1
+            else:
+                pieces[i] = ('text', piece[1][:-1] + [joined])
+        self.pieces = [piece for piece in pieces if self._piece_len(piece)]
+
+    def snapshot(self):
+        """Copy sharing the base file; only the (small) piece list is copied"""
+        copy = RawDocument(self.path, self.checkpoints, self.base_lines, self.stride)
+        copy.pieces = list(self.pieces)
+        copy.num_lines = self.num_lines
+        copy.version = self.version
+        return copy
+
+    def replace(self, start, end, text):
+        """Replace document lines [start, end) with text"""
+        lines = split_raw_lines(text)
+        i = self._split(start)
+        j = self._split(end)
+        self.pieces[i:j] = [('text', lines)] if lines else []
+        self._normalize()
+        self.num_lines = sum(self._piece_len(piece) for piece in self.pieces)
+        self.version += 1
+
+    def read_lines(self, start, end, max_bytes=None):
+        """Lines [start, end) of the working copy, stopping early once max_bytes of text is reached"""
+        result = []
+        size = 0
+        position = 0
+        for piece in self.pieces:
+            if position >= end:
+                break
+            length = self._piece_len(piece)
+            lo, hi = max(start, position), min(end, position + length)
+            if lo < hi:
+                k = lo - position
+                if piece[0] == 'base':
+                    lines = self._base_lines(piece[1] + k, piece[1] + k + hi - lo)
+                else:
+                    lines = piece[1][k:k + hi - lo]
+                for line in lines:
+                    if max_bytes is not None and result and size + len(line) > max_bytes:
+                        return result
+                    result.append(line)
+                    size += len(line)
+            position += length
+        return result
+
+    def iter_bytes(self, chunk_bytes=CSV_DOWNLOAD_CHUNK_BYTES):
+        """Stream the working copy; untouched line ranges are copied from the base file as bytes"""
+        for piece in list(self.pieces):
+            if piece[0] == 'text':
+                data = ''.join(piece[1]).encode('utf-8')
+                for i in range(0, len(data), chunk_bytes):
+                    yield data[i:i + chunk_bytes]
+                continue
+            with open(self.path, 'rb') as f:
+                self._seek_line(f, piece[2])
+                end_offset = f.tell()
+                self._seek_line(f, piece[1])
+                remaining = end_offset - f.tell()
+                while remaining > 0:
+                    chunk = f.read(min(chunk_bytes, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+
+RAW_STORE = RawFileStore(DATASET_STORE, RAW_DOCUMENT_CACHE_SIZE, CSV_CACHE_TTL_SECONDS)
+
+
+URL_CACHE = UrlCache(os.path.join(DATASET_DIR, DatasetStore.URL_CACHE_DIR), DATASET_STORE, DATASET_TTL_SECONDS)
+
+
+# Compressed download formats: name -> (filename suffix, mimetype)
+DOWNLOAD_COMPRESSIONS = {
+    'gzip': ('.gz', 'application/gzip'),
+    'zstd': ('.zst', 'application/zstd'),
+}
+
+
+@app.template_global()
+def available_download_compressions():
+    """Compression formats this server can produce ('zstd' needs the zstandard package)"""
+    return [name for name in DOWNLOAD_COMPRESSIONS if name != 'zstd' or zstandard is not None]
+
+
+def iter_compressed(chunks, compression):
+    """Compress a stream of byte chunks incrementally, never holding the whole payload"""
+    if compression == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header/trailer
+    elif compression == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_for_upload(chunks, s3_path, compression, content_type):
+    """Compress chunks for an S3 upload; .gz paths are gzipped unless a compression is chosen.
+
+    Returns (chunks, content_type).
+    """
+    compression = (compression or '').strip().lower()
+    if not compression and s3_path.lower().endswith('.gz'):
+        compression = 'gzip'
+    if compression in ('', 'none'):
+        return chunks, content_type
+    if compression not in available_download_compressions():
+        raise ValueError(f"Unsupported compression: {compression}")
+    return iter_compressed(chunks, compression), DOWNLOAD_COMPRESSIONS[compression][1]
+
+
+def download_response(chunks, filename, mimetype, compression=''):
+    """Streaming attachment response, optionally compressed with gzip or zstd"""
+    compression = (compression or '').strip().lower()
+    if compression in ('', 'none'):
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+    else:
+        if compression not in available_download_compressions():
+            raise ValueError(f"Unsupported compression: {compression}")
+        suffix, mimetype = DOWNLOAD_COMPRESSIONS[compression]
+        if not filename.lower().endswith(suffix):
+            filename = f"{filename}{suffix}"
+        response = Response(stream_with_context(iter_compressed(chunks, compression)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def iter_csv_download(table, columns, row_edits, delimiter=',', chunk_bytes=CSV_DOWNLOAD_CHUNK_BYTES):
+    """Yield the table as UTF-8 CSV chunks, overlaying {row: {col: value}} edits on the fly.
+
+    Only one chunk of output is held in memory and the cached table is never modified.
+    """
+    buffer = io.StringIO()
+    # Created up front so an invalid delimiter fails before the response starts
+    writer = csv.writer(buffer, delimiter=delimiter)
+
+    def chunks():
+        writer.writerow(columns)
+        for row_idx, values in enumerate(table.iter_rows()):
+            overlay = row_edits.get(row_idx)
+            if overlay:
+                for col_idx, new_value in overlay.items():
+                    values[col_idx] = new_value
+            writer.writerow(values)
+            if buffer.tell() >= chunk_bytes:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    return chunks()
+
+
+class PrefixedStream(io.RawIOBase):
+    """Binary stream that replays already-sniffed bytes before the rest of the source."""
+
+    def __init__(self, prefix, stream):
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Guess the text encoding of a byte sample (BOM, then strict UTF-8, then cp1252/latin-1)"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith(codecs.BOM_UTF16_LE) or sample.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+    for encoding in ('utf-8', 'cp1252'):
+        try:
+            # Incremental decode so a multi-byte character cut at the sample end is not an error
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def sniff_delimiter(text_sample: str, default: str = ',') -> str:
+    """Detect the CSV delimiter from a text sample"""
+    # Only sniff complete lines; the sample usually ends mid-record
+    if '\n' in text_sample:
+        text_sample = text_sample[:text_sample.rindex('\n')].rstrip('\r')
+    if not text_sample.strip():
+        return default
+    try:
+        return csv.Sniffer().sniff(text_sample, delimiters=CSV_CANDIDATE_DELIMITERS).delimiter
+    except csv.Error:
+        return default
+
+
+def open_csv_reader(stream):
+    """Wrap a binary stream in an RFC-4180 csv.reader, sniffing encoding and delimiter.
+
+    Returns (reader, encoding, delimiter). Only one chunk of the source is buffered at a time.
+    """
+    csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+    sample = stream.read(CSV_SNIFF_BYTES) or b''
+    encoding = detect_encoding(sample)
+    delimiter = sniff_delimiter(sample.decode(encoding, errors='ignore'))
+    text_stream = io.TextIOWrapper(
+        io.BufferedReader(PrefixedStream(sample, stream), buffer_size=CSV_CHUNK_BYTES),
+        encoding=encoding,
+        errors='replace',
+        newline=''
+    )
+    return csv.reader(text_stream, delimiter=delimiter), encoding, delimiter
+
+
+def load_csv_table(stream):
+    """Parse a binary CSV stream chunk-by-chunk into a CsvTable.
+
+    Returns (table, encoding, delimiter); table is None when the stream holds no header row.
+    """
+    reader, encoding, delimiter = open_csv_reader(stream)
+    table = None
+    for record in reader:
+        if not record:
+            # Blank line
+            continue
+        if table is None:
+            table = CsvTable([h.strip() for h in record])
+        else:
+            table.append_row(record)
+    return table, encoding, delimiter
+
+
+def stream_size(stream):
+    """Remaining bytes in a seekable stream, or None if it cannot be measured"""
+    try:
+        position = stream.tell()
+        end = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def is_seekable(stream):
+    """seekable() that also copes with file objects lacking it (e.g. SpooledTemporaryFile before 3.11)"""
+    try:
+        return stream.seekable()
+    except AttributeError:
+        return hasattr(stream, 'seek') and hasattr(stream, 'tell')
+
+
+# Magic numbers of the compressed containers we can ingest
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'PK\x03\x04', 'zip'),
+)
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd', '.zstd': 'zstd', '.zip': 'zip'}
+
+
+def split_compression_suffix(filename):
+    """('data.csv.gz') -> ('data.csv', 'gzip'); ('data.csv') -> ('data.csv', None)"""
+    base, ext = os.path.splitext(filename or '')
+    compression = COMPRESSION_SUFFIXES.get(ext.lower())
+    return (base, compression) if compression else (filename, None)
+
+
+def is_csv_filename(filename):
+    """True for .csv files, optionally compressed, and for .zip archives (searched for a CSV member)"""
+    base, compression = split_compression_suffix(filename)
+    return compression == 'zip' or base.lower().endswith('.csv')
+
+
+def open_decompressed_stream(stream, filename, size=None):
+    """Detect gzip/zstd/zip by magic number and return a streaming decompressed view.
+
+    Returns (stream, filename, compression, size). The filename loses its compression
+    suffix (or becomes the zip member name) and compression is None for plain input.
+    size is the decompressed size when known (zip), otherwise the compressed size,
+    which is a lower bound and still lets huge archives go to the on-disk index.
+    """
+    if is_seekable(stream):
+        position = stream.tell()
+        head = stream.read(4) or b''
+        stream.seek(position)
+    else:
+        head = stream.read(4) or b''
+        stream = io.BufferedReader(PrefixedStream(head, stream), buffer_size=CSV_CHUNK_BYTES)
+
+    compression = next((name for magic, name in COMPRESSION_MAGIC if head.startswith(magic)), None)
+    base, _ = split_compression_suffix(filename)
+    if compression is None:
+        return stream, filename, None, size
+
+    if compression == 'gzip':
+        # GzipFile only needs read(), so the body is inflated as it arrives (multi-member safe)
+        return gzip.GzipFile(fileobj=stream, mode='rb'), base, compression, size
+
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd input requires the zstandard package (pip install zstandard)")
+        reader = zstandard.ZstdDecompressor().stream_reader(stream, read_size=CSV_CHUNK_BYTES, read_across_frames=True)
+        return io.BufferedReader(reader, buffer_size=CSV_CHUNK_BYTES), base, compression, size
+
+    # zip needs random access to its central directory; spool non-seekable sources to disk
+    if not is_seekable(stream):
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(stream, spool, CSV_CHUNK_BYTES)
+        spool.seek(0)
+        stream = spool
+    archive = zipfile.ZipFile(stream)
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    csv_members = [info for info in members if info.filename.lower().endswith('.csv')]
+    if csv_members:
+        member = csv_members[0]
+    elif len(members) == 1:
+        member = members[0]
+    else:
+        raise ValueError("No CSV file found in zip archive")
+    if len(csv_members) > 1:
+        print(f"DEBUG: Zip archive has {len(csv_members)} CSV members, using {member.filename}")
+    return archive.open(member), os.path.basename(member.filename), compression, member.file_size
+
+
+class IndexedCsvFile:
+    """Read-only table over a raw CSV file on disk, paged through a sparse row-offset index.
+
+    row_offsets[i] is the byte offset of row i * stride, so any page is served by seeking
+    to the nearest checkpoint and parsing at most stride + per_page rows. Record boundaries
+    are found by quote parity, which assumes quotes only appear as RFC-4180 field quoting.
+    """
+
+    def __init__(self, path, columns, row_offsets, num_rows, encoding, delimiter, stride=CSV_INDEX_STRIDE):
+        self.path = path
+        self.columns = list(columns)
+        self.row_offsets = row_offsets
+        self.num_rows = num_rows
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.stride = stride
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self.row_dict(i) for i in range(start, stop, step)]
+            return [dict(zip(self.columns, values)) for values in self.iter_rows(start, stop)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('CSV row index out of range')
+        return self.row_dict(index)
+
+    def cell(self, row_idx, col_idx):
+        return self.row_values(row_idx)[col_idx]
+
+    def row_values(self, row_idx):
+        return next(self.iter_rows(row_idx, row_idx + 1))
+
+    def row_dict(self, row_idx):
+        return dict(zip(self.columns, self.row_values(row_idx)))
+
+    def iter_rows(self, start=0, stop=None):
+        """Yield rows [start, stop) as lists by seeking to the closest indexed row"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        checkpoint = start // self.stride
+        width = len(self.columns)
+        # The BOM is already skipped by the recorded offsets
+        encoding = 'utf-8' if self.encoding == 'utf-8-sig' else self.encoding
+        with open(self.path, 'rb') as f:
+            f.seek(int(self.row_offsets[checkpoint]))
+            text_stream = io.TextIOWrapper(f, encoding=encoding, errors='replace', newline='')
+            row_idx = checkpoint * self.stride
+            for record in csv.reader(text_stream, delimiter=self.delimiter):
+                if not record:
+                    continue
+                if row_idx >= stop:
+                    break
+                if row_idx >= start:
+                    yield (record + [''] * (width - len(record)))[:width]
+                row_idx += 1
+
+    def nbytes(self):
+        return sys.getsizeof(self.row_offsets)
+
+    @classmethod
+    def build(cls, path, stride=CSV_INDEX_STRIDE):
+        """Index a CSV file in one pass; returns None if the file cannot be indexed"""
+        csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+        with open(path, 'rb') as f:
+            sample = f.read(CSV_SNIFF_BYTES)
+            encoding = detect_encoding(sample)
+            if encoding == 'utf-16':
+                # Newline and quote bytes are only unambiguous in ASCII-compatible encodings
+                return None
+            delimiter = sniff_delimiter(sample.decode(encoding, errors='ignore'))
+            position = len(codecs.BOM_UTF8) if encoding == 'utf-8-sig' else 0
+            f.seek(position)
+
+            header_span = None
+            row_offsets = array('Q')
+            num_rows = 0
+            in_quotes = False
+            record_start = position
+            blank = False
+            for line in f:
+                if not in_quotes:
+                    record_start = position
+                    blank = line in (b'\n', b'\r\n')
+                position += len(line)
+                if line.count(b'"') % 2:
+                    in_quotes = not in_quotes
+                if in_quotes or blank:
+                    continue
+                if header_span is None:
+                    header_span = (record_start, position)
+                    continue
+                if num_rows % stride == 0:
+                    row_offsets.append(record_start)
+                num_rows += 1
+
+            if header_span is None:
+                return None
+            f.seek(header_span[0])
+            header_text = f.read(header_span[1] - header_span[0]).decode(encoding, errors='replace')
+        header = next(csv.reader(io.StringIO(header_text, newline=''), delimiter=delimiter))
+        return cls(path, [h.strip() for h in header], row_offsets, num_rows, encoding, delimiter, stride)
+
+
+class ShardedCsvTable:
+    """Read-only table concatenating per-shard datasets (CsvTable or IndexedCsvFile) that share a header.
+
+    shard_keys are the DatasetStore keys the shards were saved under. Rows are addressed
+    globally; a row index is mapped to its shard by bisecting the cumulative row counts.
+    """
+
+    def __init__(self, columns, shard_keys, shards):
+        self.columns = list(columns)
+        self.shard_keys = list(shard_keys)
+        self.shards = list(shards)
+        self.starts = list(itertools.accumulate((len(shard) for shard in self.shards), initial=0))
+
+    def __len__(self):
+        return self.starts[-1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self.row_dict(i) for i in range(start, stop, step)]
+            return [dict(zip(self.columns, values)) for values in self.iter_rows(start, stop)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('CSV row index out of range')
+        return self.row_dict(index)
+
+    def _locate(self, row_idx):
+        shard_idx = bisect.bisect_right(self.starts, row_idx) - 1
+        return shard_idx, row_idx - self.starts[shard_idx]
+
+    def cell(self, row_idx, col_idx):
+        shard_idx, local_idx = self._locate(row_idx)
+        return self.shards[shard_idx].cell(local_idx, col_idx)
+
+    def row_values(self, row_idx):
+        shard_idx, local_idx = self._locate(row_idx)
+        return self.shards[shard_idx].row_values(local_idx)
+
+    def row_dict(self, row_idx):
+        return dict(zip(self.columns, self.row_values(row_idx)))
+
+    def iter_rows(self, start=0, stop=None):
+        """Yield rows [start, stop) as lists, reading each shard only for the range it covers"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        shard_idx, _ = self._locate(start)
+        for shard_idx in range(shard_idx, len(self.shards)):
+            shard_start = self.starts[shard_idx]
+            if shard_start >= stop:
+                break
+            yield from self.shards[shard_idx].iter_rows(max(start - shard_start, 0), stop - shard_start)
+
+    def nbytes(self):
+        return sum(shard.nbytes() for shard in self.shards)
+
+
+def ingest_csv_stream(cache_key, stream, size=None):
+    """Turn a binary CSV stream into a table for cache_key.
+
+    Inputs of at least CSV_INDEX_THRESHOLD_BYTES are copied to the dataset store and
+    indexed instead of being loaded into memory. Returns (table, encoding, delimiter).
+    """
+    if size is None or size < CSV_INDEX_THRESHOLD_BYTES:
+        return load_csv_table(stream)
+
+    staging_dir = DATASET_STORE.staging_dir(cache_key)
+    source_path = os.path.join(staging_dir, DatasetStore.SOURCE_FILE)
+    with open(source_path, 'wb') as f:
+        shutil.copyfileobj(stream, f, CSV_CHUNK_BYTES)
+    table = IndexedCsvFile.build(source_path)
+    if table is not None:
+        return table, table.encoding, table.delimiter
+
+    # Not indexable (e.g. UTF-16): parse the staged copy into memory instead
+    try:
+        with open(source_path, 'rb') as f:
+            return load_csv_table(f)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+class CodeRunLimitError(RuntimeError):
+    """Raised when a worker's job queue already holds CODE_RUN_MAX_QUEUED waiting jobs"""
+
+
+class CodeRunView:
+    """Read side of a job, shared by the worker that runs it (CodeRun) and the others (SpooledCodeRun).
+
+    Subclasses provide _snapshot() -> (chunks as (seq, type, text) tuples, next_seq, info).
+    """
+
+    FINAL_STATUSES = ('finished', 'failed', 'timed_out', 'cancelled')
+
+    @property
+    def complete(self):
+        return self.status in self.FINAL_STATUSES
+
+    def read(self, since=0):
+        """Snapshot of the output chunks from seq `since` on and the job state.
+
+        'dropped' counts requested chunks already lost from the ring buffer. Once 'complete'
+        is set all output has been buffered, so a reader that sees it can stop.
+        """
+        since = since or 0
+        chunks, next_seq, info = self._snapshot()
+        first = chunks[0][0] if chunks else next_seq
+        return {
+            'output': [{'type': stream_type, 'content': text} for seq, stream_type, text in chunks if seq >= since],
+            'next': next_seq,
+            'dropped': max(0, first - since),
+            'status': info['status'],
+            'complete': info['status'] in self.FINAL_STATUSES,
+            'returncode': info['returncode'],
+            'message': info['message']
+        }
+
+    def text(self, stream_type=None):
+        """Buffered output as one string, optionally only 'stdout' or 'stderr'"""
+        chunks, _, _ = self._snapshot()
+        return ''.join(text for _, chunk_type, text in chunks if stream_type in (None, chunk_type))
+
+    def tail(self, lines):
+        """Last `lines` lines of the buffered output (stdout and stderr interleaved)"""
+        return '\n'.join(self.text().rstrip('\n').split('\n')[-lines:]) if lines > 0 else ''
+
+
+class CodeRun(CodeRunView):
+    """One queued or running subprocess plus the ring buffer its stdout/stderr are read into.
+
+    status goes queued -> running -> finished, failed, timed_out or cancelled. While running,
+    a reader thread per pipe appends (seq, type, text) chunks as soon as bytes arrive; the
+    oldest chunks are dropped once more than buffer_bytes are held.
+
+    With a spool_dir, status.json and output.jsonl (the ring buffer, one JSON chunk per line)
+    are mirrored there so other workers can serve the job, and a 'cancel' file left by
+    another worker cancels it.
+    """
+
+    def __init__(self, session_id, args, timeout=CODE_RUN_TIMEOUT_SECONDS,
+                 buffer_bytes=CODE_RUN_BUFFER_BYTES, cleanup_path=None, spool_dir=None):
+        self.session_id = session_id
+        self.args = args
+        self.timeout = timeout
+        self.buffer_bytes = buffer_bytes
+        self.cleanup_path = cleanup_path  # Temporary script deleted once the job ends
+        self.spool_dir = spool_dir
+        self.output = deque()
+        self.buffered = 0
+        self.next_seq = 0
+        self.delivered = 0  # Where a poll without `since` continues from
+        self.status = 'queued'
+        self.returncode = None
+        self.cancelled = None  # Reason, once cancelled
+        self.message = ''
+        self.queued = time.time()
+        self.started = None
+        self.finished = None
+        self.process = None
+        self._spool_file = None
+        self._spool_bytes = 0
+        self._cond = threading.Condition()
+        self._publish_status()
+
+    def execute(self):
+        """Run the process to completion (or timeout); called by a job queue thread"""
+        if self._cancel_requested():
+            self.cancel()
+        with self._cond:
+            if self.status != 'queued':
+                # Cancelled while waiting
+                return
+            self.status = 'running'
+            self.started = time.time()
+        try:
+            # Own process group, so cancelling also kills anything the job spawned
+            self.process = subprocess.Popen(
+                self.args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                start_new_session=True, env=dict(os.environ, PYTHONUNBUFFERED='1')
+            )
+        except FileNotFoundError:
+            self._finish('failed', None, f"Command not found: {self.args[0]}")
+            return
+        except OSError as e:
+            self._finish('failed', None, str(e))
+            return
+        self._open_spool()
+        self._publish_status()
+        if self._cancel_requested():
+            self._kill()
+
+        readers = [
+            threading.Thread(target=self._read_pipe, args=(self.process.stdout, 'stdout'), daemon=True),
+            threading.Thread(target=self._read_pipe, args=(self.process.stderr, 'stderr'), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            self.process.wait(timeout=self.timeout)
+            status, message = 'finished', f"Process exited with code {self.process.returncode}"
+        except subprocess.TimeoutExpired:
+            self._kill()
+            self.process.wait()
+            status, message = 'timed_out', f"Process killed after {self.timeout:g}s timeout"
+        for reader in readers:
+            reader.join()
+        if self._cancel_requested():
+            status, message = 'cancelled', self.cancelled or "Process stopped"
+        self._finish(status, self.process.returncode, message)
+
+    def _read_pipe(self, pipe, stream_type):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        with pipe:
+            while True:
+                # read1 returns whatever is available instead of waiting for a full buffer
+                data = pipe.read1(CODE_RUN_READ_BYTES)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    self._append(stream_type, text)
+                if not data:
+                    break
+
+    def _append(self, stream_type, text):
+        with self._cond:
+            chunk = (self.next_seq, stream_type, text)
+            self.output.append(chunk)
+            self.next_seq += 1
+            self.buffered += len(text)
+            while self.buffered > self.buffer_bytes and len(self.output) > 1:
+                self.buffered -= len(self.output.popleft()[2])
+            self._spool_chunk(chunk)
+            self._cond.notify_all()
+
+    def _spool_path(self, name):
+        return os.path.join(self.spool_dir, name)
+
+    def _open_spool(self):
+        if self.spool_dir:
+            try:
+                self._spool_file = open(self._spool_path('output.jsonl'), 'a', encoding='utf-8')
+            except OSError as e:
+                print(f"DEBUG: Could not spool output of job {self.session_id}: {e}")
+
+    def _spool_chunk(self, chunk):
+        # Called with self._cond held
+        if self._spool_file is None:
+            return
+        try:
+            line = json.dumps(chunk) + '\n'
+            if self._spool_bytes + len(line) <= 2 * self.buffer_bytes:
+                self._spool_file.write(line)
+                self._spool_file.flush()
+                self._spool_bytes += len(line)
+                return
+            # Keep the file near the ring buffer's size by rewriting it from the buffer
+            self._spool_file.close()
+            path = self._spool_path('output.jsonl')
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                self._spool_bytes = sum(f.write(json.dumps(buffered) + '\n') for buffered in self.output)
+            os.replace(tmp_path, path)
+            self._spool_file = open(path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"DEBUG: Stopped spooling output of job {self.session_id}: {e}")
+            self._spool_file = None
+
+    def _publish_status(self):
+        """Write info() for other workers; the process group is included so they can kill it"""
+        if not self.spool_dir:
+            return
+        status = dict(self.info(), pgid=self.process.pid if self.process else None)
+        path = self._spool_path('status.json')
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(status, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"DEBUG: Could not publish status of job {self.session_id}: {e}")
+
+    def _cancel_requested(self):
+        return bool(self.cancelled) or (self.spool_dir is not None and os.path.exists(self._spool_path('cancel')))
+
+    def _finish(self, status, returncode, message):
+        if self.cleanup_path:
+            try:
+                os.remove(self.cleanup_path)
+            except OSError:
+                pass
+        with self._cond:
+            if self._spool_file is not None:
+                self._spool_file.close()
+                self._spool_file = None
+            self.status = status
+            self.returncode = returncode
+            self.message = message
+            self.finished = time.time()
+            self._cond.notify_all()
+        # All output is spooled before other workers can see the job as complete
+        self._publish_status()
+        print(f"DEBUG: Job {self.session_id} {status}: {message}")
+
+    def _kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def cancel(self, reason="Process stopped"):
+        """Drop the job if it is still queued, otherwise kill it; False if it had already ended"""
+        with self._cond:
+            if self.complete:
+                return False
+            self.cancelled = self.cancelled or reason
+            was_queued = self.status == 'queued'
+            if was_queued:
+                # Claimed here so execute() skips it
+                self.status = 'cancelling'
+        if was_queued:
+            self._finish('cancelled', None, "Cancelled before it started")
+        elif self.process is not None:
+            # Otherwise execute() kills it as soon as the process exists
+            self._kill()
+        return True
+
+    def wait(self, since, timeout):
+        """Block until output past seq `since` is buffered, the job completes, or timeout passes"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.next_seq > since or self.complete, timeout)
+
+    def join(self, timeout=None):
+        """Block until the job has completed; returns whether it did"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.complete, timeout)
+
+    def _snapshot(self):
+        with self._cond:
+            return list(self.output), self.next_seq, self.info()
+
+    def read(self, since=None):
+        """As CodeRunView.read; without `since` it continues after the previous read"""
+        with self._cond:
+            if since is None:
+                since = self.delivered
+            snapshot = super().read(since)
+            self.delivered = max(self.delivered, snapshot['next'])
+            return snapshot
+
+    def info(self):
+        with self._cond:
+            return {
+                'job_id': self.session_id,
+                'command': shlex.join(self.args),
+                'status': self.status,
+                'returncode': self.returncode,
+                'message': self.message,
+                'timeout': self.timeout,
+                'queued_at': self.queued,
+                'started_at': self.started,
+                'finished_at': self.finished
+            }
+
+
+class SpooledCodeRun(CodeRunView):
+    """A job run by another worker, served from its spool directory.
+
+    State and output are polled from disk. Cancelling leaves a 'cancel' file for the
+    owning worker and kills the job's process group directly if it is already running.
+    """
+
+    POLL_SECONDS = 0.1
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+
+    def _load_status(self):
+        with open(os.path.join(self.spool_dir, 'status.json')) as f:
+            info = json.load(f)
+        # Until the owning worker notices the cancel file, report it like a local cancel
+        if info['status'] not in self.FINAL_STATUSES and os.path.exists(os.path.join(self.spool_dir, 'cancel')):
+            info['status'] = 'cancelling'
+        return info
+
+    @property
+    def status(self):
+        return self._load_status()['status']
+
+    def info(self):
+        return {k: v for k, v in self._load_status().items() if k != 'pgid'}
+
+    def _snapshot(self):
+        # Status first: once it reads complete the output file is final
+        info = self._load_status()
+        chunks = []
+        try:
+            with open(os.path.join(self.spool_dir, 'output.jsonl'), encoding='utf-8') as f:
+                for line in f:
+                    # A line without its newline is still being written
+                    if line.endswith('\n'):
+                        chunks.append(tuple(json.loads(line)))
+        except FileNotFoundError:
+            pass
+        return chunks, chunks[-1][0] + 1 if chunks else 0, info
+
+    def _mtimes(self):
+        mtimes = []
+        for name in ('status.json', 'output.jsonl'):
+            try:
+                mtimes.append(os.stat(os.path.join(self.spool_dir, name)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def wait(self, since, timeout):
+        """Poll until output past seq `since` is spooled, the job completes, or timeout passes"""
+        deadline = time.monotonic() + timeout
+        _, next_seq, info = self._snapshot()
+        if next_seq > since or info['status'] in self.FINAL_STATUSES:
+            return
+        mtimes = self._mtimes()
+        while time.monotonic() < deadline and self._mtimes() == mtimes:
+            time.sleep(self.POLL_SECONDS)
+
+    def cancel(self, reason="Process stopped"):
+        """Ask the owning worker to cancel the job; False if it had already ended"""
+        status = self._load_status()
+        if status['status'] in self.FINAL_STATUSES:
+            return False
+        open(os.path.join(self.spool_dir, 'cancel'), 'a').close()
+        if status['status'] == 'running' and status.get('pgid'):
+            try:
+                os.killpg(status['pgid'], signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        return True
+
+
+class CodeRunManager:
+    """This worker's job queue: CodeRuns by session id, executed by a fixed pool of threads.
+
+    Submitting never blocks the request. At most max_concurrent jobs run at once and the
+    rest wait in FIFO order, so heavy commands cannot starve page requests of threads.
+    The pool is started on first use (again after a fork). Jobs run in the worker that
+    accepted them and are mirrored under spool_root, so every worker can serve them;
+    finished jobs are kept for session_ttl seconds so their output can be read.
+    """
+
+    JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, max_concurrent, max_queued, session_ttl, spool_root=None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.session_ttl = session_ttl
+        self.spool_root = spool_root
+        self._runs = {}
+        self._queue = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self):
+        # Threads do not survive fork, so a forked worker starts its own pool
+        if self._pool_pid == os.getpid():
+            return
+        self._runs = {}
+        self._queue = queue.Queue()
+        for worker_idx in range(self.max_concurrent):
+            threading.Thread(target=self._work, args=(self._queue,), name=f"job-runner-{worker_idx}", daemon=True).start()
+        self._pool_pid = os.getpid()
+
+    def _work(self, jobs):
+        while True:
+            run = jobs.get()
+            try:
+                run.execute()
+            except Exception as e:
+                print(f"DEBUG: Job {run.session_id} crashed: {e}")
+                if not run.complete:
+                    run._finish('failed', run.returncode, str(e))
+
+    def submit(self, args, **kwargs):
+        """Queue args as a CodeRun and return it; raises CodeRunLimitError when the queue is full"""
+        with self._lock:
+            self._ensure_pool()
+            self._purge_finished()
+            waiting = sum(1 for run in self._runs.values() if run.status == 'queued')
+            if waiting >= self.max_queued:
+                raise CodeRunLimitError(f"{waiting} jobs are already waiting. Please try again later.")
+            session_id = uuid.uuid4().hex
+            spool_dir = None
+            if self.spool_root:
+                try:
+                    spool_dir = os.path.join(self.spool_root, session_id)
+                    os.makedirs(spool_dir)
+                except OSError as e:
+                    # Still runs, just only visible to this worker
+                    print(f"DEBUG: Could not create job spool {spool_dir}: {e}")
+                    spool_dir = None
+            run = CodeRun(session_id, args, spool_dir=spool_dir, **kwargs)
+            self._runs[session_id] = run
+            self._queue.put(run)
+        print(f"DEBUG: Job {session_id} queued: {args[:3]}")
+        return run
+
+    def get(self, session_id):
+        """The job for a session id (a SpooledCodeRun if another worker runs it), or None"""
+        with self._lock:
+            run = self._runs.get(session_id) if self._pool_pid == os.getpid() else None
+        if run is not None or not self.spool_root or not self.JOB_ID_PATTERN.match(session_id or ''):
+            return run
+        spool_dir = os.path.join(self.spool_root, session_id)
+        return SpooledCodeRun(spool_dir) if os.path.isfile(os.path.join(spool_dir, 'status.json')) else None
+
+    def jobs(self):
+        """Jobs of every worker, oldest first"""
+        with self._lock:
+            self._purge_finished()
+            runs = dict(self._runs) if self._pool_pid == os.getpid() else {}
+        if self.spool_root:
+            try:
+                names = os.listdir(self.spool_root)
+            except OSError:
+                names = []
+            for name in names:
+                if name not in runs and self.JOB_ID_PATTERN.match(name):
+                    runs[name] = SpooledCodeRun(os.path.join(self.spool_root, name))
+        infos = []
+        for run in runs.values():
+            try:
+                infos.append(run.info())
+            except (OSError, ValueError, KeyError):
+                # Spool being created or purged, or left by an older version
+                continue
+        return sorted(infos, key=lambda info: info['queued_at'])
+
+    def active(self):
+        """Number of this worker's jobs that are queued or running"""
+        with self._lock:
+            if self._pool_pid != os.getpid():
+                return 0
+            return sum(1 for run in self._runs.values() if not run.complete)
+
+    def shutdown(self, wait_seconds=0):
+        """Give running jobs up to wait_seconds to finish, then cancel everything left (worker exit).
+
+        Returns the number of jobs that had to be cancelled.
+        """
+        with self._lock:
+            runs = list(self._runs.values()) if self._pool_pid == os.getpid() else []
+        deadline = time.monotonic() + wait_seconds
+        for run in runs:
+            if run.status == 'running':
+                run.join(max(0, deadline - time.monotonic()))
+        cancelled = sum(1 for run in runs if run.cancel("Stopped because the worker shut down"))
+        for run in runs:
+            run.join(5)
+        return cancelled
+
+    def _purge_finished(self):
+        deadline = time.time() - self.session_ttl
+        for session_id, run in list(self._runs.items()):
+            if run.complete and run.finished < deadline:
+                del self._runs[session_id]
+                if run.spool_dir:
+                    shutil.rmtree(run.spool_dir, ignore_errors=True)
+        if not self.spool_root:
+            return
+        # Spools left by workers that exited: status.json changes at least when a job starts
+        # and ends, so anything older than the longest job plus session_ttl is abandoned
+        stale = time.time() - CODE_RUN_MAX_TIMEOUT_SECONDS - self.session_ttl
+        try:
+            names = os.listdir(self.spool_root)
+        except OSError:
+            return
+        for name in names:
+            if name in self._runs:
+                continue
+            path = os.path.join(self.spool_root, name)
+            try:
+                if os.path.getmtime(path) < stale:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+
+CODE_RUNS = CodeRunManager(
+    CODE_RUN_MAX_CONCURRENT, CODE_RUN_MAX_QUEUED, CODE_RUN_SESSION_TTL,
+    os.path.join(DATASET_DIR, DatasetStore.JOBS_DIR)
+)
+
+
 # Simple dark theme HTML
 HTML_TEMPLATE = r"""
 <!doctype html>
@@ -70,135 +2486,7 @@ HTML_TEMPLATE = r"""
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        * { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; box-sizing: border-box; }
-        body, html { margin: 0; padding: 0; background-color: #0f172a !important; color: #e2e8f0 !important; }
-        .main-container { background-color: #1e293b !important; color: #e2e8f0 !important; border-radius: 0; }
-        input, select, textarea { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
-        input:focus, select:focus, textarea:focus { outline: none !important; border-color: #475569 !important; box-shadow: none !important; }
-        label { color: #cbd5e1 !important; }
-        h1, h2, h3 { color: #f1f5f9 !important; }
-        .btn { padding: 0.625rem 1.25rem; font-weight: 500; border-radius: 0; transition: all 0.2s ease; border: none; cursor: pointer; display: inline-flex; align-items: center; justify-content: center; gap: 0.5rem; font-size: 0.875rem; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
-        .btn:hover { transform: translateY(-1px); box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06); }
-        .btn:disabled { opacity: 0.5; cursor: not-allowed; transform: none; box-shadow: none; }
-        .btn-primary { background-color: #6366f1; color: white !important; }
-        .btn-primary:hover:not(:disabled) { background-color: #4f46e5; }
-        .btn-success { background-color: #10b981; color: white !important; }
-        .btn-success:hover:not(:disabled) { background-color: #059669; }
-        .btn-secondary { background-color: #64748b; color: white !important; }
-        .btn-secondary:hover:not(:disabled) { background-color: #475569; }
-        .btn-ghost { background-color: transparent; color: #64748b; box-shadow: none; border: 1px solid #e2e8f0; }
-        .btn-ghost:hover:not(:disabled) { background-color: #f8fafc; border-color: #cbd5e1; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
-        .btn-ghost.selected, .btn-ghost.selected:hover { background-color: #334155 !important; border-color: #64748b !important; }
-        .btn-icon { padding: 0 !important; font-size: 1.125rem !important; line-height: 1 !important; height: 46px; width: 46px; display: inline-flex; align-items: center; justify-content: center; }
-        .section-card { border-radius: 0; padding: 1.5rem; box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06); background-color: #1e293b; border: 1px solid #334155; }
-        .greeting-text { font-weight: 500 !important; font-size: 1.25rem !important; color: #94a3b8 !important; }
-        .witty-message { font-weight: 400 !important; font-size: 0.875rem !important; margin-top: 0.25rem !important; opacity: 0.8; color: #cbd5e1 !important; }
-        .big-time { font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; color: #e2e8f0 !important; margin-bottom: 0.125rem !important; }
-        .big-day-date { font-size: 0.875rem !important; font-weight: 500 !important; color: #94a3b8 !important; line-height: 1.2 !important; }
-        .big-time-display { display: flex; flex-direction: row; justify-content: flex-end; align-items: center; margin-bottom: 0.5rem; }
-        .time-section { text-align: right; height: 46px !important; display: flex !important; flex-direction: column !important; justify-content: center !important; align-items: flex-end !important; }
-
-        /* Ensure buttons are visible and properly styled */
-        .btn { display: inline-flex !important; visibility: visible !important; opacity: 1 !important; }
-        .btn-success { background-color: #10b981 !important; color: white !important; border: none !important; }
-        .btn-primary { background-color: #6366f1 !important; color: white !important; border: none !important; }
-        .btn-secondary { background-color: #64748b !important; color: white !important; border: none !important; }
-        .btn-ghost { background-color: transparent !important; color: #64748b !important; border: 1px solid #e2e8f0 !important; }
-
-        /* Input styling */
-        input[type="text"], select, textarea { border-radius: 0; border: 1px solid #e2e8f0; padding: 0.625rem 1rem; font-size: 0.875rem; transition: all 0.2s ease; background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
-        input[type="text"]:focus, select:focus, textarea:focus { outline: none; border-color: #475569 !important; box-shadow: none !important; }
-        input#url_input { font-weight: 400 !important; }
-
-        /* Section card styling */
-        .section-card { border-radius: 0; padding: 1.5rem; box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06); background-color: #1e293b; border: 1px solid #334155; }
-
-        /* ==================== WHITE THEME ==================== */
-        body.white-theme { background-color: #f1f5f9 !important; color: #1e293b !important; }
-        .white-theme .main-container { background-color: #f8fafc !important; color: #1e293b !important; border-radius: 0; }
-        .white-theme input, .white-theme select, .white-theme textarea { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-        body.white-theme input, body.white-theme select, body.white-theme textarea { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-        .white-theme input:focus, .white-theme select:focus, .white-theme textarea:focus { outline: none !important; border-color: #e2e8f0 !important; box-shadow: none !important; }
-        .white-theme label { color: #475569 !important; }
-        .white-theme h1, .white-theme h2, .white-theme h3 { color: #1e293b !important; }
-        .white-theme .main-container p, .white-theme .main-container div, .white-theme .main-container span { color: #1e293b !important; }
-        .white-theme a { color: #6366f1 !important; }
-        .white-theme a:hover { color: #4f46e5 !important; }
-        .white-theme .btn-primary { background-color: #6366f1 !important; color: #ffffff !important; }
-        .white-theme .btn-primary:hover:not(:disabled) { background-color: #4f46e5 !important; }
-        .white-theme .btn-secondary { background-color: #64748b !important; color: #ffffff !important; }
-        .white-theme .btn-secondary:hover:not(:disabled) { background-color: #475569 !important; }
-        .white-theme .btn-success { background-color: #10b981 !important; color: #ffffff !important; }
-        .white-theme .btn-success:hover:not(:disabled) { background-color: #059669 !important; }
-        .white-theme .btn-danger { background-color: #ef4444 !important; color: #ffffff !important; }
-        .white-theme .btn-danger:hover:not(:disabled) { background-color: #dc2626 !important; }
-        .white-theme .btn-ghost { background-color: transparent !important; color: #64748b !important; border-color: #e2e8f0 !important; }
-        .white-theme .btn-ghost:hover:not(:disabled) { background-color: #f1f5f9 !important; border-color: #cbd5e1 !important; }
-        .white-theme .theme-select { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-        body.white-theme .theme-select { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-        .white-theme .theme-dropdown { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-        body.white-theme .theme-dropdown { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-        .white-theme .section-card { background-color: #ffffff; border: 1px solid #e2e8f0; }
-        .white-theme .text-sm { color: #64748b !important; }
-        .white-theme .text-lg { color: #1e293b !important; }
-        .white-theme .font-semibold { color: #1e293b !important; }
-        .white-theme .font-medium { color: #475569 !important; }
-        .white-theme .greeting-text { color: #64748b !important; }
-        .white-theme .witty-message { color: #64748b !important; }
-        .white-theme button:disabled { background-color: #f3f4f6 !important; color: #9ca3af !important; border-color: #e5e7eb !important; }
-        .white-theme .btn-ghost.selected, .white-theme .btn-ghost.selected:hover { background-color: rgba(0, 0, 0, 0.05) !important; border-color: rgba(0, 0, 0, 0.1) !important; }
-        .white-theme #notesTextarea { background: #f9fafb !important; color: #4b5563 !important; caret-color: #4b5563 !important; }
-        .white-theme .terminal-container { background: #f9fafb !important; border-color: #d1d5db !important; }
-        .white-theme #home-terminal-output { background: #f9fafb !important; color: #4b5563 !important; }
-        .white-theme #home-terminal-input { background: #f9fafb !important; color: #4b5563 !important; caret-color: #4b5563 !important; }
-        .white-theme .terminal-input-area { background: #f9fafb !important; }
-        .white-theme .modern-textarea { background-color: #f8fafc; color: #1a202c; border-color: #cbd5e0; }
-        .white-theme .modern-textarea:focus { outline: none; border-color: #cbd5e0; box-shadow: none; }
-        .white-theme .modern-encrypt-btn { background-color: #10b981; }
-        .white-theme .modern-decrypt-btn { background-color: #06b6d4; }
-        .white-theme .copy-icon-btn { background-color: #ffffff; color: #6b7280; border-color: #d1d5db; }
-        .white-theme .copy-icon-btn:hover { background-color: #f3f4f6; color: #374151; border-color: #9ca3af; }
-        .white-theme .loader { background-color: #e2e8f0; }
-        .white-theme .loader::before { background-color: #6366f1; }
-        /* ==================== JSON SYNTAX HIGHLIGHTING - WHITE THEME ==================== */
-        .white-theme .json-key { color: #0451a5 !important; }
-        .white-theme .json-string { color: #a31515 !important; }
-        .white-theme .json-number { color: #098658 !important; }
-        .white-theme .json-boolean { color: #0000ff !important; }
-        .white-theme .json-null { color: #0000ff !important; }
-        .white-theme .json-bracket { color: #000000 !important; }
-        .white-theme .json-comma { color: #000000 !important; }
-        .white-theme .json-toggle { color: #808080 !important; cursor: pointer; }
-        .white-theme .json-toggle:hover { color: #000000 !important; }
-
-        /* ==================== DARK THEME (Default) ==================== */
-        body.dark-theme { background-color: #0f172a !important; color: #e2e8f0 !important; }
-        .dark-theme .main-container { background-color: #1e293b !important; color: #e2e8f0 !important; border-radius: 0; }
-        .dark-theme input, .dark-theme select, .dark-theme textarea { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
-        .dark-theme input:focus, .dark-theme select:focus, .dark-theme textarea:focus { outline: none !important; border-color: #475569 !important; box-shadow: none !important; }
-        .dark-theme label { color: #cbd5e1 !important; }
-        .dark-theme h1, .dark-theme h2, .dark-theme h3 { color: #f1f5f9 !important; }
-        .dark-theme .btn-primary { background-color: #6366f1 !important; color: #ffffff !important; }
-        .dark-theme .btn-primary:hover:not(:disabled) { background-color: #4f46e5 !important; }
-        .dark-theme .btn-secondary { background-color: #475569 !important; color: #ffffff !important; }
-        .dark-theme .btn-secondary:hover:not(:disabled) { background-color: #334155 !important; }
-        .dark-theme .btn-success { background-color: #10b981 !important; color: #ffffff !important; }
-        .dark-theme .btn-success:hover:not(:disabled) { background-color: #059669 !important; }
-        .dark-theme .btn-danger { background-color: #ef4444 !important; color: #ffffff !important; }
-        .dark-theme .btn-danger:hover:not(:disabled) { background-color: #dc2626 !important; }
-        .dark-theme .btn-ghost { background-color: transparent !important; color: #94a3b8 !important; border-color: #475569 !important; }
-        .dark-theme .btn-ghost:hover:not(:disabled) { background-color: #334155 !important; border-color: #64748b !important; }
-        .dark-theme .section-card { background-color: #1e293b; border: 1px solid #334155; }
-        .dark-theme .big-time { color: #e2e8f0 !important; }
-        .dark-theme .big-day-date { color: #94a3b8 !important; }
-        .dark-theme #terminal-section { background-color: #1e293b !important; }
-        .dark-theme .terminal-container { background-color: #0d1117 !important; border-color: #30363d !important; }
-        .dark-theme #home-terminal-output { background-color: #0d1117 !important; color: #ffffff !important; }
-        .dark-theme #home-terminal-input { background-color: #0d1117 !important; color: #ffffff !important; caret-color: #ffffff !important; }
-        .dark-theme .terminal-input-area { background-color: #0d1117 !important; }
-        .dark-theme #notesTextarea { background-color: #0d1117 !important; color: #ffffff !important; caret-color: #ffffff !important; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('home.css') }}">
 </head>
 <body class="min-h-screen">
     <div class="w-full min-h-screen main-container p-8">
@@ -303,9 +2591,145 @@ HTML_TEMPLATE = r"""
         </div>
 
 
-    </div>
+    </div>
+
+    <script src="{{ asset_url('home.js') }}"></script>
+</body>
+</html>
+"""
+
+# Static assets for HTML_TEMPLATE, served from /assets with long-lived caching
+HOME_CSS = r"""
+        * { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; box-sizing: border-box; }
+        body, html { margin: 0; padding: 0; background-color: #0f172a !important; color: #e2e8f0 !important; }
+        .main-container { background-color: #1e293b !important; color: #e2e8f0 !important; border-radius: 0; }
+        input, select, textarea { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
+        input:focus, select:focus, textarea:focus { outline: none !important; border-color: #475569 !important; box-shadow: none !important; }
+        label { color: #cbd5e1 !important; }
+        h1, h2, h3 { color: #f1f5f9 !important; }
+        .btn { padding: 0.625rem 1.25rem; font-weight: 500; border-radius: 0; transition: all 0.2s ease; border: none; cursor: pointer; display: inline-flex; align-items: center; justify-content: center; gap: 0.5rem; font-size: 0.875rem; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
+        .btn:hover { transform: translateY(-1px); box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06); }
+        .btn:disabled { opacity: 0.5; cursor: not-allowed; transform: none; box-shadow: none; }
+        .btn-primary { background-color: #6366f1; color: white !important; }
+        .btn-primary:hover:not(:disabled) { background-color: #4f46e5; }
+        .btn-success { background-color: #10b981; color: white !important; }
+        .btn-success:hover:not(:disabled) { background-color: #059669; }
+        .btn-secondary { background-color: #64748b; color: white !important; }
+        .btn-secondary:hover:not(:disabled) { background-color: #475569; }
+        .btn-ghost { background-color: transparent; color: #64748b; box-shadow: none; border: 1px solid #e2e8f0; }
+        .btn-ghost:hover:not(:disabled) { background-color: #f8fafc; border-color: #cbd5e1; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
+        .btn-ghost.selected, .btn-ghost.selected:hover { background-color: #334155 !important; border-color: #64748b !important; }
+        .btn-icon { padding: 0 !important; font-size: 1.125rem !important; line-height: 1 !important; height: 46px; width: 46px; display: inline-flex; align-items: center; justify-content: center; }
+        .section-card { border-radius: 0; padding: 1.5rem; box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06); background-color: #1e293b; border: 1px solid #334155; }
+        .greeting-text { font-weight: 500 !important; font-size: 1.25rem !important; color: #94a3b8 !important; }
+        .witty-message { font-weight: 400 !important; font-size: 0.875rem !important; margin-top: 0.25rem !important; opacity: 0.8; color: #cbd5e1 !important; }
+        .big-time { font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; color: #e2e8f0 !important; margin-bottom: 0.125rem !important; }
+        .big-day-date { font-size: 0.875rem !important; font-weight: 500 !important; color: #94a3b8 !important; line-height: 1.2 !important; }
+        .big-time-display { display: flex; flex-direction: row; justify-content: flex-end; align-items: center; margin-bottom: 0.5rem; }
+        .time-section { text-align: right; height: 46px !important; display: flex !important; flex-direction: column !important; justify-content: center !important; align-items: flex-end !important; }
+
+        /* Ensure buttons are visible and properly styled */
+        .btn { display: inline-flex !important; visibility: visible !important; opacity: 1 !important; }
+        .btn-success { background-color: #10b981 !important; color: white !important; border: none !important; }
+        .btn-primary { background-color: #6366f1 !important; color: white !important; border: none !important; }
+        .btn-secondary { background-color: #64748b !important; color: white !important; border: none !important; }
+        .btn-ghost { background-color: transparent !important; color: #64748b !important; border: 1px solid #e2e8f0 !important; }
+
+        /* Input styling */
+        input[type="text"], select, textarea { border-radius: 0; border: 1px solid #e2e8f0; padding: 0.625rem 1rem; font-size: 0.875rem; transition: all 0.2s ease; background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
+        input[type="text"]:focus, select:focus, textarea:focus { outline: none; border-color: #475569 !important; box-shadow: none !important; }
+        input#url_input { font-weight: 400 !important; }
+
+        /* Section card styling */
+        .section-card { border-radius: 0; padding: 1.5rem; box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06); background-color: #1e293b; border: 1px solid #334155; }
+
+        /* ==================== WHITE THEME ==================== */
+        body.white-theme { background-color: #f1f5f9 !important; color: #1e293b !important; }
+        .white-theme .main-container { background-color: #f8fafc !important; color: #1e293b !important; border-radius: 0; }
+        .white-theme input, .white-theme select, .white-theme textarea { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+        body.white-theme input, body.white-theme select, body.white-theme textarea { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+        .white-theme input:focus, .white-theme select:focus, .white-theme textarea:focus { outline: none !important; border-color: #e2e8f0 !important; box-shadow: none !important; }
+        .white-theme label { color: #475569 !important; }
+        .white-theme h1, .white-theme h2, .white-theme h3 { color: #1e293b !important; }
+        .white-theme .main-container p, .white-theme .main-container div, .white-theme .main-container span { color: #1e293b !important; }
+        .white-theme a { color: #6366f1 !important; }
+        .white-theme a:hover { color: #4f46e5 !important; }
+        .white-theme .btn-primary { background-color: #6366f1 !important; color: #ffffff !important; }
+        .white-theme .btn-primary:hover:not(:disabled) { background-color: #4f46e5 !important; }
+        .white-theme .btn-secondary { background-color: #64748b !important; color: #ffffff !important; }
+        .white-theme .btn-secondary:hover:not(:disabled) { background-color: #475569 !important; }
+        .white-theme .btn-success { background-color: #10b981 !important; color: #ffffff !important; }
+        .white-theme .btn-success:hover:not(:disabled) { background-color: #059669 !important; }
+        .white-theme .btn-danger { background-color: #ef4444 !important; color: #ffffff !important; }
+        .white-theme .btn-danger:hover:not(:disabled) { background-color: #dc2626 !important; }
+        .white-theme .btn-ghost { background-color: transparent !important; color: #64748b !important; border-color: #e2e8f0 !important; }
+        .white-theme .btn-ghost:hover:not(:disabled) { background-color: #f1f5f9 !important; border-color: #cbd5e1 !important; }
+        .white-theme .theme-select { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+        body.white-theme .theme-select { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+        .white-theme .theme-dropdown { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+        body.white-theme .theme-dropdown { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+        .white-theme .section-card { background-color: #ffffff; border: 1px solid #e2e8f0; }
+        .white-theme .text-sm { color: #64748b !important; }
+        .white-theme .text-lg { color: #1e293b !important; }
+        .white-theme .font-semibold { color: #1e293b !important; }
+        .white-theme .font-medium { color: #475569 !important; }
+        .white-theme .greeting-text { color: #64748b !important; }
+        .white-theme .witty-message { color: #64748b !important; }
+        .white-theme button:disabled { background-color: #f3f4f6 !important; color: #9ca3af !important; border-color: #e5e7eb !important; }
+        .white-theme .btn-ghost.selected, .white-theme .btn-ghost.selected:hover { background-color: rgba(0, 0, 0, 0.05) !important; border-color: rgba(0, 0, 0, 0.1) !important; }
+        .white-theme #notesTextarea { background: #f9fafb !important; color: #4b5563 !important; caret-color: #4b5563 !important; }
+        .white-theme .terminal-container { background: #f9fafb !important; border-color: #d1d5db !important; }
+        .white-theme #home-terminal-output { background: #f9fafb !important; color: #4b5563 !important; }
+        .white-theme #home-terminal-input { background: #f9fafb !important; color: #4b5563 !important; caret-color: #4b5563 !important; }
+        .white-theme .terminal-input-area { background: #f9fafb !important; }
+        .white-theme .modern-textarea { background-color: #f8fafc; color: #1a202c; border-color: #cbd5e0; }
+        .white-theme .modern-textarea:focus { outline: none; border-color: #cbd5e0; box-shadow: none; }
+        .white-theme .modern-encrypt-btn { background-color: #10b981; }
+        .white-theme .modern-decrypt-btn { background-color: #06b6d4; }
+        .white-theme .copy-icon-btn { background-color: #ffffff; color: #6b7280; border-color: #d1d5db; }
+        .white-theme .copy-icon-btn:hover { background-color: #f3f4f6; color: #374151; border-color: #9ca3af; }
+        .white-theme .loader { background-color: #e2e8f0; }
+        .white-theme .loader::before { background-color: #6366f1; }
+        /* ==================== JSON SYNTAX HIGHLIGHTING - WHITE THEME ==================== */
+        .white-theme .json-key { color: #0451a5 !important; }
+        .white-theme .json-string { color: #a31515 !important; }
+        .white-theme .json-number { color: #098658 !important; }
+        .white-theme .json-boolean { color: #0000ff !important; }
+        .white-theme .json-null { color: #0000ff !important; }
+        .white-theme .json-bracket { color: #000000 !important; }
+        .white-theme .json-comma { color: #000000 !important; }
+        .white-theme .json-toggle { color: #808080 !important; cursor: pointer; }
+        .white-theme .json-toggle:hover { color: #000000 !important; }
+
+        /* ==================== DARK THEME (Default) ==================== */
+        body.dark-theme { background-color: #0f172a !important; color: #e2e8f0 !important; }
+        .dark-theme .main-container { background-color: #1e293b !important; color: #e2e8f0 !important; border-radius: 0; }
+        .dark-theme input, .dark-theme select, .dark-theme textarea { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
+        .dark-theme input:focus, .dark-theme select:focus, .dark-theme textarea:focus { outline: none !important; border-color: #475569 !important; box-shadow: none !important; }
+        .dark-theme label { color: #cbd5e1 !important; }
+        .dark-theme h1, .dark-theme h2, .dark-theme h3 { color: #f1f5f9 !important; }
+        .dark-theme .btn-primary { background-color: #6366f1 !important; color: #ffffff !important; }
+        .dark-theme .btn-primary:hover:not(:disabled) { background-color: #4f46e5 !important; }
+        .dark-theme .btn-secondary { background-color: #475569 !important; color: #ffffff !important; }
+        .dark-theme .btn-secondary:hover:not(:disabled) { background-color: #334155 !important; }
+        .dark-theme .btn-success { background-color: #10b981 !important; color: #ffffff !important; }
+        .dark-theme .btn-success:hover:not(:disabled) { background-color: #059669 !important; }
+        .dark-theme .btn-danger { background-color: #ef4444 !important; color: #ffffff !important; }
+        .dark-theme .btn-danger:hover:not(:disabled) { background-color: #dc2626 !important; }
+        .dark-theme .btn-ghost { background-color: transparent !important; color: #94a3b8 !important; border-color: #475569 !important; }
+        .dark-theme .btn-ghost:hover:not(:disabled) { background-color: #334155 !important; border-color: #64748b !important; }
+        .dark-theme .section-card { background-color: #1e293b; border: 1px solid #334155; }
+        .dark-theme .big-time { color: #e2e8f0 !important; }
+        .dark-theme .big-day-date { color: #94a3b8 !important; }
+        .dark-theme #terminal-section { background-color: #1e293b !important; }
+        .dark-theme .terminal-container { background-color: #0d1117 !important; border-color: #30363d !important; }
+        .dark-theme #home-terminal-output { background-color: #0d1117 !important; color: #ffffff !important; }
+        .dark-theme #home-terminal-input { background-color: #0d1117 !important; color: #ffffff !important; caret-color: #ffffff !important; }
+        .dark-theme .terminal-input-area { background-color: #0d1117 !important; }
+        .dark-theme #notesTextarea { background-color: #0d1117 !important; color: #ffffff !important; caret-color: #ffffff !important; }
+"""
 
-    <script>
+HOME_JS = r"""
         // File browser functionality
         const browseBtn = document.getElementById('browseBtn');
         const uploadFile = document.getElementById('upload_file');
@@ -664,6 +3088,12 @@ HTML_TEMPLATE = r"""
         if (terminalInput) {
             console.log('Terminal input element found, adding event listener...');
             terminalInput.addEventListener('keydown', function(e) {
+                // Ctrl+C with nothing selected stops the running command
+                if (e.key === 'c' && e.ctrlKey && window.terminalSessionId && this.selectionStart === this.selectionEnd) {
+                    e.preventDefault();
+                    fetch(`/stop_code/${window.terminalSessionId}`, { method: 'POST' });
+                    return;
+                }
                 if (e.key === 'Enter') {
                     const command = this.value.trim();
                     console.log('Enter pressed, command:', command);
@@ -711,51 +3141,53 @@ HTML_TEMPLATE = r"""
 
             output.innerHTML += `<br>$ ${command}<br>`;
 
-            // Send command to server
-            fetch('/execute_command', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ command: command })
-            })
+            // Start the command in the background and follow its output
+            var body = new URLSearchParams({ command: command });
+            fetch('/run_code', { method: 'POST', body: body })
             .then(response => response.json())
             .then(data => {
-                // Theme-aware colors for command output
-                var theme = document.body.className.includes('white-theme') ? 'white' : 
-                           document.body.className.includes('pink-theme') ? 'pink' : 'dark';
-
-                             var outputColor = theme === 'dark' ? '#ffffff' : 
-                              theme === 'white' ? '#4b5563' : '#831843';
-                var errorColor = theme === 'dark' ? '#ffffff' : 
-                                theme === 'white' ? '#dc2626' : '#be185d';
-
-                             if (data.error) {
-               output.innerHTML += `Error: ${data.error}<br>`;
-             } else {
-               // Show output
-               if (data.output) {
-                 output.innerHTML += `${data.output}`;
-               }
-               // Show error output
-               if (data.stderr) {
-                 output.innerHTML += `${data.stderr}`;
-               }
-             }
-                output.scrollTop = output.scrollHeight;
+                if (!data.success) {
+                    appendTerminalText(output, `Error: ${data.error}\n`);
+                    return;
+                }
+                window.terminalSessionId = data.session_id;
+                streamTerminalOutput(data.session_id);
             })
             .catch(error => {
-                // Theme-aware error color
-                var theme = document.body.className.includes('white-theme') ? 'white' : 
-                           document.body.className.includes('pink-theme') ? 'pink' : '#be185d';
+                appendTerminalText(output, `Error: ${error.message}\n`);
+            });
+        };
 
-                var errorColor = theme === 'dark' ? '#ffffff' : 
-                                theme === 'white' ? '#dc2626' : '#be185d';
+        // Output is added as text so it can never be interpreted as markup
+        function appendTerminalText(output, text) {
+            output.appendChild(document.createTextNode(text));
+            output.scrollTop = output.scrollHeight;
+        }
 
-                output.innerHTML += `<span style="color: ${errorColor};">Error: ${error.message}</span><br>`;
-                output.scrollTop = output.scrollHeight;
+        // Output is pushed over server-sent events as the command produces it
+        function streamTerminalOutput(sessionId) {
+            var output = document.getElementById('home-terminal-output');
+            var events = new EventSource(`/stream_output/${sessionId}/events`);
+            events.onmessage = function(e) {
+                JSON.parse(e.data).forEach(chunk => appendTerminalText(output, chunk.content));
+            };
+            events.addEventListener('dropped', function(e) {
+                appendTerminalText(output, `[${e.data} output chunks dropped]\n`);
             });
-        };
+            events.addEventListener('end', function(e) {
+                events.close();
+                var data = JSON.parse(e.data);
+                if (data.error) appendTerminalText(output, `Error: ${data.error}\n`);
+                else if (data.returncode !== 0) appendTerminalText(output, `${data.message}\n`);
+                if (window.terminalSessionId === sessionId) window.terminalSessionId = null;
+            });
+            // EventSource reconnects by itself (resuming from the last event); give up only once it is closed
+            events.onerror = function() {
+                if (events.readyState === EventSource.CLOSED) {
+                    appendTerminalText(output, 'Error: lost connection to the command output\n');
+                }
+            };
+        }
 
         // Clear all function
         function clearAll() {
@@ -783,187 +3215,46 @@ HTML_TEMPLATE = r"""
         document.addEventListener('DOMContentLoaded', function() {
             console.log('DOM loaded, checking terminal functions...');
             console.log('createAndShowTerminal available:', typeof window.createAndShowTerminal);
-            console.log('closeTerminal available:', typeof window.closeTerminal);
-
-
-            var output = document.getElementById('home-terminal-output');
-            if (output) {
-                const welcomeColor = '#ffffff';
-                const helpColor = '#ffffff';
-                output.innerHTML = 'Welcome to WorkBench Terminal<br>Type some command e.g. pip install pandas<br><br>';
-            }
-
-            // Restore terminal state
-            var openSections = JSON.parse(localStorage.getItem('workbench-open-sections') || '[]');
-            if (openSections.includes('terminal')) {
-                var terminalSection = document.getElementById('terminal-section');
-                var terminalBtn = document.getElementById('terminalToggleBtn');
-                if (terminalSection && terminalBtn) {
-                    terminalSection.style.display = 'block';
-                    terminalBtn.classList.add('selected');
-                }
-            }
-
-            // Test terminal button click
-            if (terminalBtn) {
-                console.log('Terminal button found and ready!');
-            }
-        });
-    </script>
-</body>
-</html>
-"""
-CSV_EDIT_HTML = r"""
-<!doctype html>
-<html>
-   <head>
-      <title>WorkBench</title>
-      <script src="https://cdn.tailwindcss.com"></script>
-      <link rel="preconnect" href="https://fonts.googleapis.com">
-      <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-      <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-      <link href="https://fonts.googleapis.com/css2?family=Ubuntu+Mono:wght@400;700&display=swap" rel="stylesheet">
-      <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@fontsource/fira-code@5.0.18/400.css">
-      <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@fontsource/cascadia-code@5.0.7/400.css">
-      <style>
-         /* ==================== BASE STYLES ==================== */
-         * { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; }
-         body, html, input, textarea, select, button, div, span, label, p, h1, h2, h3, h4, h5, h6, option, td, th { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; }
-         .theme-transition { transition: all 0.3s ease; }
-         /* ==================== BUTTON STYLES ==================== */
-         .btn { padding: 0.625rem 1.25rem; font-weight: 500; border-radius: 0; transition: all 0.2s ease; border: none; cursor: pointer; display: inline-flex; align-items: center; justify-content: center; gap: 0.5rem; font-size: 0.875rem; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); height: 46px; }
-         .btn:hover { transform: translateY(-1px); box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06); }
-         .btn:active { transform: translateY(0); box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
-         .btn:disabled { opacity: 0.5; cursor: not-allowed; transform: none; box-shadow: none; }
-         .btn-primary { background-color: #6366f1; color: white; }
-         .btn-primary:hover:not(:disabled) { background-color: #4f46e5; }
-         .btn-secondary { background-color: #64748b; color: white; }
-         .btn-secondary:hover:not(:disabled) { background-color: #475569; }
-         .btn-success { background-color: #10b981; color: white; }
-         .btn-success:hover:not(:disabled) { background-color: #059669; }
-         .btn-ghost { background-color: transparent; color: #64748b; box-shadow: none; border: 1px solid #e2e8f0; }
-         .btn-ghost:hover:not(:disabled) { background-color: #f8fafc; border-color: #cbd5e1; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
-         /* ==================== INPUT STYLES ==================== */
-         input[type="text"], select { border-radius: 0; border: 1px solid #e2e8f0; padding: 0.625rem 1rem; font-size: 0.875rem; transition: all 0.2s ease; }
-         input[type="text"]:focus, select:focus { outline: none; border-color: inherit; box-shadow: none; }
-         /* ==================== DARK THEME ==================== */
-         body.dark-theme { background-color: #1e293b !important; color: #e2e8f0 !important; }
-         .dark-theme input, .dark-theme select { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
-         .dark-theme input:focus, .dark-theme select:focus { outline: none !important; border-color: #475569 !important; box-shadow: none !important; }
-         .dark-theme table { background-color: #1e293b !important; border-radius: 0; overflow: hidden; }
-         .dark-theme thead { background-color: #334155 !important; }
-         .dark-theme th, .dark-theme td { border-color: #475569 !important; color: #e2e8f0 !important; }
-         .dark-theme td[contenteditable] { background-color: #1e293b !important; }
-         .dark-theme td[contenteditable]:hover { background-color: #334155 !important; }
-         .dark-theme td[contenteditable]:focus { background-color: #334155 !important; outline: none !important; }
-         .dark-theme .btn-primary { background-color: #6366f1 !important; }
-         .dark-theme .btn-primary:hover:not(:disabled) { background-color: #4f46e5 !important; }
-         .dark-theme .btn-secondary { background-color: #475569 !important; }
-         .dark-theme .btn-secondary:hover:not(:disabled) { background-color: #334155 !important; }
-         .dark-theme .btn-ghost { background-color: transparent !important; color: #94a3b8 !important; border-color: #475569 !important; }
-         .dark-theme .btn-ghost:hover:not(:disabled) { background-color: #334155 !important; border-color: #64748b !important; }
-         .dark-theme .theme-select { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
-         .dark-theme .page-btn { background-color: #334155 !important; color: #e2e8f0 !important; border: 1px solid #475569 !important; }
-         .dark-theme .page-btn:hover { background-color: #475569 !important; }
-         .dark-theme .page-btn.active { background-color: #334155 !important; color: #94a3b8 !important; border-color: #64748b !important; }
-         .dark-theme .record-info { color: #cbd5e1 !important; }
-         .dark-theme .record-info span { color: #e2e8f0 !important; }
-         /* ==================== WHITE THEME ==================== */
-         body.white-theme { background-color: #f1f5f9 !important; }
-         .white-theme table { background-color: #ffffff !important; border-radius: 0; overflow: hidden; }
-         .white-theme thead { background-color: #f3f4f6 !important; }
-         .white-theme th, .white-theme td { border-color: #e5e7eb !important; }
-         .white-theme .page-btn { background-color: #ffffff !important; color: #1e293b !important; border: 1px solid #e2e8f0 !important; }
-         .white-theme .page-btn:hover { background-color: #e5e7eb !important; color: #1e293b !important; border-color: #d1d5db !important; }
-         .white-theme .page-btn.active { background-color: rgba(0, 0, 0, 0.05) !important; color: #64748b !important; border-color: rgba(0, 0, 0, 0.1) !important; }
-         .white-theme .btn-ghost { border-color: #e2e8f0 !important; }
-         .white-theme .btn-ghost:hover:not(:disabled) { background-color: #f8fafc !important; }
-         .white-theme .record-info { color: #6b7280 !important; }
-         .white-theme .record-info span { color: #1f2937 !important; }
-         .white-theme .main-container { background-color: #f8fafc !important; color: #1e293b !important; border-radius: 0; }
-         .white-theme input, .white-theme select { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
-         .white-theme input:focus, .white-theme select:focus { outline: none !important; border-color: #e2e8f0 !important; box-shadow: none !important; }
-         /* ==================== PINK THEME ==================== */
-         body.pink-theme { background-color: #fdf2f8 !important; color: #831843 !important; }
-         .pink-theme input, .pink-theme select { background-color: #fce7f3 !important; color: #831843 !important; border-color: #fbcfe8 !important; }
-         .pink-theme input:focus, .pink-theme select:focus { outline: none !important; border-color: #fbcfe8 !important; box-shadow: none !important; }
-         .pink-theme table { background-color: #ffffff !important; border-radius: 0; overflow: hidden; }
-         .pink-theme thead { background-color: #fce7f3 !important; }
-         .pink-theme th, .pink-theme td { border-color: #fbcfe8 !important; color: #831843 !important; }
-         .pink-theme td[contenteditable] { background-color: #ffffff !important; }
-         .pink-theme td[contenteditable]:hover { background-color: #fce7f3 !important; }
-         .pink-theme td[contenteditable]:focus { background-color: #fce7f3 !important; outline: none !important; }
-         .pink-theme .btn-primary { background-color: #ec4899 !important; }
-         .pink-theme .btn-primary:hover:not(:disabled) { background-color: #db2777 !important; }
-         .pink-theme .btn-success { background-color: #db2777 !important; color: #ffffff !important; }
-         .pink-theme .btn-success:hover:not(:disabled) { background-color: #be185d !important; }
-         .pink-theme .btn-secondary { background-color: #ec4899 !important; color: #ffffff !important; }
-         .pink-theme .btn-secondary:hover:not(:disabled) { background-color: #db2777 !important; }
-         .pink-theme .btn-ghost { color: #be185d !important; border-color: #fbcfe8 !important; }
-         .pink-theme .btn-ghost:hover:not(:disabled) { background-color: #fce7f3 !important; border-color: #f9a8d4 !important; }
-         .pink-theme .theme-select { background-color: #fce7f3 !important; color: #831843 !important; border-color: #fbcfe8 !important; }
-         .pink-theme .page-btn { background-color: #fce7f3 !important; color: #831843 !important; border: 1px solid #fbcfe8 !important; }
-         .pink-theme .page-btn:hover { background-color: #fbcfe8 !important; }
-         .pink-theme .page-btn.active { background-color: #fce7f3 !important; color: #be185d !important; border-color: #f9a8d4 !important; }
-         .pink-theme .record-info { color: #be185d !important; }
-         .pink-theme .record-info span { color: #831843 !important; font-weight: 700 !important; }
-         /* ==================== SELECTED BUTTON STATES ==================== */
-         .btn-ghost.selected { background-color: #334155 !important; border-color: #64748b !important; }
-         .dark-theme .btn-ghost.selected { background-color: #334155 !important; border-color: #64748b !important; }
-         .white-theme .btn-ghost.selected { background-color: #f8fafc !important; border-color: #e2e8f0 !important; }
-         .pink-theme .btn-ghost.selected { background-color: #fce7f3 !important; border-color: #f9a8d4 !important; }
-         /* ==================== COMMON STYLES ==================== */
-         .witty-message { font-weight: 400 !important; font-size: 0.875rem !important; margin-top: 0.25rem !important; opacity: 0.8; }
-         .dark-theme .witty-message { color: #cbd5e1 !important; }
-         .white-theme .witty-message { color: #64748b !important; }
-         .pink-theme .witty-message { color: #db2777 !important; }
-         .greeting-text { font-weight: 500 !important; font-size: 1.25rem !important; }
-         p.greeting-text { font-weight: 500 !important; font-size: 1.25rem !important; }
-                   .dark-theme .greeting-text { color: #94a3b8 !important; }
-          .white-theme .greeting-text { color: #64748b !important; }
-          .pink-theme .greeting-text { color: #be185d !important; }
-          .dark-theme .big-greeting { color: #94a3b8 !important; }
-          .dark-theme .big-time { font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; color: #e2e8f0 !important; }
-          .dark-theme .big-day-date { color: #94a3b8 !important; }
-          .white-theme .big-greeting { color: #64748b !important; }
-          .white-theme .big-time { color: #1e293b !important; font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; }
-          .white-theme .big-day-date { color: #64748b !important; font-size: 0.875rem !important; font-weight: 500 !important; line-height: 1.2 !important; }
-          .pink-theme .big-greeting { color: #be185d !important; }
-          .pink-theme .big-time { color: #831843 !important; font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; }
-          .pink-theme .big-day-date { color: #be185d !important; font-size: 0.875rem !important; font-weight: 500 !important; line-height: 1.2 !important; }
-         /* ==================== MODULE BADGE ==================== */
-         .module-badge { border-radius: 0; border: 1px solid; font-weight: 600; font-size: 14px; min-width: 60px; text-align: center; }
-         .dark-theme .module-badge { background-color: #374151 !important; color: #e0e7ff !important; border-color: #4b5563 !important; }
-         .white-theme .module-badge { background-color: #ffffff !important; color: #1e40af !important; border-color: #d1d5db !important; }
-         .pink-theme .module-badge { background-color: #fdf2f8 !important; color: #be185d !important; border-color: #f9a8d4 !important; }
-         /* ==================== DROPDOWNS ==================== */
-         .module-dropdown { font-weight: 500; border-radius: 0px !important; }
-         .theme-dropdown { border: 1px solid #d1d5db; font-weight: 500; padding: 8px 12px !important; border-radius: 0px !important; font-size: 14px !important; height: 46px !important; }
-         .dark-theme .module-dropdown, .dark-theme .theme-dropdown { background-color: #374151 !important; color: #e0e7ff !important; border-color: #4b5563 !important; }
-         .white-theme .module-dropdown, .white-theme .theme-dropdown { background-color: #f8fafc !important; color: #1e293b !important; border: 1px solid #e2e8f0 !important; padding: 8px 12px !important; border-radius: 0px !important; font-size: 14px !important; height: 46px !important; }
-         .pink-theme .module-dropdown, .pink-theme .theme-dropdown { background-color: #fdf2f8 !important; color: #be185d !important; border-color: #f9a8d4 !important; }
-         /* ==================== EDITED CELLS ==================== */
-         td.edited { background-color: #fef3c7 !important; position: relative; }
-         td.edited::after { content: ''; position: absolute; top: 0; right: 0; width: 0; height: 0; border-style: solid; border-width: 0 8px 8px 0; border-color: transparent #f59e0b transparent transparent; }
-         .dark-theme td.edited { background-color: #1e3a8a !important; }
-         .dark-theme td.edited::after { border-color: transparent #3b82f6 transparent transparent; }
-         .white-theme td.edited { background-color: #fef3c7 !important; }
-         .white-theme td.edited::after { border-color: transparent #f59e0b transparent transparent; }
-         .pink-theme td.edited { background-color: #f3e8ff !important; }
-         .pink-theme td.edited::after { border-color: transparent #a855f7 transparent transparent; }
-         .edit-indicator { margin-left: 10px; padding: 2px 8px; background: #f59e0b; color: white; border-radius: 0; font-size: 0.75rem; font-weight: normal; }
-         .dark-theme .edit-indicator { background: #3b82f6; }
-         .pink-theme .edit-indicator { background: #a855f7; }
-         /* ==================== CELL EDITING ==================== */
-         td[contenteditable] { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; min-width: 80px; max-width: 500px; min-height: 24px; }
-         td[contenteditable]:focus { overflow: visible; text-overflow: clip; max-width: none; }
-         td[contenteditable] div { display: inline; }
-         td[contenteditable]:empty { min-height: 24px; }
-         td[contenteditable]:hover:not(.edited) { background-color: #f3f4f6 !important; }
-         .dark-theme td[contenteditable]:hover:not(.edited) { background-color: #374151 !important; }
-         .pink-theme td[contenteditable]:hover:not(.edited) { background-color: #fce7f3 !important; }
-         table { width: auto !important; min-width: 100%; }
-      </style>
+            console.log('closeTerminal available:', typeof window.closeTerminal);
+
+
+            var output = document.getElementById('home-terminal-output');
+            if (output) {
+                const welcomeColor = '#ffffff';
+                const helpColor = '#ffffff';
+                output.innerHTML = 'Welcome to WorkBench Terminal<br>Type some command e.g. pip install pandas<br><br>';
+            }
+
+            // Restore terminal state
+            var openSections = JSON.parse(localStorage.getItem('workbench-open-sections') || '[]');
+            if (openSections.includes('terminal')) {
+                var terminalSection = document.getElementById('terminal-section');
+                var terminalBtn = document.getElementById('terminalToggleBtn');
+                if (terminalSection && terminalBtn) {
+                    terminalSection.style.display = 'block';
+                    terminalBtn.classList.add('selected');
+                }
+            }
+
+            // Test terminal button click
+            if (terminalBtn) {
+                console.log('Terminal button found and ready!');
+            }
+        });
+"""
+CSV_EDIT_HTML = r"""
+<!doctype html>
+<html>
+   <head>
+      <title>WorkBench</title>
+      <script src="https://cdn.tailwindcss.com"></script>
+      <link rel="preconnect" href="https://fonts.googleapis.com">
+      <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+      <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+      <link href="https://fonts.googleapis.com/css2?family=Ubuntu+Mono:wght@400;700&display=swap" rel="stylesheet">
+      <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@fontsource/fira-code@5.0.18/400.css">
+      <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@fontsource/cascadia-code@5.0.7/400.css">
+      <link rel="stylesheet" href="{{ asset_url('csv_edit.css') }}">
    </head>
    <body class="min-h-screen theme-transition">
       <script>
@@ -1092,6 +3383,17 @@ CSV_EDIT_HTML = r"""
                      class="border px-2 py-2 text-sm theme-transition"
                      style="height: 46px; width: 10ch;"
                      />
+                  <select
+                     id="compression"
+                     name="compression"
+                     class="border px-2 py-2 text-sm theme-transition theme-select"
+                     style="height: 46px;"
+                     title="Download compression">
+                     <option value="">No compression</option>
+                     {% for name in available_download_compressions() %}
+                     <option value="{{ name }}"{% if name == 'gzip' and gzipped %} selected{% endif %}>{{ name }}</option>
+                     {% endfor %}
+                  </select>
                </div>
 
                <!-- Encryption toggle button removed -->
@@ -1103,6 +3405,18 @@ CSV_EDIT_HTML = r"""
                    style="height: 46px;">
                 Download
                 </button>
+               {% if public_url and public_url.startswith('s3://') and not is_s3_prefix(public_url) %}
+               <button
+                   type="submit"
+                   form="save-form"
+                   id="save-s3-btn"
+                   formaction="{{ url_for('save') }}"
+                   class="btn btn-ghost"
+                   title="Save modified file back to S3"
+                   style="height: 46px;">
+                Save
+                </button>
+               {% endif %}
                <style>
                   /* CSV Don't Encrypt hover/selected */
                   #csvDontEncryptToggleBtn { height: 46px; width: 46px; }
@@ -1136,7 +3450,7 @@ CSV_EDIT_HTML = r"""
          <div class="flex items-center justify-between mb-4 space-x-2">
             <!-- Left: Record count -->
             <div class="btn btn-ghost text-lg record-info whitespace-nowrap flex items-center" style="height: 46px; cursor: default; pointer-events: none;">
-               <span class="font-bold">{{ start_rec }}</span>&nbsp;–&nbsp;<span class="font-bold">{{ end_rec }}</span>&nbsp;of&nbsp;<span class="font-bold">{{ total_rows }}</span>
+               <span class="font-bold">{{ start_rec }}</span>&nbsp;–&nbsp;<span class="font-bold">{{ end_rec }}</span>&nbsp;of&nbsp;<span class="font-bold">{{ total_rows }}{% if loading %}+{% endif %}</span>
             </div>
             <!-- Center: Pagination controls (only show if more than one page) -->
             {% if page_count > 1 %}
@@ -1164,14 +3478,14 @@ CSV_EDIT_HTML = r"""
             {% endif %}
             {% endif %}
             <div class="flex items-center justify-end flex-1">
-               <div class="flex items-center space-x-2">
+               <div id="pagination-controls" class="flex items-center space-x-2">
                   {# Previous page #}
                   {% if page > 1 %}
-                  <a href="{{ url_for('csv_page', page=page-1) }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">‹</a>
+                  <a href="{{ url_for('csv_page', page=page-1) }}" data-page="{{ page-1 }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">‹</a>
                   {% endif %}
                   {# First page if not in window #}
                   {% if start_page > 1 %}
-                  <a href="{{ url_for('csv_page', page=1) }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">1</a>
+                  <a href="{{ url_for('csv_page', page=1) }}" data-page="1" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">1</a>
                   {% if start_page > 2 %}
                   <span class="px-2 text-gray-500 flex items-center" style="height: 46px;">…</span>
                   {% endif %}
@@ -1181,7 +3495,7 @@ CSV_EDIT_HTML = r"""
                   {% if p == page %}
                   <span class="btn btn-ghost page-btn active" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center;">{{ p }}</span>
                   {% else %}
-                  <a href="{{ url_for('csv_page', page=p) }}" class="btn btn-ghost page-btn {% if p == page %}active{% endif %}" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">{{ p }}</a>
+                  <a href="{{ url_for('csv_page', page=p) }}" data-page="{{ p }}" class="btn btn-ghost page-btn {% if p == page %}active{% endif %}" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">{{ p }}</a>
                   {% endif %}
                   {% endfor %}
                   {# Last page if not in window #}
@@ -1189,18 +3503,20 @@ CSV_EDIT_HTML = r"""
                   {% if end_page < page_count - 1 %}
                   <span class="px-2 text-gray-500 flex items-center" style="height: 46px;">…</span>
                   {% endif %}
-                  <a href="{{ url_for('csv_page', page=page_count) }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">{{ page_count }}</a>
+                  <a href="{{ url_for('csv_page', page=page_count) }}" data-page="{{ page_count }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">{{ page_count }}</a>
                   {% endif %}
                   {# Next page #}
                   {% if page < page_count %}
-                  <a href="{{ url_for('csv_page', page=page+1) }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">›</a>
+                  <a href="{{ url_for('csv_page', page=page+1) }}" data-page="{{ page+1 }}" class="btn btn-ghost page-btn" style="min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;">›</a>
                   {% endif %}
 
                </div>
             </div>
             {% else %}
-            <!-- Empty flex space when no pagination -->
-            <div class="flex-1"></div>
+            <!-- Empty until more pages exist (e.g. while a large file is still loading) -->
+            <div class="flex items-center justify-end flex-1">
+               <div id="pagination-controls" class="flex items-center space-x-2"></div>
+            </div>
             {% endif %}
             <!-- Back button (always visible) -->
             <div class="flex items-center">
@@ -1259,19 +3575,166 @@ CSV_EDIT_HTML = r"""
 
       </div>
       <script>
-         // Cache key for this file
-         const cacheKey = "{{ cache_key }}";
-         console.log('CSV Editor loaded with cache key:', cacheKey);
+         // Per-page editor state; the editor logic itself is the cached csv_edit.js asset
+         const cacheKey = {{ cache_key | tojson }};
+         const existingEdits = {{ edits | tojson }};
+         let currentPage = {{ page }};
+         let currentPerPage = {{ per_page }};
+         const csvPageBaseUrl = {{ url_for('csv_page') | tojson }};
+         const homeUrl = {{ url_for('home') | tojson }};
+         const csvEditUpdateUrl = {{ url_for('update_csv_edit') | tojson }};
+         // True while the rest of a large file is still loading behind this preview
+         const csvLoading = {{ loading | default(false) | tojson }};
+      </script>
+      <script src="{{ asset_url('csv_edit.js') }}"></script>
+   </body>
+</html>
+"""
 
-         // Load existing edits from server-provided data
-         const existingEdits = {{ edits_json | safe }};
-         console.log('CSV Editor data:', {
-             columns: {{ columns | tojson | safe }},
-             data: {{ data | tojson | safe }},
-             total_rows: {{ total_rows }},
-             per_page: {{ per_page }},
-             page_count: {{ page_count }}
-         });
+# Static assets for CSV_EDIT_HTML, served from /assets with long-lived caching
+CSV_EDIT_CSS = r"""
+         /* ==================== BASE STYLES ==================== */
+         * { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; }
+         body, html, input, textarea, select, button, div, span, label, p, h1, h2, h3, h4, h5, h6, option, td, th { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; }
+         .theme-transition { transition: all 0.3s ease; }
+         /* ==================== BUTTON STYLES ==================== */
+         .btn { padding: 0.625rem 1.25rem; font-weight: 500; border-radius: 0; transition: all 0.2s ease; border: none; cursor: pointer; display: inline-flex; align-items: center; justify-content: center; gap: 0.5rem; font-size: 0.875rem; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); height: 46px; }
+         .btn:hover { transform: translateY(-1px); box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06); }
+         .btn:active { transform: translateY(0); box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
+         .btn:disabled { opacity: 0.5; cursor: not-allowed; transform: none; box-shadow: none; }
+         .btn-primary { background-color: #6366f1; color: white; }
+         .btn-primary:hover:not(:disabled) { background-color: #4f46e5; }
+         .btn-secondary { background-color: #64748b; color: white; }
+         .btn-secondary:hover:not(:disabled) { background-color: #475569; }
+         .btn-success { background-color: #10b981; color: white; }
+         .btn-success:hover:not(:disabled) { background-color: #059669; }
+         .btn-ghost { background-color: transparent; color: #64748b; box-shadow: none; border: 1px solid #e2e8f0; }
+         .btn-ghost:hover:not(:disabled) { background-color: #f8fafc; border-color: #cbd5e1; box-shadow: 0 1px 2px 0 rgba(0, 0, 0, 0.05); }
+         /* ==================== INPUT STYLES ==================== */
+         input[type="text"], select { border-radius: 0; border: 1px solid #e2e8f0; padding: 0.625rem 1rem; font-size: 0.875rem; transition: all 0.2s ease; }
+         input[type="text"]:focus, select:focus { outline: none; border-color: inherit; box-shadow: none; }
+         /* ==================== DARK THEME ==================== */
+         body.dark-theme { background-color: #1e293b !important; color: #e2e8f0 !important; }
+         .dark-theme input, .dark-theme select { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
+         .dark-theme input:focus, .dark-theme select:focus { outline: none !important; border-color: #475569 !important; box-shadow: none !important; }
+         .dark-theme table { background-color: #1e293b !important; border-radius: 0; overflow: hidden; }
+         .dark-theme thead { background-color: #334155 !important; }
+         .dark-theme th, .dark-theme td { border-color: #475569 !important; color: #e2e8f0 !important; }
+         .dark-theme td[contenteditable] { background-color: #1e293b !important; }
+         .dark-theme td[contenteditable]:hover { background-color: #334155 !important; }
+         .dark-theme td[contenteditable]:focus { background-color: #334155 !important; outline: none !important; }
+         .dark-theme .btn-primary { background-color: #6366f1 !important; }
+         .dark-theme .btn-primary:hover:not(:disabled) { background-color: #4f46e5 !important; }
+         .dark-theme .btn-secondary { background-color: #475569 !important; }
+         .dark-theme .btn-secondary:hover:not(:disabled) { background-color: #334155 !important; }
+         .dark-theme .btn-ghost { background-color: transparent !important; color: #94a3b8 !important; border-color: #475569 !important; }
+         .dark-theme .btn-ghost:hover:not(:disabled) { background-color: #334155 !important; border-color: #64748b !important; }
+         .dark-theme .theme-select { background-color: #334155 !important; color: #e2e8f0 !important; border-color: #475569 !important; }
+         .dark-theme .page-btn { background-color: #334155 !important; color: #e2e8f0 !important; border: 1px solid #475569 !important; }
+         .dark-theme .page-btn:hover { background-color: #475569 !important; }
+         .dark-theme .page-btn.active { background-color: #334155 !important; color: #94a3b8 !important; border-color: #64748b !important; }
+         .dark-theme .record-info { color: #cbd5e1 !important; }
+         .dark-theme .record-info span { color: #e2e8f0 !important; }
+         /* ==================== WHITE THEME ==================== */
+         body.white-theme { background-color: #f1f5f9 !important; }
+         .white-theme table { background-color: #ffffff !important; border-radius: 0; overflow: hidden; }
+         .white-theme thead { background-color: #f3f4f6 !important; }
+         .white-theme th, .white-theme td { border-color: #e5e7eb !important; }
+         .white-theme .page-btn { background-color: #ffffff !important; color: #1e293b !important; border: 1px solid #e2e8f0 !important; }
+         .white-theme .page-btn:hover { background-color: #e5e7eb !important; color: #1e293b !important; border-color: #d1d5db !important; }
+         .white-theme .page-btn.active { background-color: rgba(0, 0, 0, 0.05) !important; color: #64748b !important; border-color: rgba(0, 0, 0, 0.1) !important; }
+         .white-theme .btn-ghost { border-color: #e2e8f0 !important; }
+         .white-theme .btn-ghost:hover:not(:disabled) { background-color: #f8fafc !important; }
+         .white-theme .record-info { color: #6b7280 !important; }
+         .white-theme .record-info span { color: #1f2937 !important; }
+         .white-theme .main-container { background-color: #f8fafc !important; color: #1e293b !important; border-radius: 0; }
+         .white-theme input, .white-theme select { background-color: #f8fafc !important; color: #1e293b !important; border-color: #e2e8f0 !important; }
+         .white-theme input:focus, .white-theme select:focus { outline: none !important; border-color: #e2e8f0 !important; box-shadow: none !important; }
+         /* ==================== PINK THEME ==================== */
+         body.pink-theme { background-color: #fdf2f8 !important; color: #831843 !important; }
+         .pink-theme input, .pink-theme select { background-color: #fce7f3 !important; color: #831843 !important; border-color: #fbcfe8 !important; }
+         .pink-theme input:focus, .pink-theme select:focus { outline: none !important; border-color: #fbcfe8 !important; box-shadow: none !important; }
+         .pink-theme table { background-color: #ffffff !important; border-radius: 0; overflow: hidden; }
+         .pink-theme thead { background-color: #fce7f3 !important; }
+         .pink-theme th, .pink-theme td { border-color: #fbcfe8 !important; color: #831843 !important; }
+         .pink-theme td[contenteditable] { background-color: #ffffff !important; }
+         .pink-theme td[contenteditable]:hover { background-color: #fce7f3 !important; }
+         .pink-theme td[contenteditable]:focus { background-color: #fce7f3 !important; outline: none !important; }
+         .pink-theme .btn-primary { background-color: #ec4899 !important; }
+         .pink-theme .btn-primary:hover:not(:disabled) { background-color: #db2777 !important; }
+         .pink-theme .btn-success { background-color: #db2777 !important; color: #ffffff !important; }
+         .pink-theme .btn-success:hover:not(:disabled) { background-color: #be185d !important; }
+         .pink-theme .btn-secondary { background-color: #ec4899 !important; color: #ffffff !important; }
+         .pink-theme .btn-secondary:hover:not(:disabled) { background-color: #db2777 !important; }
+         .pink-theme .btn-ghost { color: #be185d !important; border-color: #fbcfe8 !important; }
+         .pink-theme .btn-ghost:hover:not(:disabled) { background-color: #fce7f3 !important; border-color: #f9a8d4 !important; }
+         .pink-theme .theme-select { background-color: #fce7f3 !important; color: #831843 !important; border-color: #fbcfe8 !important; }
+         .pink-theme .page-btn { background-color: #fce7f3 !important; color: #831843 !important; border: 1px solid #fbcfe8 !important; }
+         .pink-theme .page-btn:hover { background-color: #fbcfe8 !important; }
+         .pink-theme .page-btn.active { background-color: #fce7f3 !important; color: #be185d !important; border-color: #f9a8d4 !important; }
+         .pink-theme .record-info { color: #be185d !important; }
+         .pink-theme .record-info span { color: #831843 !important; font-weight: 700 !important; }
+         /* ==================== SELECTED BUTTON STATES ==================== */
+         .btn-ghost.selected { background-color: #334155 !important; border-color: #64748b !important; }
+         .dark-theme .btn-ghost.selected { background-color: #334155 !important; border-color: #64748b !important; }
+         .white-theme .btn-ghost.selected { background-color: #f8fafc !important; border-color: #e2e8f0 !important; }
+         .pink-theme .btn-ghost.selected { background-color: #fce7f3 !important; border-color: #f9a8d4 !important; }
+         /* ==================== COMMON STYLES ==================== */
+         .witty-message { font-weight: 400 !important; font-size: 0.875rem !important; margin-top: 0.25rem !important; opacity: 0.8; }
+         .dark-theme .witty-message { color: #cbd5e1 !important; }
+         .white-theme .witty-message { color: #64748b !important; }
+         .pink-theme .witty-message { color: #db2777 !important; }
+         .greeting-text { font-weight: 500 !important; font-size: 1.25rem !important; }
+         p.greeting-text { font-weight: 500 !important; font-size: 1.25rem !important; }
+                   .dark-theme .greeting-text { color: #94a3b8 !important; }
+          .white-theme .greeting-text { color: #64748b !important; }
+          .pink-theme .greeting-text { color: #be185d !important; }
+          .dark-theme .big-greeting { color: #94a3b8 !important; }
+          .dark-theme .big-time { font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; color: #e2e8f0 !important; }
+          .dark-theme .big-day-date { color: #94a3b8 !important; }
+          .white-theme .big-greeting { color: #64748b !important; }
+          .white-theme .big-time { color: #1e293b !important; font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; }
+          .white-theme .big-day-date { color: #64748b !important; font-size: 0.875rem !important; font-weight: 500 !important; line-height: 1.2 !important; }
+          .pink-theme .big-greeting { color: #be185d !important; }
+          .pink-theme .big-time { color: #831843 !important; font-size: 1.5rem !important; font-weight: 700 !important; line-height: 1.2 !important; }
+          .pink-theme .big-day-date { color: #be185d !important; font-size: 0.875rem !important; font-weight: 500 !important; line-height: 1.2 !important; }
+         /* ==================== MODULE BADGE ==================== */
+         .module-badge { border-radius: 0; border: 1px solid; font-weight: 600; font-size: 14px; min-width: 60px; text-align: center; }
+         .dark-theme .module-badge { background-color: #374151 !important; color: #e0e7ff !important; border-color: #4b5563 !important; }
+         .white-theme .module-badge { background-color: #ffffff !important; color: #1e40af !important; border-color: #d1d5db !important; }
+         .pink-theme .module-badge { background-color: #fdf2f8 !important; color: #be185d !important; border-color: #f9a8d4 !important; }
+         /* ==================== DROPDOWNS ==================== */
+         .module-dropdown { font-weight: 500; border-radius: 0px !important; }
+         .theme-dropdown { border: 1px solid #d1d5db; font-weight: 500; padding: 8px 12px !important; border-radius: 0px !important; font-size: 14px !important; height: 46px !important; }
+         .dark-theme .module-dropdown, .dark-theme .theme-dropdown { background-color: #374151 !important; color: #e0e7ff !important; border-color: #4b5563 !important; }
+         .white-theme .module-dropdown, .white-theme .theme-dropdown { background-color: #f8fafc !important; color: #1e293b !important; border: 1px solid #e2e8f0 !important; padding: 8px 12px !important; border-radius: 0px !important; font-size: 14px !important; height: 46px !important; }
+         .pink-theme .module-dropdown, .pink-theme .theme-dropdown { background-color: #fdf2f8 !important; color: #be185d !important; border-color: #f9a8d4 !important; }
+         /* ==================== EDITED CELLS ==================== */
+         td.edited { background-color: #fef3c7 !important; position: relative; }
+         td.edited::after { content: ''; position: absolute; top: 0; right: 0; width: 0; height: 0; border-style: solid; border-width: 0 8px 8px 0; border-color: transparent #f59e0b transparent transparent; }
+         .dark-theme td.edited { background-color: #1e3a8a !important; }
+         .dark-theme td.edited::after { border-color: transparent #3b82f6 transparent transparent; }
+         .white-theme td.edited { background-color: #fef3c7 !important; }
+         .white-theme td.edited::after { border-color: transparent #f59e0b transparent transparent; }
+         .pink-theme td.edited { background-color: #f3e8ff !important; }
+         .pink-theme td.edited::after { border-color: transparent #a855f7 transparent transparent; }
+         .edit-indicator { margin-left: 10px; padding: 2px 8px; background: #f59e0b; color: white; border-radius: 0; font-size: 0.75rem; font-weight: normal; }
+         .dark-theme .edit-indicator { background: #3b82f6; }
+         .pink-theme .edit-indicator { background: #a855f7; }
+         /* ==================== CELL EDITING ==================== */
+         td[contenteditable] { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; min-width: 80px; max-width: 500px; min-height: 24px; }
+         td[contenteditable]:focus { overflow: visible; text-overflow: clip; max-width: none; }
+         td[contenteditable] div { display: inline; }
+         td[contenteditable]:empty { min-height: 24px; }
+         td[contenteditable]:hover:not(.edited) { background-color: #f3f4f6 !important; }
+         .dark-theme td[contenteditable]:hover:not(.edited) { background-color: #374151 !important; }
+         .pink-theme td[contenteditable]:hover:not(.edited) { background-color: #fce7f3 !important; }
+         table { width: auto !important; min-width: 100%; }
+"""
+
+CSV_EDIT_JS = r"""
+         // cacheKey, existingEdits, currentPage, currentPerPage and the endpoint URLs are set inline by CSV_EDIT_HTML
+         console.log('CSV Editor loaded with cache key:', cacheKey);
 
          // Function to handle pagination count changes (kept for compatibility)
          function updatePaginationCount(newPerPage) {
@@ -1291,6 +3754,7 @@ CSV_EDIT_HTML = r"""
                  if (data.success) {
                      // Update hidden field
                      document.getElementById('per_page_hidden').value = newPerPage;
+                     currentPerPage = parseInt(newPerPage);
                      // Reload current page with new pagination
                      const currentPage = getCurrentPage();
                      changePage(currentPage);
@@ -1423,24 +3887,99 @@ CSV_EDIT_HTML = r"""
 
              if (current !== original) {
                existingEdits[key] = current;
+               pendingEdits[key] = current;
                e.target.classList.add('edited');
              } else {
                delete existingEdits[key];
+               pendingEdits[key] = null;
                e.target.classList.remove('edited');
              }
 
              updateEditCount();
+             scheduleEditFlush();
+           }
+         });
 
-             // Send update to server
-             fetch('/update-csv-edit', {
-               method: 'POST',
-               headers: {
-                 'Content-Type': 'application/json',
-               },
-               body: JSON.stringify({
-                 cache_key: cacheKey,
-                 edits: existingEdits
-               })
+         // Cell changes not yet sent to the server's edit journal ({"row,col": value|null})
+         let pendingEdits = {};
+         let editFlushTimer = null;
+         const EDIT_FLUSH_DELAY_MS = 500;
+
+         function scheduleEditFlush() {
+           clearTimeout(editFlushTimer);
+           editFlushTimer = setTimeout(flushEdits, EDIT_FLUSH_DELAY_MS);
+         }
+
+         // Send the batched deltas; on failure they are merged back for the next flush
+         function flushEdits() {
+           clearTimeout(editFlushTimer);
+           const changes = pendingEdits;
+           if (Object.keys(changes).length === 0) {
+             return Promise.resolve();
+           }
+           pendingEdits = {};
+           return fetch(csvEditUpdateUrl, {
+             method: 'POST',
+             headers: {
+               'Content-Type': 'application/json',
+             },
+             body: JSON.stringify({
+               cache_key: cacheKey,
+               changes: changes
+             })
+           })
+           .then(response => response.json())
+           .then(data => {
+             if (!data.success) {
+               throw new Error(data.error || 'Could not save edits');
+             }
+           })
+           .catch(error => {
+             console.error('Error saving edits:', error);
+             pendingEdits = Object.assign(changes, pendingEdits);
+             scheduleEditFlush();
+           });
+         }
+
+         // Don't lose the last keystrokes when the page is closed or reloaded
+         window.addEventListener('pagehide', function() {
+           if (Object.keys(pendingEdits).length === 0) {
+             return;
+           }
+           const body = JSON.stringify({ cache_key: cacheKey, changes: pendingEdits });
+           if (navigator.sendBeacon(csvEditUpdateUrl, new Blob([body], { type: 'application/json' }))) {
+             pendingEdits = {};
+           }
+         });
+
+         document.getElementById('save-form').addEventListener('submit', function(e) {
+           // Only the Save button writes to S3; Download needs no path
+           if (!e.submitter || e.submitter.id !== 'save-s3-btn') return;
+           const path = document.getElementById('public_url').value.trim();
+           // must start with s3://
+           const s3Prefix = /^s3:\/\//i;
+           // must end in .csv or .csv.gz (case-insensitive)
+           const validExt  = /\.(?:csv|csv\.gz)$/i;
+
+           if (!s3Prefix.test(path) || !validExt.test(path)) {
+             e.preventDefault();
+             e.stopImmediatePropagation();
+             alert('Please provide a valid S3 path (e.g. s3://my-bucket/path/to/file.csv) ending in .csv or .csv.gz');
+           }
+         });
+
+         // Download and save read edits from the server journal, so flush before submitting
+         document.getElementById('save-form').addEventListener('submit', function(e) {
+           if (Object.keys(pendingEdits).length > 0) {
+             e.preventDefault();
+             const form = this;
+             // form.submit() ignores the clicked button's formaction, so carry it over
+             const action = e.submitter && e.submitter.hasAttribute('formaction') ? e.submitter.formAction : form.action;
+             flushEdits().finally(() => {
+               const defaultAction = form.action;
+               form.action = action;
+               form.submit();
+               form.action = defaultAction;
              });
            }
          });
@@ -1521,8 +4060,7 @@ CSV_EDIT_HTML = r"""
            updateEditCount();
          });
 
-      </script>
-      <script>
+      
 
                    function submitData(form) {
             // Include all edits from all pages
@@ -1545,22 +4083,10 @@ CSV_EDIT_HTML = r"""
 
             return true;
           }
-      </script>
-      <script>
-         document.getElementById('save-form').addEventListener('submit', function(e) {
-           const path = document.getElementById('s3_path').value.trim();
-           // must start with s3://
-           const s3Prefix = /^s3:\/\//i;
-           // must end in .csv, .json, .jsonl or .csv.gz (case-insensitive)
-           const validExt  = /\.(?:csv|json|jsonl|csv\.gz)$/i;
+      
+
+      
 
-           if (!s3Prefix.test(path) || !validExt.test(path)) {
-             e.preventDefault();
-             showModalMessage('Save', 'Please provide a valid S3 path (e.g. s3://my-bucket/path/to/file.csv) with one of these extensions: .csv, .json, .jsonl, .csv.gz');
-           }
-         });
-      </script>
-      <script>
          // Toggle CSV don't encrypt preference
            function toggleCsvDontEncrypt() {
              const btn = document.getElementById('csvDontEncryptToggleBtn');
@@ -1608,11 +4134,11 @@ CSV_EDIT_HTML = r"""
              updateCsvDontEncryptHiddenField();
            });
 
-           // Pagination function
-           function changePage(page) {
-             // Save current page edits before changing pages
-             saveCurrentPageEdits();
+           // Page URLs match the server-rendered links (/csv-edit/<page>)
+           const csvPageUrl = (page) => csvPageBaseUrl + '/' + page;
 
+           // Pagination function - fetches only the row slice as JSON
+           function changePage(page, pushHistory = true) {
              // Show loading indicator
              const recordInfo = document.querySelector('.record-info');
              if (recordInfo) {
@@ -1627,15 +4153,17 @@ CSV_EDIT_HTML = r"""
                },
                body: new URLSearchParams({
                  'page': page,
-                 'cache_key': '{{ cache_key }}',
-                 'public_url': '{{ public_url }}'
+                 'per_page': currentPerPage,
+                 'cache_key': cacheKey
                })
              })
              .then(response => response.json())
              .then(data => {
                if (data.success) {
+                 currentPage = data.page;
+
                  // Update the table with new data
-                 updateTableWithData(data.data);
+                 updateTableWithData(data.data, data.start);
 
                  // Update pagination info
                  if (recordInfo) {
@@ -1643,134 +4171,163 @@ CSV_EDIT_HTML = r"""
                  }
 
                  // Update current page indicator
-                 updatePaginationButtons(page, data.page_count);
+                 updatePaginationButtons(data.page, data.page_count);
 
                  // Update URL without page reload
-                 const url = new URL(window.location);
-                 url.searchParams.set('page', page);
-                 window.history.pushState({}, '', url);
+                 if (pushHistory) {
+                   window.history.pushState({page: data.page}, '', csvPageUrl(data.page));
+                 }
+               } else if (data.reload) {
+                 alert(data.error);
+                 window.location.href = homeUrl;
                } else {
                  alert('Error loading page: ' + data.error);
                }
              })
              .catch(error => {
-               console.error('Error:', error);
-               alert('Error loading page. Please try again.');
-             });
-           }
-
-           // Function to save edits from current page
-           function saveCurrentPageEdits() {
-             const tbody = document.getElementById('tableBody');
-             if (!tbody) return;
-
-             const rows = tbody.querySelectorAll('tr');
-             const headers = Array.from(document.querySelectorAll('thead th')).map(th => th.textContent.trim());
-
-             rows.forEach((tr, rowIndex) => {
-               const cells = tr.querySelectorAll('td');
-               cells.forEach((cell, colIndex) => {
-                 if (cell.classList.contains('edited')) {
-                   const header = headers[colIndex];
-                   const originalValue = cell.getAttribute('data-original') || cell.textContent;
-                   const currentValue = cell.textContent.trim();
-
-                   if (currentValue !== originalValue) {
-                     // Calculate global row index based on current page
-                     const currentPage = getCurrentPage();
-                     const perPage = {{ per_page }};
-                     const globalRowIndex = (currentPage - 1) * perPage + rowIndex;
-
-                     if (!existingEdits[globalRowIndex]) existingEdits[globalRowIndex] = {};
-                     existingEdits[globalRowIndex][header] = currentValue;
-                   }
-                 }
-               });
+               console.error('Error:', error);
+               alert('Error loading page. Please try again.');
+             });
+           }
+
+           // Large files open on a preview of their first rows; follow the row count until all are loaded
+           function pollCsvLoad() {
+             fetch('/csv-page', {
+               method: 'POST',
+               headers: {
+                 'Content-Type': 'application/x-www-form-urlencoded',
+               },
+               body: new URLSearchParams({
+                 'page': currentPage,
+                 'per_page': currentPerPage,
+                 'cache_key': cacheKey
+               })
+             })
+             .then(response => response.json())
+             .then(data => {
+               if (!data.success) return;
+               if (data.load_error) {
+                 alert('Only the first rows could be loaded: ' + data.load_error);
+                 return;
+               }
+               const recordInfo = document.querySelector('.record-info');
+               if (recordInfo && data.page === currentPage) {
+                 recordInfo.innerHTML = '<span class="font-bold">' + data.start_rec + '</span>&nbsp;–&nbsp;<span class="font-bold">' + data.end_rec + '</span>&nbsp;of&nbsp;<span class="font-bold">' + data.total_rows + (data.loading ? '+' : '') + '</span>';
+                 updatePaginationButtons(data.page, data.page_count);
+               }
+               if (data.loading) setTimeout(pollCsvLoad, 2000);
+             })
+             .catch(error => {
+               console.error('Error checking load progress:', error);
+               setTimeout(pollCsvLoad, 5000);
              });
            }
+           if (csvLoading) setTimeout(pollCsvLoad, 1000);
 
            // Function to get current page number
            function getCurrentPage() {
-             const urlParams = new URLSearchParams(window.location.search);
-             return parseInt(urlParams.get('page')) || 1;
+             return currentPage;
            }
 
-           // Function to update table with new data
-           function updateTableWithData(data) {
+           // Function to update table with new data (rows are arrays in column order)
+           function updateTableWithData(rows, start) {
              const tbody = document.getElementById('tableBody');
              if (!tbody) return;
 
-             // Clear existing rows
-             tbody.innerHTML = '';
-
-             // Add new rows
-             data.forEach((row, localRowIndex) => {
+             const fragment = document.createDocumentFragment();
+             rows.forEach((row, localRowIndex) => {
+               const globalRowIndex = start + localRowIndex;
                const tr = document.createElement('tr');
-               const headers = Array.from(document.querySelectorAll('thead th')).map(th => th.textContent.trim());
+               tr.dataset.row = globalRowIndex;
 
-               headers.forEach((header, colIndex) => {
+               row.forEach((value, colIndex) => {
                  const td = document.createElement('td');
-                 td.contentEditable = true;
+                 const original = (value || '').replace(/\r\n|\n|\r/g, ' ').trim();
+                 const key = `${globalRowIndex},${colIndex}`;
 
-                 // Get the value, checking for edits first
-                 const currentPage = getCurrentPage();
-                 const perPage = {{ per_page }};
-                 const globalRowIndex = (currentPage - 1) * perPage + localRowIndex;
-
-                 let value = row[header] || '';
-
-                 // Check if there's an edit for this cell
-                 if (existingEdits[globalRowIndex] && existingEdits[globalRowIndex][header]) {
-                   value = existingEdits[globalRowIndex][header];
+                 td.contentEditable = true;
+                 td.className = 'border px-2 py-1';
+                 td.style.whiteSpace = 'nowrap';
+                 td.dataset.row = globalRowIndex;
+                 td.dataset.col = colIndex;
+                 td.dataset.original = original;
+
+                 // Check if there's an edit for this cell (edit tracking is handled by the tbody input listener)
+                 if (key in existingEdits) {
+                   td.textContent = existingEdits[key];
                    td.classList.add('edited');
+                 } else {
+                   td.textContent = original;
                  }
 
-                 // Store original value for comparison
-                 td.setAttribute('data-original', row[header] || '');
-                 td.textContent = value;
-
-                 td.addEventListener('blur', function() {
-                   // Handle cell editing
-                   const currentValue = td.textContent.trim();
-                   const originalValue = td.getAttribute('data-original') || '';
-
-                   if (currentValue !== originalValue) {
-                     if (!existingEdits[globalRowIndex]) existingEdits[globalRowIndex] = {};
-                     existingEdits[globalRowIndex][header] = currentValue;
-                     td.classList.add('edited');
-                   } else {
-                     td.classList.remove('edited');
-                     if (existingEdits[globalRowIndex]) {
-                       delete existingEdits[globalRowIndex][header];
-                       if (Object.keys(existingEdits[globalRowIndex]).length === 0) {
-                         delete existingEdits[globalRowIndex];
-                       }
-                     }
-                   }
-                 });
-
                  tr.appendChild(td);
                });
-               tbody.appendChild(tr);
+               fragment.appendChild(tr);
              });
+             tbody.replaceChildren(fragment);
            }
 
-           // Function to update pagination buttons
+           // Function to rebuild pagination buttons using the same window as the server template
            function updatePaginationButtons(currentPage, totalPages) {
-             const pageButtons = document.querySelectorAll('.page-btn');
-             pageButtons.forEach(btn => {
-               if (btn.textContent.trim() === currentPage.toString()) {
-                 btn.classList.add('active');
-                 btn.disabled = true;
+             const container = document.getElementById('pagination-controls');
+             if (!container) return;
+
+             const maxVisiblePages = 7;
+             const windowThreshold = 5;
+             let startPage = 1;
+             let endPage = totalPages;
+             if (totalPages > maxVisiblePages) {
+               if (currentPage <= windowThreshold) {
+                 endPage = maxVisiblePages;
+               } else if (currentPage > totalPages - windowThreshold) {
+                 startPage = totalPages - maxVisiblePages + 1;
                } else {
-                 btn.classList.remove('active');
-                 btn.disabled = false;
+                 startPage = currentPage - 3;
+                 endPage = currentPage + 3;
                }
+             }
+
+             const btnStyle = 'min-width: 40px; height: 46px; display: inline-flex; align-items: center; justify-content: center; text-decoration: none;';
+             const link = (label, page) => `<a href="${csvPageUrl(page)}" data-page="${page}" class="btn btn-ghost page-btn" style="${btnStyle}">${label}</a>`;
+             const ellipsis = '<span class="px-2 text-gray-500 flex items-center" style="height: 46px;">…</span>';
+
+             let html = '';
+             if (currentPage > 1) html += link('‹', currentPage - 1);
+             if (startPage > 1) {
+               html += link(1, 1);
+               if (startPage > 2) html += ellipsis;
+             }
+             for (let p = startPage; p <= endPage; p++) {
+               html += p === currentPage
+                 ? `<span class="btn btn-ghost page-btn active" style="${btnStyle}">${p}</span>`
+                 : link(p, p);
+             }
+             if (endPage < totalPages) {
+               if (endPage < totalPages - 1) html += ellipsis;
+               html += link(totalPages, totalPages);
+             }
+             if (currentPage < totalPages) html += link('›', currentPage + 1);
+             container.innerHTML = html;
+           }
+
+           // Page links switch pages in place instead of re-rendering the editor
+           const paginationControls = document.getElementById('pagination-controls');
+           if (paginationControls) {
+             paginationControls.addEventListener('click', function(e) {
+               const link = e.target.closest('a[data-page]');
+               if (!link || e.metaKey || e.ctrlKey || e.shiftKey) return;
+               e.preventDefault();
+               changePage(parseInt(link.dataset.page));
              });
            }
-      </script>
-   </body>
-</html>
+
+           // Browser back/forward between pages
+           window.addEventListener('popstate', function(e) {
+             if (e.state && e.state.page) {
+               changePage(e.state.page, false);
+             }
+           });
+           window.history.replaceState({page: currentPage}, '', window.location.href);
 """
 
 # Raw editor HTML template matching workbench.py Monaco editor styling
@@ -1818,7 +4375,127 @@ RAW_EDIT_HTML = r"""
       <link href="https://fonts.googleapis.com/css2?family=Ubuntu+Mono:wght@400;700&display=swap" rel="stylesheet">
       <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@fontsource/fira-code@5.0.18/400.css">
       <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@fontsource/cascadia-code@5.0.7/400.css">
-      <style>
+      <link rel="stylesheet" href="{{ asset_url('raw_edit.css') }}">
+   </head>
+   <body class="min-h-screen">
+      <script>
+         // Set dark theme by default
+         document.documentElement.className = 'dark-theme';
+         document.body.className = 'min-h-screen dark-theme';
+
+
+      </script>
+      <div class="w-full min-h-screen main-container theme-transition p-8">
+         <!-- Header Section - Simplified -->
+         <div class="flex items-center justify-between mb-6">
+            <div class="flex items-center space-x-3">
+               <a href="{{ url_for('home') }}">
+                  <h1 class="text-3xl font-bold">🖥️&nbsp;WorkBench</h1>
+               </a>
+            </div>
+            <!-- Right side: Theme selector -->
+            <div class="flex items-center space-x-4">
+               <!-- Theme Selector -->
+               <div class="flex items-center space-x-2">
+                  <select id="theme-select" class="theme-select" onchange="changeTheme(this.value)" style="height: 40px;">
+                     <option value="dark">🌃 Dark</option>
+                     <option value="white">🔆 White</option>
+                  </select>
+               </div>
+            </div>
+         </div>
+
+         <!-- File Path Input Section with Controls -->
+         <div class="mb-4">
+            <div class="flex items-center space-x-2">
+               <input 
+                  type="text" 
+                  id="file-path-input" 
+                  name="file_path" 
+                  value="{{ actual_file_path if actual_file_path else '' }}"
+                  placeholder="Enter file path or URL"
+                  class="flex-1 border px-4 py-2 text-base theme-transition"
+                  style="height: 46px;"
+                  readonly>
+               <a
+                  href="{{ url_for('home') }}"
+                  class="btn btn-ghost btn-icon"
+                  title="Back to home"
+                  style="height: 46px; width: 46px; padding: 0; font-size: 14px;">
+               ←
+               </a>
+               <button type="button" id="fullscreen-btn" class="btn btn-ghost btn-icon" title="Fullscreen" aria-label="Fullscreen" style="display:inline-flex;align-items:center;justify-content:center;width:46px;height:46px;padding:0;">
+                  <svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                     <polyline points="15 3 21 3 21 9"></polyline>
+                     <polyline points="9 21 3 21 3 15"></polyline>
+                     <line x1="21" y1="3" x2="14" y2="10"></line>
+                     <line x1="3" y1="21" x2="10" y2="14"></line>
+                  </svg>
+               </button>
+               <select id="compression-select" class="theme-select" title="Download compression" style="height: 46px;">
+                  <option value="">No compression</option>
+                  {% for name in available_download_compressions() %}
+                  <option value="{{ name }}">{{ name }}</option>
+                  {% endfor %}
+               </select>
+               {% if not raw_inline %}
+               <span id="raw-load-status" class="text-sm" style="white-space: nowrap; opacity: 0.8;"></span>
+               {% endif %}
+               <button
+                  type="button"
+                  id="download-btn"
+                  class="btn btn-ghost"
+                  title="Download file content"
+                  style="height: 46px;"
+                  onclick="downloadContent()">
+               Download
+               </button>
+               {% if actual_file_path and actual_file_path.startswith('s3://') %}
+               <button
+                  type="button"
+                  id="save-s3-btn"
+                  class="btn btn-ghost"
+                  title="Save file back to S3"
+                  style="height: 46px;"
+                  onclick="saveToS3()">
+               Save
+               </button>
+               {% endif %}
+            </div>
+         </div>
+         <!-- Code Editor Section -->
+         <textarea id="code_text" name="code_text" class="hidden-field">
+{{ code_text }}</textarea>
+         <div class="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 mb-4">
+            <div id="editor" style="height: 75vh; min-height: 500px; width: 100%; font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, 'Liberation Mono', 'Courier New', monospace !important; background: transparent; color: inherit; position: relative;">
+            </div>
+         </div>
+      </div>
+      <script>
+         // Per-file editor settings; the editor logic itself is the cached raw_edit.js asset
+         const rawEditorConfig = {
+           filename: {{ filename | tojson }},
+           actualFilePath: {{ actual_file_path | tojson }},
+           // Server copy of the file; saves and downloads send it only the edited line range
+           handle: {{ raw_handle | default(none) | tojson }},
+           // False for large files: the editor then holds a window of lines paged from the server
+           inline: {{ raw_inline | default(true) | tojson }},
+           numLines: {{ raw_meta.num_lines if raw_meta else 0 }},
+           pageLines: {{ raw_window_lines }},
+           maxWindowLines: {{ raw_max_window_lines }},
+           chunkUrl: {{ url_for('raw_chunk') | tojson }},
+           patchUrl: {{ url_for('raw_patch') | tojson }}
+         };
+      </script>
+      <script src="{{ asset_url('raw_edit.js') }}"></script>
+
+
+   </body>
+</html>
+"""
+
+# Static assets for RAW_EDIT_HTML, served from /assets with long-lived caching
+RAW_EDIT_CSS = r"""
          /* ==================== BASE STYLES ==================== */
          * { font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important; }
          /* ==================== COMMON STYLES ==================== */
@@ -1909,82 +4586,9 @@ RAW_EDIT_HTML = r"""
          .monaco-editor .codicon, .codicon { font: normal normal normal 16px/1 codicon !important; -webkit-font-smoothing: antialiased; -moz-osx-font-smoothing: grayscale; }
          .monaco-editor, .monaco-editor *:not(.codicon) { font-family: 'Cascadia Code', 'Fira Code', Consolas, 'Liberation Mono', 'Courier New', ui-monospace, SFMono-Regular, Menlo, Monaco, monospace !important; font-variant-ligatures: contextual; }
          .monaco-editor .glyph-margin, .monaco-editor .folding, .monaco-editor .margin-view-overlays { font-family: codicon !important; }
-      </style>
-   </head>
-   <body class="min-h-screen">
-      <script>
-         // Set dark theme by default
-         document.documentElement.className = 'dark-theme';
-         document.body.className = 'min-h-screen dark-theme';
-
-
-      </script>
-      <div class="w-full min-h-screen main-container theme-transition p-8">
-         <!-- Header Section - Simplified -->
-         <div class="flex items-center justify-between mb-6">
-            <div class="flex items-center space-x-3">
-               <a href="{{ url_for('home') }}">
-                  <h1 class="text-3xl font-bold">🖥️&nbsp;WorkBench</h1>
-               </a>
-            </div>
-            <!-- Right side: Theme selector -->
-            <div class="flex items-center space-x-4">
-               <!-- Theme Selector -->
-               <div class="flex items-center space-x-2">
-                  <select id="theme-select" class="theme-select" onchange="changeTheme(this.value)" style="height: 40px;">
-                     <option value="dark">🌃 Dark</option>
-                     <option value="white">🔆 White</option>
-                  </select>
-               </div>
-            </div>
-         </div>
+"""
 
-         <!-- File Path Input Section with Controls -->
-         <div class="mb-4">
-            <div class="flex items-center space-x-2">
-               <input 
-                  type="text" 
-                  id="file-path-input" 
-                  name="file_path" 
-                  value="{{ actual_file_path if actual_file_path else '' }}"
-                  placeholder="Enter file path or URL"
-                  class="flex-1 border px-4 py-2 text-base theme-transition"
-                  style="height: 46px;"
-                  readonly>
-               <a
-                  href="{{ url_for('home') }}"
-                  class="btn btn-ghost btn-icon"
-                  title="Back to home"
-                  style="height: 46px; width: 46px; padding: 0; font-size: 14px;">
-               ←
-               </a>
-               <button type="button" id="fullscreen-btn" class="btn btn-ghost btn-icon" title="Fullscreen" aria-label="Fullscreen" style="display:inline-flex;align-items:center;justify-content:center;width:46px;height:46px;padding:0;">
-                  <svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                     <polyline points="15 3 21 3 21 9"></polyline>
-                     <polyline points="9 21 3 21 3 15"></polyline>
-                     <line x1="21" y1="3" x2="14" y2="10"></line>
-                     <line x1="3" y1="21" x2="10" y2="14"></line>
-                  </svg>
-               </button>
-               <button
-                  type="button"
-                  id="download-btn"
-                  class="btn btn-ghost"
-                  title="Download file content"
-                  style="height: 46px;"
-                  onclick="downloadContent()">
-               Download
-               </button>
-            </div>
-         </div>
-         <!-- Code Editor Section -->
-         <textarea id="code_text" name="code_text" class="hidden-field">{{ code_text | safe }}</textarea>
-         <div class="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 mb-4">
-            <div id="editor" style="height: 75vh; min-height: 500px; width: 100%; font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, 'Liberation Mono', 'Courier New', monospace !important; background: transparent; color: inherit; position: relative;">
-            </div>
-         </div>
-      </div>
-      <script>
+RAW_EDIT_JS = r"""
          // Define before any use
          const USE_PLAIN_EDITOR = false;
 
@@ -2027,6 +4631,15 @@ RAW_EDIT_HTML = r"""
 
          // Download content function - POST to server to preserve filename
         function downloadContent() {
+          submitRawContent('/download_raw');
+        }
+
+        // Write the file back to the S3 path it was opened from
+        function saveToS3() {
+          submitRawContent('/save_raw', { s3_path: rawEditorConfig.actualFilePath });
+        }
+
+        function submitRawContent(action, extraFields) {
           let content = '';
           if (window.monaco && editor) {
             content = editor.getValue();
@@ -2035,12 +4648,12 @@ RAW_EDIT_HTML = r"""
             content = hidden ? hidden.value : '';
           }
 
-          const filename = '{{ filename }}' || '{{ actual_file_path }}' || 'workbench_file.txt';
+          const filename = rawEditorConfig.filename || rawEditorConfig.actualFilePath || 'workbench_file.txt';
 
-          // Build and submit a form to /download_raw
+          // Build and submit a form to the given endpoint
           const form = document.createElement('form');
           form.method = 'POST';
-          form.action = '/download_raw';
+          form.action = action;
 
           const codeField = document.createElement('input');
           codeField.type = 'hidden';
@@ -2054,16 +4667,244 @@ RAW_EDIT_HTML = r"""
           nameField.value = filename;
           form.appendChild(nameField);
 
-          const pathField = document.createElement('input');
-          pathField.type = 'hidden';
-          pathField.name = 'actual_file_path';
-          pathField.value = '{{ actual_file_path }}';
-          form.appendChild(pathField);
+          const pathField = document.createElement('input');
+          pathField.type = 'hidden';
+          pathField.name = 'actual_file_path';
+          pathField.value = rawEditorConfig.actualFilePath;
+          form.appendChild(pathField);
+
+          const compressionSelect = document.getElementById('compression-select');
+          const compressionField = document.createElement('input');
+          compressionField.type = 'hidden';
+          compressionField.name = 'compression';
+          compressionField.value = compressionSelect ? compressionSelect.value : '';
+          form.appendChild(compressionField);
+
+          Object.entries(extraFields || {}).forEach(([name, value]) => {
+            const field = document.createElement('input');
+            field.type = 'hidden';
+            field.name = name;
+            field.value = value;
+            form.appendChild(field);
+          });
+
+          document.body.appendChild(form);
+          const submit = () => {
+            form.submit();
+            document.body.removeChild(form);
+          };
+          if (!rawEditorConfig.handle || !editor) {
+            submit();
+            return;
+          }
+          // The server applies the pending edit to its copy and streams the result
+          codeField.value = '';
+          const handleField = document.createElement('input');
+          handleField.type = 'hidden';
+          handleField.name = 'raw_handle';
+          handleField.value = rawEditorConfig.handle;
+          form.appendChild(handleField);
+          rawWindowTask(() => {
+            const patch = pendingRawPatch();
+            if (patch && patch.joinsNext) {
+              // Joining with an unloaded line changes what the window shows, so go through /raw-patch
+              return sendRawPatch(patch).then(submit);
+            }
+            if (patch) {
+              const patchField = document.createElement('input');
+              patchField.type = 'hidden';
+              patchField.name = 'raw_patch';
+              patchField.value = JSON.stringify({ start: patch.start, end: patch.end, text: patch.text, version: rawDoc.version });
+              form.appendChild(patchField);
+              // The server accepts it as the next version (or the page leaves with an error)
+              patchApplied(patch, { version: rawDoc.version + 1, num_lines: rawDoc.numLines + patch.current.length - rawDoc.base.length });
+            }
+            submit();
+          });
+        }
+
+         // The model holds document lines [rawDoc.start, rawDoc.start + rawDoc.base.length): the whole file
+         // when it is inlined, otherwise a window of a large file. rawDoc.base is that range as the server
+         // has it; edits go out as one line-range patch (common prefix/suffix diff) when the window moves
+         // or the file is downloaded, so neither the upload nor the loaded slice grows with the file.
+         const rawDoc = { start: 0, base: [], numLines: rawEditorConfig.numLines, version: 0, dirty: false, busy: false, queue: Promise.resolve() };
+
+         function splitLines(text) {
+           return text.match(/[^\n]*\n|[^\n]+$/g) || [];
+         }
+
+         // Run window operations one at a time
+         function rawWindowTask(task) {
+           rawDoc.queue = rawDoc.queue.then(task).catch(error => console.error('Raw editor:', error));
+           return rawDoc.queue;
+         }
+
+         function updateRawLoadStatus() {
+           const status = document.getElementById('raw-load-status');
+           if (!status) return;
+           const first = rawDoc.base.length ? rawDoc.start + 1 : 0;
+           status.textContent = 'Lines ' + first.toLocaleString() + '–' + (rawDoc.start + rawDoc.base.length).toLocaleString() +
+             ' of ' + rawDoc.numLines.toLocaleString();
+         }
+
+         function fetchRawLines(start, end) {
+           const params = new URLSearchParams({ handle: rawEditorConfig.handle, start: start, end: end });
+           return fetch(rawEditorConfig.chunkUrl + '?' + params)
+             .then(response => response.json())
+             .then(data => {
+               if (!data.success) {
+                 if (data.reload) alert(data.error);
+                 throw new Error(data.error || 'Could not load file');
+               }
+               rawDoc.numLines = data.num_lines;
+               rawDoc.version = data.version;
+               return splitLines(data.text);
+             });
+         }
+
+         // The window's edits as a single line-range replacement, or null if nothing changed.
+         // Change events mark the model dirty, so clean windows are never re-read or compared.
+         function pendingRawPatch() {
+           if (!rawDoc.dirty) return null;
+           const current = splitLines(editor.getModel().getValue());
+           const base = rawDoc.base;
+           let prefix = 0;
+           while (prefix < current.length && prefix < base.length && current[prefix] === base[prefix]) prefix++;
+           let suffix = 0;
+           while (suffix < current.length - prefix && suffix < base.length - prefix &&
+                  current[current.length - 1 - suffix] === base[base.length - 1 - suffix]) suffix++;
+           rawDoc.dirty = false;
+           if (prefix === current.length && prefix === base.length) return null;
+
+           const windowEnd = rawDoc.start + base.length;
+           const last = current[current.length - 1];
+           return {
+             current: current,
+             start: rawDoc.start + prefix,
+             end: windowEnd - suffix,
+             text: current.slice(prefix, current.length - suffix).join(''),
+             // A removed final newline joins our last line with the next (unloaded) one
+             joinsNext: windowEnd < rawDoc.numLines && last !== undefined && !last.endsWith('\n')
+           };
+         }
+
+         function patchApplied(patch, data) {
+           rawDoc.version = data.version;
+           rawDoc.numLines = data.num_lines;
+           rawDoc.base = patch.current;
+           updateRawLoadStatus();
+         }
+
+         // Send the window's edits to the server before it moves
+         function flushRawWindow() {
+           return sendRawPatch(pendingRawPatch());
+         }
+
+         function sendRawPatch(patch) {
+           if (!patch) return Promise.resolve();
+           return fetch(rawEditorConfig.patchUrl, {
+             method: 'POST',
+             headers: { 'Content-Type': 'application/json' },
+             body: JSON.stringify({
+               handle: rawEditorConfig.handle,
+               start: patch.start,
+               end: patch.end,
+               text: patch.text,
+               version: rawDoc.version
+             })
+           })
+           .then(response => response.json())
+           .then(data => {
+             if (!data.success) {
+               rawDoc.dirty = true;
+               alert(data.error || 'Could not save changes');
+               throw new Error(data.error);
+             }
+             patchApplied(patch, data);
+             if (patch.joinsNext) {
+               // Reload the joined line so the window matches the server again
+               const current = patch.current;
+               const lastLine = rawDoc.start + current.length - 1;
+               return fetchRawLines(lastLine, lastLine + 1).then(lines => {
+                 setRawWindow(rawDoc.start, current.slice(0, -1).concat(lines), current.slice(0, -1).concat(lines));
+               });
+             }
+           }, error => {
+             rawDoc.dirty = true;
+             throw error;
+           });
+         }
+
+         // Replace the model with a new window, keeping the same document line at the top of the view.
+         // setValue also resets undo history, which would otherwise point at shifted positions.
+         function setRawWindow(start, lines, base) {
+           const model = editor.getModel();
+           const ranges = editor.getVisibleRanges();
+           const topDocLine = rawDoc.start + (ranges.length ? ranges[0].startLineNumber : 1) - 1;
+           const position = editor.getPosition();
+           const cursorDocLine = position ? rawDoc.start + position.lineNumber - 1 : null;
+
+           rawDoc.start = start;
+           rawDoc.base = base;
+           model.setValue(lines.join(''));
+           editor.updateOptions({ lineNumbers: (n) => String(n + rawDoc.start) });
+
+           const top = Math.min(Math.max(topDocLine - start + 1, 1), model.getLineCount());
+           editor.setScrollTop(editor.getTopForLineNumber(top));
+           if (cursorDocLine !== null && cursorDocLine >= start && cursorDocLine < start + lines.length) {
+             editor.setPosition({ lineNumber: cursorDocLine - start + 1, column: position.column });
+           }
+           updateRawLoadStatus();
+         }
+
+         function sameLines(a, b) {
+           return a.length === b.length && a.every((line, i) => line === b[i]);
+         }
 
-          document.body.appendChild(form);
-          form.submit();
-          document.body.removeChild(form);
-        }
+         // Load the next page below the window, dropping pages from the top past maxWindowLines
+         function rawPageDown() {
+           return flushRawWindow().then(() => {
+             const windowEnd = rawDoc.start + rawDoc.base.length;
+             if (windowEnd >= rawDoc.numLines) return;
+             return fetchRawLines(windowEnd, windowEnd + rawEditorConfig.pageLines).then(lines => {
+               const current = splitLines(editor.getModel().getValue());
+               let drop = Math.max(0, rawDoc.base.length + lines.length - rawEditorConfig.maxWindowLines);
+               // Never drop lines typed into while the page was loading
+               if (!sameLines(current.slice(0, drop), rawDoc.base.slice(0, drop))) drop = 0;
+               setRawWindow(rawDoc.start + drop, current.slice(drop).concat(lines), rawDoc.base.slice(drop).concat(lines));
+             });
+           });
+         }
+
+         // Load the previous page above the window, dropping pages from the bottom
+         function rawPageUp() {
+           return flushRawWindow().then(() => {
+             if (rawDoc.start === 0) return;
+             const start = Math.max(0, rawDoc.start - rawEditorConfig.pageLines);
+             return fetchRawLines(start, rawDoc.start).then(lines => {
+               const current = splitLines(editor.getModel().getValue());
+               let drop = Math.max(0, rawDoc.base.length + lines.length - rawEditorConfig.maxWindowLines);
+               if (!sameLines(current.slice(current.length - drop), rawDoc.base.slice(rawDoc.base.length - drop))) drop = 0;
+               setRawWindow(start, lines.concat(current.slice(0, current.length - drop)),
+                            lines.concat(rawDoc.base.slice(0, rawDoc.base.length - drop)));
+             });
+           });
+         }
+
+         function initRawWindow() {
+           rawWindowTask(() => fetchRawLines(0, rawEditorConfig.pageLines).then(lines => setRawWindow(0, lines, lines.slice())));
+           editor.onDidScrollChange(function(e) {
+             if (rawDoc.busy || !e.scrollTopChanged) return;
+             const nearBottom = e.scrollTop + editor.getLayoutInfo().height >= e.scrollHeight - 2000;
+             const nearTop = e.scrollTop < 2000;
+             let task = null;
+             if (nearBottom && rawDoc.start + rawDoc.base.length < rawDoc.numLines) task = rawPageDown;
+             else if (nearTop && rawDoc.start > 0) task = rawPageUp;
+             if (!task) return;
+             rawDoc.busy = true;
+             rawWindowTask(task).then(() => { rawDoc.busy = false; });
+           });
+         }
 
          // Show loading overlay for code editor
          function showCodeLoadingOverlay() {
@@ -2260,7 +5101,7 @@ RAW_EDIT_HTML = r"""
 
 
                // Use the actual file path passed from server for detection
-               const actualFilePath = '{{ actual_file_path }}';
+               const actualFilePath = rawEditorConfig.actualFilePath;
                let detectedLang = inferLangFromPath(actualFilePath);
                const initialContent = document.getElementById('code_text').value || '';
                // Guess language for extensionless paths (prefer Python)
@@ -2340,11 +5181,25 @@ RAW_EDIT_HTML = r"""
 
 
 
-                 // Sync hidden textarea on change
-                 document.getElementById('code_text').value = editor.getValue().replace(/\r\n/g,'\n').replace(/\r/g,'\n');
-                 editor.getModel().onDidChangeContent(function(){
+                 if (rawEditorConfig.handle) {
+                   editor.getModel().onDidChangeContent(function(e){
+                     // setValue (a window move) is a flush; anything else is an edit to send
+                     if (!e.isFlush) rawDoc.dirty = true;
+                   });
+                   if (rawEditorConfig.inline) {
+                     // The whole file is in the page; it is the base later patches are diffed against
+                     rawDoc.base = splitLines(editor.getModel().getValue());
+                   } else {
+                     // Large file: page lines in and out as the user scrolls
+                     initRawWindow();
+                   }
+                 } else {
+                   // Sync hidden textarea on change
                    document.getElementById('code_text').value = editor.getValue().replace(/\r\n/g,'\n').replace(/\r/g,'\n');
-                 });
+                   editor.getModel().onDidChangeContent(function(){
+                     document.getElementById('code_text').value = editor.getValue().replace(/\r\n/g,'\n').replace(/\r/g,'\n');
+                   });
+                 }
 
                  // Save shortcut - removed since no save functionality
                  // editor.addCommand(monaco.KeyMod.CtrlCmd | monaco.KeyCode.KeyS, function(){
@@ -2473,7 +5328,7 @@ RAW_EDIT_HTML = r"""
                document.getElementById('code_text').value;
 
              // Use the actual file path passed from server for detection
-             const actualFilePath = '{{ actual_file_path }}';
+             const actualFilePath = rawEditorConfig.actualFilePath;
              const fileExt = '.' + actualFilePath.toLowerCase().split('.').pop();
 
              if (!codeText.trim()) {
@@ -2546,44 +5401,43 @@ RAW_EDIT_HTML = r"""
              });
            });
 
-           // Stream output from server
+           // Output is pushed over server-sent events as the script produces it
+           let outputEvents = null;
            function streamOutput() {
              if (!currentSessionId || !outputStreaming) return;
 
-             fetch(`/stream_output/${currentSessionId}`)
-               .then(response => response.json())
-               .then(data => {
-                 const output = document.getElementById('terminal-output');
-
-                 if (data.error) {
-                   output.textContent += `Error: ${data.error}\n`;
-                   stopExecution();
-                   return;
-                 }
-
-                 if (data.output && data.output.length > 0) {
-                   console.log('Received output:', data.output);
-                   data.output.forEach(line => {
-                     const color = line.type === 'stderr' ? '#ff6b6b' : '#ffffff';
-                     output.innerHTML += `<span style="color: ${color}">${line.content}</span>`;
-                   });
-                   output.scrollTop = output.scrollHeight;
-                 }
-
-                 if (data.complete) {
-                   // Append message without replacing existing content
-                   output.innerHTML += `\n<span>${data.message}</span>\n`;
-                   stopExecution();
-                 } else {
-                   // Continue streaming
-                   setTimeout(streamOutput, 100);
-                 }
-               })
-               .catch(error => {
-                 const output = document.getElementById('terminal-output');
-                 output.textContent += `Error: ${error.message}\n`;
-                 stopExecution();
+             const output = document.getElementById('terminal-output');
+             const events = new EventSource(`/stream_output/${currentSessionId}/events`);
+             outputEvents = events;
+             events.onmessage = function(e) {
+               JSON.parse(e.data).forEach(chunk => {
+                 appendOutput(output, chunk.content, chunk.type === 'stderr' ? '#ff6b6b' : '#ffffff');
                });
+             };
+             events.addEventListener('dropped', function(e) {
+               appendOutput(output, `[${e.data} output chunks dropped]\n`);
+             });
+             events.addEventListener('end', function(e) {
+               const data = JSON.parse(e.data);
+               appendOutput(output, data.error ? `Error: ${data.error}\n` : `\n${data.message}\n`);
+               stopExecution();
+             });
+             // EventSource reconnects by itself (resuming from the last event); give up only once it is closed
+             events.onerror = function() {
+               if (events.readyState === EventSource.CLOSED) {
+                 appendOutput(output, 'Error: lost connection to the script output\n');
+                 stopExecution();
+               }
+             };
+           }
+
+           // Output is added as text so it can never be interpreted as markup
+           function appendOutput(output, text, color) {
+             const span = document.createElement('span');
+             if (color) span.style.color = color;
+             span.textContent = text;
+             output.appendChild(span);
+             output.scrollTop = output.scrollHeight;
            }
 
            // Reset buttons to initial state
@@ -2601,6 +5455,10 @@ RAW_EDIT_HTML = r"""
 
            // Stop execution
            function stopExecution() {
+             if (outputEvents) {
+               outputEvents.close();
+               outputEvents = null;
+             }
              outputStreaming = false;
              currentSessionId = null;
              resetButtons();
@@ -2724,12 +5582,57 @@ RAW_EDIT_HTML = r"""
 
 
          })();
-      </script>
+"""
 
 
-   </body>
-</html>
-"""
+# Static CSS/JS split out of the templates: name -> (body, mimetype, etag)
+STATIC_ASSETS = {}
+STATIC_ASSET_MAX_AGE = 365 * 24 * 3600  # URLs carry the content hash, so assets can be cached for a year
+
+
+def register_static_asset(name, content, mimetype):
+    body = content.encode('utf-8')
+    STATIC_ASSETS[name] = (body, mimetype, hashlib.sha256(body).hexdigest()[:16])
+
+
+register_static_asset('home.css', HOME_CSS, 'text/css; charset=utf-8')
+register_static_asset('home.js', HOME_JS, 'application/javascript; charset=utf-8')
+register_static_asset('csv_edit.css', CSV_EDIT_CSS, 'text/css; charset=utf-8')
+register_static_asset('csv_edit.js', CSV_EDIT_JS, 'application/javascript; charset=utf-8')
+register_static_asset('raw_edit.css', RAW_EDIT_CSS, 'text/css; charset=utf-8')
+register_static_asset('raw_edit.js', RAW_EDIT_JS, 'application/javascript; charset=utf-8')
+
+
+@app.template_global()
+def asset_url(name):
+    """Versioned URL for a static asset (changes whenever the asset content changes)"""
+    return url_for('static_asset', name=name, v=STATIC_ASSETS[name][2])
+
+
+@app.route('/assets/<name>')
+def static_asset(name):
+    asset = STATIC_ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    body, mimetype, etag = asset
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+# Templates are compiled once at import instead of per request by render_template_string
+HOME_PAGE = app.jinja_env.from_string(HTML_TEMPLATE)
+CSV_EDIT_PAGE = app.jinja_env.from_string(CSV_EDIT_HTML)
+RAW_EDIT_PAGE = app.jinja_env.from_string(RAW_EDIT_HTML)
+
+
+def render_page(template, **context):
+    """Render a precompiled template with the standard Flask context (url_for, session, request, ...)"""
+    app.update_template_context(context)
+    return template.render(context)
 
 
 def get_big_time_display():
@@ -2743,8 +5646,8 @@ def get_big_time_display():
 @app.route("/", methods=["GET", "POST"])
 def home():
     if request.method == "GET":
-        return render_template_string(
-            HTML_TEMPLATE,
+        return render_page(
+            HOME_PAGE,
             last_url=session.get('last_url', ''),
             big_time_display=get_big_time_display()
         )
@@ -2758,38 +5661,9 @@ def home():
             flash("Please provide a valid URL")
             return redirect(url_for("home"))
 
-        try:
-            # Download file from URL
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-
-            # Get filename from URL or content-disposition header
-            filename = url.split('/')[-1]
-            if not filename or '.' not in filename:
-                content_type = response.headers.get('content-type', '')
-                if 'text' in content_type:
-                    filename = 'downloaded_file.txt'
-                elif 'json' in content_type:
-                    filename = 'downloaded_file.json'
-                elif 'csv' in content_type:
-                    filename = 'downloaded_file.csv'
-                else:
-                    filename = 'downloaded_file'
-
-            # Save to temporary file and send
-            temp_file = tempfile.NamedTemporaryFile(delete=False)
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_file.write(chunk)
-            temp_file.close()
-
-            session['last_url'] = url
-            flash(f"File downloaded successfully: {filename}")
-
-            return send_file(temp_file.name, as_attachment=True, download_name=filename)
-
-        except Exception as e:
-            flash(f"Error downloading file: {str(e)}")
-            return redirect(url_for("home"))
+        session['last_url'] = url
+        # The GET proxy streams the body straight through and lets clients resume with Range
+        return redirect(url_for('download_url', url=url))
 
     elif action == "view":
         url = request.form.get("url_input", "").strip()
@@ -2798,46 +5672,72 @@ def home():
             return redirect(url_for("home"))
 
         try:
-            # Fetch content from URL
-            response = requests.get(url)
-            response.raise_for_status()
-
-            content = response.text
-            content_type = response.headers.get('content-type', '')
-
-            session['last_url'] = url
-
-            # Detect file type from URL or content type
-            filename = url.split('/')[-1] or 'url_content'
-            if not filename or '.' not in filename:
-                if 'text/html' in content_type:
-                    filename = 'webpage.html'
-                elif 'application/json' in content_type:
-                    filename = 'data.json'
-                elif 'text/plain' in content_type:
-                    filename = 'content.txt'
-                else:
-                    filename = 'url_content'
+            # Revalidate against what we fetched before (ETag / Last-Modified)
+            cached = URL_CACHE.lookup(url)
+
+            # Fetch content from URL (streamed so CSV bodies can be parsed chunk-by-chunk)
+            with http_get(url, headers=URL_CACHE.conditional_headers(cached)) as response:
+                if response.status_code == 304 and cached:
+                    session['last_url'] = url
+                    if cached['kind'] == 'csv':
+                        per_page = int(request.form.get('csv_per_page', 20))
+                        return render_csv_editor_from_url_cache(url, cached, per_page)
+                    URL_CACHE.touch(url)
+                    if cached['kind'] == 'raw_handle':
+                        # Fresh copy of the stored body, so earlier edits don't carry over
+                        handle = f"raw_{uuid.uuid4().hex}"
+                        DATASET_STORE.clone(cached['handle'], handle)
+                        return render_raw_page(cached['filename'], url, handle=handle)
+                    return render_raw_page(cached['filename'], url, code_text=URL_CACHE.read_text(url))
+                response.raise_for_status()
+                validators = URL_CACHE.validators(response)
 
-            # Check if it's a CSV file
-            file_extension = filename.lower().split('.')[-1]
-            if file_extension == 'gz':
-                # Handle .csv.gz case
-                file_extension = filename.lower().split('.')[-2]
+                content_type = response.headers.get('content-type', '')
 
-            if file_extension in ['csv']:
-                # Use CSV editor for CSV files from URLs
-                per_page = int(request.form.get('csv_per_page', 20))
-                return render_csv_editor_from_url(url, content, filename, per_page)
-            else:
-                # Use raw editor for other file types
-                return render_template_string(
-                    RAW_EDIT_HTML,
-                    filename=filename,
-                    code_text=content,
-                    actual_file_path=url,
-                    big_time_display=get_big_time_display()
-                )
+                session['last_url'] = url
+
+                # Detect file type from URL or content type
+                filename = url.split('/')[-1] or 'url_content'
+                if not filename or '.' not in filename:
+                    if 'text/html' in content_type:
+                        filename = 'webpage.html'
+                    elif 'application/json' in content_type:
+                        filename = 'data.json'
+                    elif 'text/plain' in content_type:
+                        filename = 'content.txt'
+                    else:
+                        filename = 'url_content'
+
+                # Check if it's a CSV file (plain, .gz/.zst compressed or inside a .zip)
+                if is_csv_filename(filename):
+                    # Use CSV editor for CSV files from URLs
+                    per_page = int(request.form.get('csv_per_page', 20))
+                    # Let urllib3 undo any Content-Encoding while we read the raw stream
+                    response.raw.decode_content = True
+                    size = None
+                    if not response.headers.get('content-encoding'):
+                        size = int(response.headers.get('content-length') or 0) or None
+                    return render_csv_editor_from_url(url, response.raw, filename, per_page, size, validators)
+                else:
+                    # Use raw editor for other file types (large bodies stay on disk)
+                    response.raw.decode_content = True
+                    stream = response.raw
+                    size = None
+                    if not response.headers.get('content-encoding'):
+                        size = int(response.headers.get('content-length') or 0) or None
+                    if split_compression_suffix(filename)[1]:
+                        stream, filename, _, _ = open_decompressed_stream(stream, filename)
+                        size = None
+                    page, handle, code_text = render_raw_view(stream, filename, url, size)
+                    if validators:
+                        try:
+                            if code_text is None:
+                                URL_CACHE.put_handle(url, validators, handle, filename)
+                            else:
+                                URL_CACHE.put_text(url, validators, filename, code_text)
+                        except OSError as e:
+                            print(f"DEBUG: Could not record URL cache entry for {url}: {e}")
+                    return page
 
         except Exception as e:
             flash(f"Error viewing content: {str(e)}")
@@ -2851,13 +5751,11 @@ def home():
             return redirect(url_for("home"))
 
         try:
-            # Detect file type from extension
-            file_extension = s3_path.lower().split('.')[-1]
-            if file_extension == 'gz':
-                # Handle .csv.gz case
-                file_extension = s3_path.lower().split('.')[-2]
-
-            if file_extension in ['csv']:
+            # A prefix or glob opens all of its CSV objects as one table
+            if is_s3_prefix(s3_path):
+                return render_csv_prefix_editor(s3_path)
+            # Detect file type from extension (.csv, optionally .gz/.zst compressed or zipped)
+            if is_csv_filename(s3_path):
                 # Use CSV editor for CSV files
                 return render_csv_editor(s3_path)
             else:
@@ -2875,34 +5773,22 @@ def home():
             return redirect(url_for("home"))
 
         try:
-            # Read file content
-            content = upload.read()
             filename = upload.filename
 
-            # Detect file type from extension
-            file_extension = filename.lower().split('.')[-1]
-            if file_extension == 'gz':
-                # Handle .csv.gz case
-                file_extension = filename.lower().split('.')[-2]
-
-            if file_extension in ['csv']:
+            # Detect file type from extension (.csv, optionally .gz/.zst compressed or zipped)
+            if is_csv_filename(filename):
                 # Use CSV editor for CSV files
                 per_page = int(request.form.get('csv_per_page', 20))
-                return render_csv_editor_local(content, filename, per_page)
+                return render_csv_editor_local(upload.stream, filename, per_page)
             else:
-                # Use raw editor for everything else
-                try:
-                    text_content = content.decode('utf-8')
-                except UnicodeDecodeError:
-                    text_content = str(content)
-
-                return render_template_string(
-                    RAW_EDIT_HTML,
-                    filename=filename,
-                    code_text=text_content,
-                    actual_file_path=f"localfile://{os.path.basename(filename)}",
-                    big_time_display=get_big_time_display()
-                )
+                # Use raw editor for everything else (large files stay on disk)
+                stream = upload.stream
+                size = stream_size(stream)
+                if split_compression_suffix(filename)[1]:
+                    stream, filename, _, _ = open_decompressed_stream(stream, filename)
+                    size = None
+                page, _, _ = render_raw_view(stream, filename, f"localfile://{os.path.basename(filename)}", size)
+                return page
 
         except Exception as e:
             flash(f"Error reading file: {str(e)}")
@@ -2911,58 +5797,322 @@ def home():
     return redirect(url_for("home"))
 
 
-def render_csv_editor(s3_path):
-    """Render CSV editor for S3 files"""
+# Upstream headers relayed by the download proxy
+PROXY_FORWARD_HEADERS = ('Content-Type', 'Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified')
+PROXY_CHUNK_BYTES = 64 * 1024
+
+
+def url_download_filename(url, content_type=''):
+    """Filename for a downloaded URL: last path segment, else a name based on the content type"""
+    filename = sanitize_download_filename(urlparse(url).path.split('/')[-1])
+    if '.' in filename:
+        return filename
+    if 'text' in content_type:
+        return 'downloaded_file.txt'
+    elif 'json' in content_type:
+        return 'downloaded_file.json'
+    elif 'csv' in content_type:
+        return 'downloaded_file.csv'
+    return 'downloaded_file'
+
+
+@app.route('/download-url')
+def download_url():
+    """Stream a URL to the client without staging it on disk, passing Range requests through"""
+    url = request.args.get('url', '').strip()
+    if not url:
+        flash("Please provide a valid URL")
+        return redirect(url_for("home"))
+
+    # identity keeps Content-Length and byte ranges in terms of the bytes we relay
+    headers = {'Accept-Encoding': 'identity'}
+    for name in ('Range', 'If-Range'):
+        if request.headers.get(name):
+            headers[name] = request.headers[name]
+
     try:
-        # For now, redirect to home since S3 functionality is not fully implemented
-        flash("S3 CSV editing is not yet implemented. Please use local file upload or URL.")
+        upstream = http_get(url, headers=headers)
+    except Exception as e:
+        flash(f"Error downloading file: {str(e)}")
+        return redirect(url_for("home"))
+
+    if upstream.status_code >= 400 and upstream.status_code != 416:
+        upstream.close()
+        flash(f"Error downloading file: {upstream.status_code} {upstream.reason}")
         return redirect(url_for("home"))
+
+    def relay():
+        try:
+            yield from upstream.raw.stream(PROXY_CHUNK_BYTES, decode_content=False)
+        finally:
+            upstream.close()
+
+    response = Response(stream_with_context(relay()), status=upstream.status_code, direct_passthrough=True)
+    for name in PROXY_FORWARD_HEADERS:
+        if name in upstream.headers:
+            response.headers[name] = upstream.headers[name]
+    if upstream.headers.get('Content-Encoding'):
+        # Origin ignored Accept-Encoding: identity, so relay the encoding as-is
+        response.headers['Content-Encoding'] = upstream.headers['Content-Encoding']
+    filename = url_download_filename(url, upstream.headers.get('content-type', ''))
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def render_csv_editor(s3_path, per_page=20):
+    """Render CSV editor for S3 files.
+
+    The object is streamed with ranged GETs. Objects over S3_PREVIEW_BYTES open on a preview
+    of their first rows while a background thread loads the whole file under the same key.
+    """
+    try:
+        cache_key = f"s3_csv_{uuid.uuid4().hex}"
+        per_page = int(request.form.get('csv_per_page', session.get('csv_per_page', per_page)))
+        filename = s3_path.rstrip('/').split('/')[-1]
+        entry = {'public_url': s3_path, 'module': 'csv', 'file_type': 'csv', 'per_page': per_page}
+
+        stream, reader = open_s3_object(s3_path, range_bytes=S3_PREVIEW_BYTES)
+        with stream:
+            if reader.size <= S3_PREVIEW_BYTES:
+                data = ingest_s3_csv(cache_key, stream, filename, reader.size, entry)
+            else:
+                decompressed, preview_name, compression, _ = open_decompressed_stream(stream, filename, reader.size)
+                data, encoding, delimiter = read_csv_preview(decompressed)
+        if data is None:
+            flash("CSV file is empty")
+            return redirect(url_for("home"))
+
+        if reader.size > S3_PREVIEW_BYTES:
+            preview_key = DATASET_STORE.preview_key(cache_key)
+            DATASET_STORE.save(preview_key, dict(
+                entry, data=data, columns=data.columns, loading=True, loader_heartbeat=time.time(),
+                gzipped=compression == 'gzip', filename=preview_name, detected_delimiter=delimiter,
+                encoding=encoding))
+            # Edits made on the preview are appended here and carried over to the full dataset
+            open(os.path.join(DATASET_STORE.path(preview_key), CsvEditJournal.FILE_NAME), 'ab').close()
+            threading.Thread(
+                target=load_s3_csv_in_background,
+                args=(cache_key, s3_path, reader.size, reader.etag, entry),
+                daemon=True
+            ).start()
+            print(f"DEBUG: S3 CSV preview of {len(data)} rows for {s3_path}, loading {reader.size} bytes in background")
+
+        session['csv_cache_key'] = cache_key
+        session['csv_per_page'] = per_page
+        session['cache_key'] = cache_key  # for download_csv()
+        return redirect(url_for('csv_page', page=1))
     except Exception as e:
         flash(f"Error editing file: {str(e)}")
         return redirect(url_for("home"))
 
 
-def render_csv_editor_local(content, filename, per_page=20):
-    """Render CSV editor for local files"""
+def ingest_s3_csv(cache_key, stream, filename, size, entry, journal_source=None):
+    """Parse a (possibly compressed) CSV stream and publish it as cache_key; returns the table or None if empty"""
+    stream, filename, compression, size = open_decompressed_stream(stream, filename, size)
+    data, encoding, delimiter = ingest_csv_stream(cache_key, stream, size)
+    if data is None:
+        return None
+    return publish_csv_entry(cache_key, dict(
+        entry, data=data, columns=data.columns, gzipped=compression == 'gzip', filename=filename,
+        detected_delimiter=delimiter, encoding=encoding), journal_source)['data']
+
+
+def read_csv_preview(stream, limit=S3_PREVIEW_BYTES):
+    """CsvTable of the complete records in the first `limit` bytes of a binary CSV stream.
+
+    Returns (table, encoding, delimiter); table is None when there is no header row.
+    """
+    head = stream.read(limit) or b''
+    head = head[:head.rfind(b'\n') + 1]
+    reader, encoding, delimiter = open_csv_reader(io.BytesIO(head))
+    records = [record for record in reader if record]
+    if not records:
+        return None, encoding, delimiter
+    table = CsvTable([h.strip() for h in records[0]])
+    # The last record may have been cut inside a quoted field
+    for record in records[1:-1]:
+        table.append_row(record)
+    return table, encoding, delimiter
+
+
+def load_s3_csv_in_background(cache_key, s3_path, size, etag, entry):
+    """Thread target: load the whole S3 object behind a preview and publish it as cache_key"""
+    preview_key = DATASET_STORE.preview_key(cache_key)
+    started = time.time()
+    heartbeat = start_load_heartbeat(preview_key)
     try:
-        # Parse CSV content (already read from upload)
+        # Pinned to the preview's ETag so both show the same version of the object
+        stream, _ = open_s3_object(s3_path, size=size, etag=etag)
+        journal = os.path.join(DATASET_STORE.path(preview_key), CsvEditJournal.FILE_NAME)
+        with stream:
+            data = ingest_s3_csv(cache_key, stream, s3_path.rstrip('/').split('/')[-1], size, entry, journal)
+        if data is None:
+            raise ValueError("CSV file is empty")
+        print(f"DEBUG: Loaded {len(data)} rows of {s3_path} in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"DEBUG: Background load of {s3_path} failed: {e}")
         try:
-            text_content = content.decode('utf-8')
-        except UnicodeDecodeError:
-            flash("File must be text-based (UTF-8)")
+            DATASET_STORE.update_meta(preview_key, load_error=str(e))
+        except (OSError, ValueError):
+            pass
+    finally:
+        heartbeat.set()
+
+
+def render_csv_prefix_editor(s3_path, per_page=20):
+    """Render CSV editor for every CSV object under an S3 prefix (or matching a glob) as one table.
+
+    Shards are fetched and parsed S3_FETCH_THREADS at a time, each into its own dataset,
+    and concatenated lazily by a ShardedCsvTable. The editor opens as soon as the first
+    shard is in; the rest are appended to the preview in key order as they arrive.
+    """
+    try:
+        cache_key = f"s3_csv_{uuid.uuid4().hex}"
+        per_page = int(request.form.get('csv_per_page', session.get('csv_per_page', per_page)))
+        bucket, objects = list_s3_shards(s3_path)
+        if not objects:
+            flash(f"No CSV files found at {s3_path}")
             return redirect(url_for("home"))
 
-        # Simple CSV parsing (split by lines and commas)
-        lines = text_content.strip().split('\n')
-        if not lines:
-            flash("CSV file is empty")
+        # Named after the last path component before any glob, e.g. s3://bucket/out/part-* -> out.csv
+        name = [part for part in s3_path[len('s3://'):].split('/') if part and not any(c in part for c in '*?[')][-1]
+        entry = {'public_url': s3_path, 'module': 'csv', 'file_type': 'csv', 'per_page': per_page, 'filename': f"{name}.csv"}
+
+        executor = ThreadPoolExecutor(max_workers=S3_FETCH_THREADS, thread_name_prefix='s3-shard')
+        futures = [
+            executor.submit(load_s3_shard, f"{cache_key}.part{shard_idx:05d}", bucket, key, size, etag)
+            for shard_idx, (key, size, etag) in enumerate(objects)
+        ]
+        executor.shutdown(wait=False)
+        print(f"DEBUG: Loading {len(objects)} objects under {s3_path} with {S3_FETCH_THREADS} threads")
+
+        shards = []
+        pending = list(futures)
+        try:
+            # Empty objects are skipped, so wait for the first one with rows (or a header)
+            while pending and not shards:
+                shard = pending.pop(0).result()
+                if shard is not None:
+                    shards.append(shard)
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+        if not shards:
+            flash("CSV files are empty")
             return redirect(url_for("home"))
 
-        # Parse headers and data
-        headers = [h.strip() for h in lines[0].split(',')]
-        data = []
-        for line in lines[1:]:
-            if line.strip():
-                values = [v.strip() for v in line.split(',')]
-                row = {}
-                for i, header in enumerate(headers):
-                    row[header] = values[i] if i < len(values) else ""
-                data.append(row)
+        if not pending:
+            publish_csv_entry(cache_key, sharded_csv_entry(entry, shards))
+        else:
+            preview_key = DATASET_STORE.preview_key(cache_key)
+            DATASET_STORE.save(preview_key, dict(
+                sharded_csv_entry(entry, shards), loading=True, loader_heartbeat=time.time()))
+            # Edits made on the preview are appended here and carried over to the full dataset
+            open(os.path.join(DATASET_STORE.path(preview_key), CsvEditJournal.FILE_NAME), 'ab').close()
+            threading.Thread(
+                target=load_s3_shards_in_background,
+                args=(cache_key, s3_path, pending, shards, entry),
+                daemon=True
+            ).start()
+
+        session['csv_cache_key'] = cache_key
+        session['csv_per_page'] = per_page
+        session['cache_key'] = cache_key  # for download_csv()
+        return redirect(url_for('csv_page', page=1))
+    except Exception as e:
+        flash(f"Error editing files: {str(e)}")
+        return redirect(url_for("home"))
+
+
+def load_s3_shard(shard_key, bucket, key, size, etag):
+    """Fetch and parse one object of an S3 prefix into its own dataset.
+
+    Returns (shard_key, entry) for the saved shard, or None when the object has no header row.
+    """
+    # Pinned to the listed ETag so every shard comes from the same listing
+    stream, _ = open_s3_object(f"s3://{bucket}/{key}", size=size, etag=etag)
+    with stream:
+        stream, filename, compression, size = open_decompressed_stream(stream, key.rsplit('/', 1)[-1], size)
+        data, encoding, delimiter = ingest_csv_stream(shard_key, stream, size)
+    if data is None:
+        return None
+    DATASET_STORE.save(shard_key, {
+        'data': data, 'columns': data.columns, 'filename': filename, 'gzipped': compression == 'gzip',
+        'detected_delimiter': delimiter, 'encoding': encoding
+    })
+    shard = DATASET_STORE.load(shard_key)
+    if shard is None:
+        raise ValueError(f"Could not load {key}")
+    return shard_key, shard
+
+
+def sharded_csv_entry(entry, shards):
+    """Cache entry concatenating (shard_key, entry) shards; they must all have the first shard's header"""
+    first = shards[0][1]
+    for shard_key, shard in shards[1:]:
+        if shard['columns'] != first['columns']:
+            raise ValueError(f"{shard['filename']} has different columns than {first['filename']}")
+    table = ShardedCsvTable(first['columns'], [shard_key for shard_key, _ in shards], [shard['data'] for _, shard in shards])
+    return dict(entry, data=table, columns=table.columns, gzipped=first['gzipped'],
+                detected_delimiter=first['detected_delimiter'], encoding=first['encoding'])
+
+
+def load_s3_shards_in_background(cache_key, s3_path, futures, shards, entry):
+    """Thread target: add shards to the preview in key order as they load, then publish cache_key"""
+    preview_key = DATASET_STORE.preview_key(cache_key)
+    started = time.time()
+    heartbeat = start_load_heartbeat(preview_key)
+    try:
+        for future in futures:
+            shard = future.result()
+            if shard is None:
+                continue
+            shards.append(shard)
+            preview = sharded_csv_entry(entry, shards)
+            DATASET_STORE.update_meta(preview_key, shards=preview['data'].shard_keys, num_rows=len(preview['data']))
+        journal = os.path.join(DATASET_STORE.path(preview_key), CsvEditJournal.FILE_NAME)
+        data = publish_csv_entry(cache_key, sharded_csv_entry(entry, shards), journal)['data']
+        print(f"DEBUG: Loaded {len(data)} rows from {len(shards)} objects under {s3_path} in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"DEBUG: Background load of {s3_path} failed: {e}")
+        for future in futures:
+            future.cancel()
+        try:
+            DATASET_STORE.update_meta(preview_key, load_error=str(e))
+        except (OSError, ValueError):
+            pass
+    finally:
+        heartbeat.set()
+
+
+def render_csv_editor_local(stream, filename, per_page=20):
+    """Render CSV editor for local files"""
+    try:
+        # Parse the upload stream chunk-by-chunk (large uploads are indexed on disk instead)
+        cache_key = f"local_csv_{uuid.uuid4().hex}"
+        public_url = f"localfile://{os.path.basename(filename)}"
+        # .gz/.zst/.zip uploads are decompressed on the fly into the parser
+        stream, filename, compression, size = open_decompressed_stream(stream, filename, stream_size(stream))
+        data, encoding, delimiter = ingest_csv_stream(cache_key, stream, size)
+        if data is None:
+            flash("CSV file is empty")
+            return redirect(url_for("home"))
+        headers = data.columns
 
         # Build cache entry
-        import time
-        cache_key = f"local_csv_{hash(filename)}_{int(time.time())}"
-        CSV_DATA_CACHE[cache_key] = {
+        publish_csv_entry(cache_key, {
             'data': data,
             'columns': headers,
-            'public_url': f"localfile://{os.path.basename(filename)}",
+            'public_url': public_url,
             'module': 'csv',
             'file_type': 'csv',
-            'gzipped': False,
+            'gzipped': compression == 'gzip',
             'filename': filename,
-            'detected_delimiter': ',',
+            'detected_delimiter': delimiter,
+            'encoding': encoding,
             'per_page': int(request.form.get('csv_per_page', session.get('csv_per_page', per_page)))
-        }
+        })
 
         # Determine per_page from form or session
         per_page = int(request.form.get('csv_per_page', session.get('csv_per_page', per_page)))
@@ -2983,42 +6133,40 @@ def render_csv_editor_local(content, filename, per_page=20):
         return redirect(url_for("home"))
 
 
-def render_csv_editor_from_url(url, content, filename, per_page=20):
+def render_csv_editor_from_url(url, stream, filename, per_page=20, size=None, validators=None):
     """Render CSV editor for CSV files from URLs"""
     try:
-        # Simple CSV parsing (split by lines and commas)
-        lines = content.strip().split('\n')
-        if not lines:
+        # Parse the response body chunk-by-chunk (large bodies are indexed on disk instead)
+        cache_key = f"url_csv_{uuid.uuid4().hex}"
+        stream, filename, compression, size = open_decompressed_stream(stream, filename, size)
+        data, encoding, delimiter = ingest_csv_stream(cache_key, stream, size)
+        if data is None:
             flash("CSV file is empty")
             return redirect(url_for("home"))
-
-        # Parse headers and data
-        headers = [h.strip() for h in lines[0].split(',')]
-        data = []
-        for line in lines[1:]:
-            if line.strip():
-                values = [v.strip() for v in line.split(',')]
-                row = {}
-                for i, header in enumerate(headers):
-                    row[header] = values[i] if i < len(values) else ""
-                data.append(row)
+        headers = data.columns
 
         # Store data in cache system (same as workbench.py)
-        import time
-        cache_key = f"url_csv_{hash(filename)}_{int(time.time())}"
 
-        # Store full data in cache - keep as list of dicts for template compatibility
-        CSV_DATA_CACHE[cache_key] = {
-            'data': data,  # Keep as list of dicts, not DataFrame
+        # Store full data in the shared store - slicing a CsvTable yields row dicts for the template
+        data = publish_csv_entry(cache_key, {
+            'data': data,
             'columns': headers,
             'public_url': url,
             'module': 'csv',
             'file_type': 'csv',
-            'gzipped': False,
+            'gzipped': compression == 'gzip',
             'filename': filename,
-            'detected_delimiter': ',',
+            'detected_delimiter': delimiter,
+            'encoding': encoding,
             'per_page': per_page  # Store the pagination count
-        }
+        })['data']
+
+        # Remember the ETag/Last-Modified so the next view can revalidate instead of re-downloading
+        if validators:
+            try:
+                URL_CACHE.put_dataset(url, validators, cache_key, filename)
+            except OSError as e:
+                print(f"DEBUG: Could not record URL cache entry for {url}: {e}")
 
         # Store cache key in session for clean URLs
         session['csv_cache_key'] = cache_key
@@ -3027,7 +6175,7 @@ def render_csv_editor_from_url(url, content, filename, per_page=20):
         # Debug information
         print(f"DEBUG: Stored {len(data)} rows in cache with key: {cache_key}")
         print(f"DEBUG: Cache keys: {list(CSV_DATA_CACHE.keys())}")
-        print(f"DEBUG: Data format: {type(data)}, first row: {data[0] if data else 'None'}")
+        print(f"DEBUG: Data format: {type(data)}, first row: {data[0] if len(data) else 'None'}")
 
         # Redirect to clean CSV editor URL
         return redirect(url_for('csv_page', page=1))
@@ -3036,25 +6184,100 @@ def render_csv_editor_from_url(url, content, filename, per_page=20):
         return redirect(url_for("home"))
 
 
+def render_csv_editor_from_url_cache(url, cached, per_page=20):
+    """Open a revalidated (304) URL from its already-parsed dataset, as a fresh copy without edits"""
+    cache_key = f"url_csv_{uuid.uuid4().hex}"
+    DATASET_STORE.clone(cached['cache_key'], cache_key)
+    URL_CACHE.touch(url)
+
+    session['csv_cache_key'] = cache_key
+    session['csv_per_page'] = per_page
+    print(f"DEBUG: URL not modified, reusing dataset {cached['cache_key']} as {cache_key}")
+
+    return redirect(url_for('csv_page', page=1))
+
+
+def render_raw_view(stream, filename, actual_file_path, size=None):
+    """Render the raw editor for a binary stream.
+
+    Bodies up to RAW_INLINE_MAX_BYTES are inlined into the page; larger ones (or ones of
+    unknown size that turn out large) are only paged in via /raw-chunk. Either way the body
+    is kept as a RawFileStore handle, so saves and downloads only send the edited lines.
+    Returns (page, handle, code_text); code_text is None when the body is not inlined.
+    """
+    if size is not None and size <= RAW_INLINE_MAX_BYTES:
+        data = stream.read()
+        code_text = data.decode(detect_encoding(data[:CSV_SNIFF_BYTES]), errors='replace')
+        return render_raw_inline(filename, actual_file_path, code_text) + (code_text,)
+
+    handle, meta = RAW_STORE.save(stream, filename, actual_file_path)
+    if meta['size'] <= RAW_INLINE_MAX_BYTES:
+        code_text = RAW_STORE.read_text(handle)
+        shutil.rmtree(DATASET_STORE.path(handle), ignore_errors=True)
+        return render_raw_inline(filename, actual_file_path, code_text) + (code_text,)
+    print(f"DEBUG: Raw body of {meta['size']} bytes kept on disk as {handle}")
+    return render_raw_page(filename, actual_file_path, handle=handle), handle, None
+
+
+def render_raw_inline(filename, actual_file_path, code_text):
+    """Raw editor page with the whole text inlined; returns (page, handle)"""
+    code_text = code_text.replace('\r\n', '\n').replace('\r', '\n')
+    handle, _ = RAW_STORE.save_text(code_text, filename, actual_file_path)
+    return render_raw_page(filename, actual_file_path, code_text=code_text, handle=handle), handle
+
+
+def render_raw_page(filename, actual_file_path, code_text=None, handle=None):
+    """RAW_EDIT_PAGE for a RawFileStore handle; code_text is the whole text inlined, else the editor pages it in"""
+    if handle is None:
+        return render_raw_inline(filename, actual_file_path, code_text or '')[0]
+    return render_page(
+        RAW_EDIT_PAGE,
+        filename=filename,
+        code_text=code_text or '',
+        actual_file_path=actual_file_path,
+        raw_handle=handle,
+        raw_inline=code_text is not None,
+        raw_meta=RAW_STORE.meta(handle),
+        raw_window_lines=RAW_WINDOW_LINES,
+        raw_max_window_lines=RAW_MAX_WINDOW_LINES,
+        big_time_display=get_big_time_display()
+    )
+
+
 def render_raw_editor(s3_path):
-    """Render raw editor for non-CSV files"""
+    """Render raw editor for non-CSV S3 files (streamed with ranged GETs; large ones stay on disk)"""
     try:
-        # For now, return a simple raw editor
-        # In a real implementation, you would read the file from S3
-        sample_content = f"# Content from {s3_path}\n\nThis is a sample file content."
-
-        return render_template_string(
-            RAW_EDIT_HTML,
-            filename=s3_path.split('/')[-1],
-            code_text=sample_content,
-            actual_file_path=s3_path,
-            big_time_display=get_big_time_display()
-        )
+        filename = s3_path.rstrip('/').split('/')[-1]
+        stream, reader = open_s3_object(s3_path)
+        with stream:
+            body, size = stream, reader.size
+            if split_compression_suffix(filename)[1]:
+                body, filename, _, _ = open_decompressed_stream(stream, filename)
+                size = None
+            page, _, _ = render_raw_view(body, filename, s3_path, size)
+        return page
     except Exception as e:
         flash(f"Error rendering raw editor: {str(e)}")
         return redirect(url_for("home"))
 
 
+def journal_row_edits(cache_key, data, columns):
+    """The dataset's journaled edits as {row: {col: value}}, to overlay without touching the cached table"""
+    edits = CSV_EDIT_JOURNAL.edits(cache_key)
+    print(f"DEBUG: Found {len(edits)} journaled edits for {cache_key}")
+    row_edits = {}
+    for key, new_value in edits.items():
+        try:
+            row_idx, col_idx = key.split(',')
+            row_idx = int(row_idx)
+            col_idx = int(col_idx)
+        except ValueError:
+            continue
+        if 0 <= row_idx < len(data) and 0 <= col_idx < len(columns):
+            row_edits.setdefault(row_idx, {})[col_idx] = new_value
+    return row_edits
+
+
 @app.route('/download_csv', methods=['POST'])
 def download_csv():
     try:
@@ -3071,63 +6294,38 @@ def download_csv():
             flash("No data available for download")
             return redirect(url_for('home'))
 
-        # Get data from cache
-        cached_data = CSV_DATA_CACHE.get(cache_key)
+        # Get data from cache (or the shared dataset store if another worker loaded it)
+        cached_data = get_csv_entry(cache_key)
         print(f"DEBUG: Cached data found: {cached_data is not None}")
         if not cached_data:
             print(f"DEBUG: Available cache keys: {list(CSV_DATA_CACHE.keys())}")
             flash("Data not found in cache")
             return redirect(url_for('home'))
+        if cached_data.get('load_error'):
+            flash(f"Only the first rows of this file could be loaded ({cached_data['load_error']}). Please open it again.")
+            return redirect(url_for('home'))
+        if cached_data.get('loading'):
+            flash("The file is still loading. Please download once all rows are loaded.")
+            return redirect(url_for('home'))
 
         data = cached_data['data']
+        columns = cached_data.get('columns') or data.columns
         filename = cached_data.get('filename', 'modified_file.csv')
         # Ensure filename has no local labels and has .csv extension
         filename = sanitize_download_filename(filename, default_ext='.csv')
         if not filename.lower().endswith('.csv'):
             filename = f"{filename}.csv"
 
-        # Get edits from session
-        edits = session.get(f'csv_edits_{cache_key}', {})
-        print(f"DEBUG: Looking for edits with key: csv_edits_{cache_key}")
-        print(f"DEBUG: Found {len(edits)} edits: {edits}")
-
-        # Apply edits to data
-        for key, new_value in edits.items():
-            try:
-                row_idx, col_idx = key.split(',')
-                row_idx = int(row_idx)
-                col_idx = int(col_idx)
-
-                if row_idx < len(data) and col_idx < len(data[0]):
-                    # Get column name from first row
-                    columns = list(data[0].keys())
-                    if col_idx < len(columns):
-                        col_name = columns[col_idx]
-                        data[row_idx][col_name] = new_value
-            except (ValueError, IndexError, KeyError):
-                continue
+        # Edits from the server-side journal, grouped by row
+        row_edits = journal_row_edits(cache_key, data, columns)
 
         # Get delimiter from form
         delimiter = request.form.get('delimiter', ',')
 
-        # Convert to CSV format with specified delimiter
-        if data:
-            import csv
-            from io import StringIO
-
-            output = StringIO()
-            writer = csv.DictWriter(output, fieldnames=data[0].keys(), delimiter=delimiter)
-            writer.writeheader()
-            writer.writerows(data)
-
-            csv_content = output.getvalue()
-            output.close()
-
-            # Create response with CSV content
-            from flask import Response
-            response = Response(csv_content, mimetype='text/csv')
-            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
+        # Stream the CSV with the specified delimiter; no Content-Length, so it goes out chunked
+        if len(data):
+            chunks = iter_csv_download(data, columns, row_edits, delimiter)
+            return download_response(chunks, filename, 'text/csv', request.form.get('compression'))
         else:
             flash("No data to download")
             return redirect(url_for('home'))
@@ -3138,6 +6336,26 @@ def download_csv():
         return redirect(url_for('home'))
 
 
+def apply_raw_form_patch(form):
+    """Apply the editor's pending edit posted with a save/download and return the RawDocument.
+
+    The edit comes as a `raw_patch` JSON field ({"start", "end", "text", "version"}: one
+    line-range replacement against the version the editor last saw), so a one-character
+    change costs a few bytes however large the file is. JSON keeps the browser from
+    rewriting the text's line endings the way it does for plain form fields.
+    Raises KeyError if the handle is gone and RawVersionConflict if the file moved on.
+    """
+    handle = form.get('raw_handle', '')
+    if form.get('raw_patch'):
+        patch = json.loads(form['raw_patch'])
+        if not isinstance(patch.get('text'), str):
+            raise ValueError('Patch text must be a string')
+        version, num_lines = RAW_STORE.apply_patch(
+            handle, int(patch['start']), int(patch['end']), patch['text'], int(patch['version']))
+        print(f"DEBUG: Patched lines [{patch['start']}, {patch['end']}) of {handle} -> version {version}, {num_lines} lines")
+    return RAW_STORE.document(handle)
+
+
 @app.route('/download_raw', methods=['POST'])
 def download_raw():
     """Download the current raw editor content as a file with the provided filename."""
@@ -3151,18 +6369,113 @@ def download_raw():
         if not os.path.splitext(filename)[1]:
             filename = f"{filename}.txt"
 
-        from flask import Response
-        response = Response(code_text, mimetype='text/plain; charset=utf-8')
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        if request.form.get('raw_handle'):
+            # Apply the editor's pending patch, then stream the server's working copy
+            try:
+                chunks = apply_raw_form_patch(request.form).iter_bytes()
+            except KeyError:
+                flash("This file is no longer available on the server. Please reload it.")
+                return redirect(url_for('home'))
+            except RawVersionConflict as e:
+                flash(f"Error downloading file: {str(e)}")
+                return redirect(url_for('home'))
+        else:
+            body = code_text.encode('utf-8')
+            chunks = (body[i:i + CSV_DOWNLOAD_CHUNK_BYTES] for i in range(0, len(body), CSV_DOWNLOAD_CHUNK_BYTES))
+
+        return download_response(chunks, filename, 'text/plain; charset=utf-8', request.form.get('compression'))
     except Exception as e:
         flash(f"Error downloading file: {str(e)}")
         return redirect(url_for('home'))
 
 
+@app.route('/raw-chunk')
+def raw_chunk():
+    """Lines [start, end) of a large raw file's working copy, for the editor's sliding window"""
+    try:
+        handle = request.args.get('handle', '')
+        start = max(int(request.args.get('start', 0)), 0)
+        end = int(request.args.get('end', start + RAW_WINDOW_LINES))
+        end = min(max(end, start), start + RAW_MAX_WINDOW_LINES)
+
+        try:
+            document = RAW_STORE.document(handle)
+        except (KeyError, ValueError):
+            return jsonify({'success': False, 'reload': True, 'error': 'File is no longer available. Please reload it.'})
+
+        lines = document.read_lines(start, end, RAW_CHUNK_BYTES)
+        return jsonify({
+            'success': True,
+            'text': ''.join(lines),
+            'start': start,
+            'end': start + len(lines),
+            'num_lines': document.num_lines,
+            'version': document.version
+        })
+
+    except Exception as e:
+        print(f"DEBUG: Error reading raw chunk: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/raw-patch', methods=['POST'])
+def raw_patch():
+    """Replace lines [start, end) of a large raw file's working copy with the editor's text"""
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        handle = data.get('handle', '')
+        start, end = int(data['start']), int(data['end'])
+        text = data.get('text', '')
+        if not isinstance(text, str):
+            return jsonify({'success': False, 'error': 'text must be a string'})
+
+        try:
+            version, num_lines = RAW_STORE.apply_patch(handle, start, end, text, int(data.get('version', 0)))
+        except KeyError:
+            return jsonify({'success': False, 'reload': True, 'error': 'File is no longer available. Please reload it.'})
+        except RawVersionConflict as e:
+            return jsonify({'success': False, 'conflict': True, 'error': str(e)})
+
+        print(f"DEBUG: Patched lines [{start}, {end}) of {handle} -> version {version}, {num_lines} lines")
+        return jsonify({'success': True, 'version': version, 'num_lines': num_lines})
+
+    except Exception as e:
+        print(f"DEBUG: Error patching raw file: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
 @app.route('/save_raw', methods=['POST'])
 def save_raw():
     try:
+        if request.form.get('raw_handle'):
+            # Differential save: apply the editor's pending patch to the server copy
+            try:
+                document = apply_raw_form_patch(request.form)
+            except KeyError:
+                flash("This file is no longer available on the server. Please reload it.")
+                return redirect(url_for('home'))
+            except RawVersionConflict as e:
+                flash(f"Error saving content: {str(e)}")
+                return redirect(url_for('home'))
+
+            s3_path = (request.form.get('s3_path') or '').strip()
+            if s3_path:
+                # Stream the working copy straight into a multipart upload
+                chunks, content_type = compress_for_upload(
+                    document.iter_bytes(), s3_path, request.form.get('compression'), 'text/plain; charset=utf-8')
+                size = upload_s3_stream(s3_path, chunks, content_type)
+                flash(f"Content saved successfully to {s3_path} ({size} bytes)")
+                return redirect(url_for('home'))
+
+            if request.form.get('stream'):
+                # Send the saved file back without another round trip through /download_raw
+                filename = sanitize_download_filename(request.form.get('filename') or 'workbench_file.txt')
+                return download_response(document.iter_bytes(), filename, 'text/plain; charset=utf-8',
+                                         request.form.get('compression'))
+
+            flash(f"Content saved successfully! {document.num_lines} lines (version {document.version})")
+            return redirect(url_for('home'))
+
         # Get form data
         code_text = request.form.get('code_text', '')
 
@@ -3226,10 +6539,13 @@ def csv_page(page=1):
         print(f"DEBUG: Using cache_key: {cache_key}")
 
         # Get the stored CSV data from cache system (same as workbench.py)
-        if not cache_key or cache_key not in CSV_DATA_CACHE:
+        cached_data = get_csv_entry(cache_key)
+        if cached_data is None:
+            if CSV_DATA_CACHE.was_evicted(cache_key):
+                flash("This CSV was unloaded from memory to free space. Please reload the file.")
+                return redirect(url_for('home'))
             return jsonify({'error': 'No CSV data found in cache. Please reload the CSV file.'})
 
-        cached_data = CSV_DATA_CACHE[cache_key]
         data_full = cached_data['data']  # Use 'data' not 'dataframe'
 
         # Use pagination count from session (user preference) instead of cache
@@ -3242,46 +6558,18 @@ def csv_page(page=1):
         print(f"DEBUG: Request form data: {dict(request.form)}")
         print(f"DEBUG: Page: {page}, Per_page from cache: {per_page}")
 
-        # Calculate pagination
+        # Calculate pagination (out-of-range pages are clamped, e.g. stale /csv-edit/<page> URLs)
         total_rows = len(data_full)
-        page_count = (total_rows + per_page - 1) // per_page
-
-        # Validate page number
-        if page < 1:
-            page = 1
-        elif page > page_count:
-            page = page_count
-            # For POST requests or when cache_key is in URL, redirect to clean URL
-            if request.method == 'POST' or request.args.get('cache_key'):
-                # Store cache_key in session for clean URLs
-                if cache_key:
-                    session['csv_cache_key'] = cache_key
-                    session['csv_per_page'] = per_page
-                return redirect(url_for('csv_page', page=page))
-
-            # For GET requests, render the template
-            return render_template_string(CSV_EDIT_HTML,
-                                          s3_path=s3_path,
-                                          module=module,
-                                          file_type=file_type,
-                                          gzipped=gzipped,
-                                          filename=filename,
-                                          columns=columns,
-                                          data=data,
-                                          clean_url=url_for('csv_page', page=page),
-                                          page=page,
-                                          per_page=per_page,
-                                          total_rows=total_rows,
-                                          page_count=page_count,
-                                          cache_key=cache_key,
-                                          escaped_delimiter=escaped_delimiter,
-                                          edits=edits,
-                                          edits_json=json.dumps(edits, default=str)
-                                          )
-
-        # Calculate start and end indices
-        start = (page - 1) * per_page
-        end = min(start + per_page, total_rows)
+        requested_page = page
+        page, page_count, start, end = paginate(total_rows, page, per_page)
+
+        # For POST requests or when cache_key is in URL, redirect an out-of-range page to its clean URL
+        if page != requested_page and (request.method == 'POST' or request.args.get('cache_key')):
+            # Store cache_key in session for clean URLs
+            if cache_key:
+                session['csv_cache_key'] = cache_key
+                session['csv_per_page'] = per_page
+            return redirect(url_for('csv_page', page=page))
 
         # Get the page data
         page_data = data_full[start:end]
@@ -3296,12 +6584,12 @@ def csv_page(page=1):
         detected_delimiter = cached_data.get('detected_delimiter', ',')
         escaped_delimiter = detected_delimiter.replace('\\', '\\\\').replace('"', '\\"')
 
-        # Get existing edits from session
-        edits = session.get(f'csv_edits_{cache_key}', {})
+        # Get existing edits from the server-side journal
+        edits = CSV_EDIT_JOURNAL.edits(cache_key)
 
         # Render the CSV editor template
-        return render_template_string(
-            CSV_EDIT_HTML,
+        return render_page(
+            CSV_EDIT_PAGE,
             public_url=public_url,
             s3_path=public_url,  # Use public_url as s3_path for compatibility
             module=module,
@@ -3317,7 +6605,7 @@ def csv_page(page=1):
             cache_key=cache_key,
             escaped_delimiter=escaped_delimiter,
             edits=edits,
-            edits_json=json.dumps(edits, default=str),
+            loading=bool(cached_data.get('loading')),
             start_rec=start + 1,
             end_rec=end,
             start=start,  # Add missing start variable
@@ -3329,6 +6617,51 @@ def csv_page(page=1):
         return jsonify({'error': str(e)})
 
 
+def paginate(total_rows, page, per_page):
+    """Clamp page into range and return (page, page_count, start, end) for a row slice"""
+    per_page = max(int(per_page), 1)
+    page_count = (total_rows + per_page - 1) // per_page
+    page = min(max(int(page), 1), max(page_count, 1))
+    start = (page - 1) * per_page
+    end = min(start + per_page, total_rows)
+    return page, page_count, start, end
+
+
+@app.route('/csv-page', methods=['POST'])
+def csv_page_json():
+    """Return one page of the cached CSV as JSON so the editor can flip pages without a re-render"""
+    try:
+        cache_key = request.form.get('cache_key') or session.get('csv_cache_key', '')
+        per_page = int(request.form.get('per_page') or session.get('csv_per_page', 20))
+
+        cached_data = get_csv_entry(cache_key)
+        if cached_data is None:
+            return jsonify({'success': False, 'reload': True,
+                            'error': 'No CSV data found in cache. Please reload the CSV file.'})
+
+        data_full = cached_data['data']
+        total_rows = len(data_full)
+        page, page_count, start, end = paginate(total_rows, request.form.get('page', 1), per_page)
+
+        return jsonify({
+            'success': True,
+            'data': list(data_full.iter_rows(start, end)),  # Rows as value lists in column order
+            'page': page,
+            'per_page': per_page,
+            'page_count': page_count,
+            'total_rows': total_rows,
+            'start': start,
+            'start_rec': start + 1 if total_rows else 0,
+            'end_rec': end,
+            'loading': bool(cached_data.get('loading')),
+            'load_error': cached_data.get('load_error')
+        })
+
+    except Exception as e:
+        print(f"DEBUG: Error in csv-page: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
 @app.route('/update-pagination', methods=['POST'])
 def update_pagination():
     """Update pagination count for a specific CSV file in cache"""
@@ -3339,15 +6672,16 @@ def update_pagination():
         print(f"DEBUG: update-pagination called with cache_key: {cache_key}, new_per_page: {new_per_page}")
         print(f"DEBUG: Available cache keys: {list(CSV_DATA_CACHE.keys())}")
 
-        if not cache_key or cache_key not in CSV_DATA_CACHE:
+        cached_data = get_csv_entry(cache_key)
+        if cached_data is None:
             print(f"DEBUG: Cache key not found: {cache_key}")
             return jsonify({'error': 'No CSV data found in cache'})
 
         # Update the pagination count in cache
-        CSV_DATA_CACHE[cache_key]['per_page'] = new_per_page
+        cached_data['per_page'] = new_per_page
 
         print(f"DEBUG: Updated pagination for {cache_key} to {new_per_page}")
-        print(f"DEBUG: Cache data now: {CSV_DATA_CACHE[cache_key]}")
+        print(f"DEBUG: Cache data now: {cached_data}")
 
         return jsonify({'success': True, 'per_page': new_per_page})
 
@@ -3356,6 +6690,12 @@ def update_pagination():
         return jsonify({'error': str(e)})
 
 
+@app.route('/csv-cache-stats', methods=['GET'])
+def csv_cache_stats():
+    """Report CSV data cache usage and hit/miss/eviction counters for this worker"""
+    return jsonify(CSV_DATA_CACHE.stats())
+
+
 @app.route('/save-settings', methods=['POST'])
 def save_settings():
     """Save pagination count and URL input to session memory"""
@@ -3400,22 +6740,28 @@ def get_settings():
 @app.route('/update-csv-edit', methods=['POST'])
 def update_csv_edit():
     try:
-        data = request.get_json()
+        data = request.get_json(force=True, silent=True) or {}
         cache_key = data.get('cache_key')
-        edits = data.get('edits', {})
-
-        print(f"DEBUG: Update CSV edit - cache_key: {cache_key}, edits: {edits}")
 
         if not cache_key:
             return jsonify({'success': False, 'error': 'No cache key provided'})
 
-        # Store all edits in session
-        edits_key = f'csv_edits_{cache_key}'
-        session[edits_key] = edits
+        if 'changes' in data:
+            delta = parse_edit_delta(data['changes'])
+        else:
+            # Older clients post the complete edits map; journal only what changed
+            edits = parse_edit_delta(data.get('edits', {}))
+            current = CSV_EDIT_JOURNAL.edits(cache_key)
+            delta = {key: value for key, value in edits.items() if current.get(key) != value}
+            delta.update({key: None for key in current if key not in edits})
+
+        if not delta:
+            return jsonify({'success': True, 'edit_count': len(CSV_EDIT_JOURNAL.edits(cache_key))})
 
-        print(f"DEBUG: Saved {len(edits)} edits to session key {edits_key}")
+        edit_count = CSV_EDIT_JOURNAL.append(cache_key, delta)
+        print(f"DEBUG: Journaled {len(delta)} cell changes for {cache_key} ({edit_count} edits total)")
 
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'edit_count': edit_count})
 
     except Exception as e:
         print(f"DEBUG: Error updating CSV edit: {str(e)}")
@@ -3424,14 +6770,37 @@ def update_csv_edit():
 
 @app.route('/save', methods=['POST'])
 def save():
+    """Write the edited CSV (cached table plus edit journal) to its S3 path"""
     try:
-        # Get form data
-        s3_path = request.form.get('s3_path', '')
-        table_data = request.form.get('table_data', '')
-        all_edits = request.form.get('all_edits', '')
+        # The editor shows the path it was opened from in public_url
+        s3_path = (request.form.get('s3_path') or request.form.get('public_url') or '').strip()
+        if is_s3_prefix(s3_path):
+            raise ValueError(f"{s3_path} names several objects; download the table instead")
+        parse_s3_path(s3_path)
+
+        cache_key = request.form.get('cache_key') or session.get('csv_cache_key')
+        cached_data = get_csv_entry(cache_key)
+        if not cached_data:
+            flash("Data not found in cache")
+            return redirect(url_for('home'))
+        if cached_data.get('load_error'):
+            flash(f"Only the first rows of this file could be loaded ({cached_data['load_error']}). Please open it again.")
+            return redirect(url_for('home'))
+        if cached_data.get('loading'):
+            flash("The file is still loading. Please save once all rows are loaded.")
+            return redirect(url_for('home'))
 
-        # For now, just flash a success message
-        # In a real implementation, you would save the CSV data
+        data = cached_data['data']
+        columns = cached_data.get('columns') or data.columns
+        row_edits = journal_row_edits(cache_key, data, columns)
+        delimiter = request.form.get('delimiter', ',')
+
+        chunks, content_type = compress_for_upload(
+            iter_csv_download(data, columns, row_edits, delimiter), s3_path, request.form.get('compression'), 'text/csv')
+
+        started = time.time()
+        size = upload_s3_stream(s3_path, chunks, content_type)
+        print(f"DEBUG: Saved {len(data)} rows ({size} bytes) to {s3_path} in {time.time() - started:.1f}s")
         flash(f"CSV saved successfully to {s3_path}")
 
         return redirect(url_for('home'))
@@ -3441,8 +6810,173 @@ def save():
         return redirect(url_for('home'))
 
 
+def submit_code_run(form):
+    """Queue the command (`command`) or script (`code_text` + `file_extension`) in a form.
+
+    An optional `timeout` in seconds is capped at CODE_RUN_MAX_TIMEOUT_SECONDS. Returns the
+    CodeRun; raises ValueError or CodeRunLimitError with a message for the user.
+    """
+    raw_timeout = form.get('timeout', '').strip()
+    try:
+        timeout = float(raw_timeout) if raw_timeout else CODE_RUN_TIMEOUT_SECONDS
+    except ValueError:
+        timeout = math.nan
+    # NaN and inf would never expire (and are not valid JSON in /jobs)
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError("timeout must be a positive number of seconds")
+    timeout = min(timeout, CODE_RUN_MAX_TIMEOUT_SECONDS)
+
+    command = form.get('command', '').strip()
+    if command:
+        return CODE_RUNS.submit(shlex.split(command), timeout=timeout)
+
+    code_text = form.get('code_text', '')
+    file_extension = form.get('file_extension', '').lower()
+    if not code_text.strip():
+        raise ValueError("No code to run")
+    interpreter = CODE_RUN_INTERPRETERS.get(file_extension)
+    if interpreter is None:
+        raise ValueError(f"Cannot run {file_extension or 'these'} files")
+    fd, script_path = tempfile.mkstemp(prefix='workbench_run_', suffix=file_extension)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(code_text)
+        return CODE_RUNS.submit(interpreter + [script_path], timeout=timeout, cleanup_path=script_path)
+    except Exception:
+        os.remove(script_path)
+        raise
+
+
+@app.route('/run_code', methods=['POST'])
+def run_code():
+    """Queue a command or script to run in the background.
+
+    Returns a session_id straight away; output is read with /stream_output/<session_id>.
+    """
+    try:
+        run = submit_code_run(request.form)
+        return jsonify({'success': True, 'session_id': run.session_id, 'status': run.status})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"DEBUG: run_code error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/stream_output/<session_id>')
+def stream_output(session_id):
+    """Output of a code run since chunk `since` (default: since the previous poll).
+
+    Legacy polling API kept for scripts; the editors follow /stream_output/<id>/events.
+    """
+    run = CODE_RUNS.get(session_id)
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired session'})
+    return jsonify(dict(run.read(request.args.get('since', type=int)), success=True))
+
+
+def iter_run_events(run, since):
+    """Server-sent events for a run's output from chunk `since` on, ending with an 'end' event.
+
+    Each message carries every chunk buffered since the previous one, with the next
+    seq as its id, so a reconnecting EventSource resumes through Last-Event-ID. Streams
+    close after CODE_RUN_STREAM_SECONDS so a long run does not hold a request thread for
+    its whole duration; the client reconnects and picks up where it left off.
+    """
+    deadline = time.monotonic() + CODE_RUN_STREAM_SECONDS
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # A data-less event still sets the id; retry asks for a quick reconnect
+            yield f"id: {since}\nretry: 1000\n\n"
+            return
+        run.wait(since, min(CODE_RUN_HEARTBEAT_SECONDS, remaining))
+        snapshot = run.read(since)
+        if snapshot['dropped']:
+            yield f"event: dropped\ndata: {snapshot['dropped']}\n\n"
+        if snapshot['output']:
+            yield f"id: {snapshot['next']}\ndata: {json.dumps(snapshot['output'])}\n\n"
+        elif not snapshot['complete']:
+            yield ": keep-alive\n\n"
+        since = snapshot['next']
+        if snapshot['complete']:
+            yield f"event: end\ndata: {json.dumps({'returncode': snapshot['returncode'], 'message': snapshot['message']})}\n\n"
+            return
+
+
+@app.route('/stream_output/<session_id>/events')
+def stream_output_events(session_id):
+    """Push a run's output as server-sent events while it is produced"""
+    run = CODE_RUNS.get(session_id)
+    if run is None:
+        body = iter([f"event: end\ndata: {json.dumps({'error': 'Unknown or expired session'})}\n\n"])
+    else:
+        # Last-Event-ID is sent by EventSource when it reconnects
+        since = request.headers.get('Last-Event-ID', type=int)
+        if since is None:
+            since = request.args.get('since', 0, type=int)
+        body = iter_run_events(run, since)
+    response = Response(body, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Keep reverse proxies from buffering the stream
+    return response
+
+
+@app.route('/stop_code/<session_id>', methods=['POST'])
+def stop_code(session_id):
+    """Kill a code run and everything it started"""
+    run = CODE_RUNS.get(session_id)
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired session'})
+    run.cancel()
+    return jsonify({'success': True})
+
+
+@app.route('/jobs', methods=['GET', 'POST'])
+def jobs():
+    """POST queues a job (same fields as /run_code plus `timeout`); GET lists the jobs of every worker"""
+    if request.method == 'GET':
+        return jsonify({'success': True, 'jobs': CODE_RUNS.jobs()})
+    try:
+        run = submit_code_run(request.form)
+        return jsonify(dict(run.info(), success=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"DEBUG: Job submit error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    run = CODE_RUNS.get(job_id)
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job'})
+    return jsonify(dict(run.info(), success=True))
+
+
+@app.route('/jobs/<job_id>/tail')
+def job_tail(job_id):
+    """Last `lines` lines (default 100) of a job's output"""
+    run = CODE_RUNS.get(job_id)
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job'})
+    return jsonify({'success': True, 'status': run.status, 'tail': run.tail(request.args.get('lines', 100, type=int))})
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel(job_id):
+    """Remove a queued job or kill a running one"""
+    run = CODE_RUNS.get(job_id)
+    if run is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job'})
+    cancelled = run.cancel()
+    return jsonify(dict(run.info(), success=True, cancelled=cancelled))
+
+
 @app.route('/execute_command', methods=['POST'])
 def execute_command():
+    """Run a command through the job queue and return its output once it finishes (30s timeout)"""
     try:
         data = request.get_json()
         command = data.get('command', '')
@@ -3450,22 +6984,18 @@ def execute_command():
         if not command:
             return jsonify({'error': 'No command provided'})
 
-        # Execute command using subprocess
-        import subprocess
-        import shlex
-
-        # Split command into arguments safely
-        args = shlex.split(command)
+        run = CODE_RUNS.submit(shlex.split(command), timeout=EXECUTE_COMMAND_TIMEOUT_SECONDS)
+        # The timeout only starts once a job thread picks the command up
+        if not run.join(EXECUTE_COMMAND_TIMEOUT_SECONDS + EXECUTE_COMMAND_QUEUE_SECONDS):
+            run.cancel("Stopped: the job queue was too busy to run it in time")
+            return jsonify({'error': 'The job queue is busy. Please try again later.'})
+        if run.status == 'timed_out':
+            return jsonify({'error': 'Command timed out'})
+        if run.status == 'failed':
+            return jsonify({'error': run.message})
 
-        # Execute command
-        result = subprocess.run(args, capture_output=True, text=True, timeout=30)
+        return jsonify({'output': run.text('stdout'), 'stderr': run.text('stderr'), 'returncode': run.returncode})
 
-        return jsonify({'output': result.stdout, 'stderr': result.stderr, 'returncode': result.returncode})
-
-    except subprocess.TimeoutExpired:
-        return jsonify({'error': 'Command timed out'})
-    except FileNotFoundError:
-        return jsonify({'error': f'Command not found: {command.split()[0]}'})
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -3473,8 +7003,8 @@ def execute_command():
 @app.route('/csv-editor')
 def csv_editor_route():
     """Direct route to CSV editor"""
-    return render_template_string(
-        CSV_EDIT_HTML,
+    return render_page(
+        CSV_EDIT_PAGE,
         filename="",
         s3_path="",
         gzipped=False,
@@ -3485,7 +7015,6 @@ def csv_editor_route():
         columns=[],
         data=[],
         edits={},
-        edits_json="{}",
         start_rec=0,
         end_rec=0,
         total_rows=0,
@@ -3501,13 +7030,7 @@ def csv_editor_route():
 @app.route('/raw-editor')
 def raw_editor_route():
     """Direct route to raw editor"""
-    return render_template_string(
-        RAW_EDIT_HTML,
-        filename="",
-        code_text="",
-        actual_file_path="",
-        big_time_display=get_big_time_display()
-    )
+    return render_raw_page("", "", code_text="")
 
 
 if __name__ == "__main__":
@@ -3517,6 +7040,7 @@ if __name__ == "__main__":
     # Only open browser in local development
     if debug and port != int(os.environ.get("PORT", "9000")):
         try:
+            import webbrowser
             webbrowser.open(f"http://localhost:{port}")
         except Exception:
             pass